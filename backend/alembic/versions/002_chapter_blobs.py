@@ -0,0 +1,83 @@
+"""Content-addressed chapter version bodies
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from __future__ import annotations
+
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "chapter_blobs" not in inspector.get_table_names():
+        op.create_table(
+            "chapter_blobs",
+            sa.Column("hash", sa.String(length=64), primary_key=True, nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    if "chapter_versions" not in inspector.get_table_names():
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("chapter_versions")}
+    if "content_hash" not in columns:
+        with op.batch_alter_table("chapter_versions") as batch:
+            batch.add_column(sa.Column("content_hash", sa.String(length=64), nullable=True))
+            batch.create_index("ix_chapter_versions_content_hash", ["content_hash"])
+
+    # Move existing bodies into the blob table, one reference per version
+    rows = bind.execute(sa.text("SELECT id, content FROM chapter_versions WHERE content_hash IS NULL")).fetchall()
+    for version_id, content in rows:
+        content = content or ""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        exists = bind.execute(sa.text("SELECT 1 FROM chapter_blobs WHERE hash = :h"), {"h": digest}).first()
+        if exists:
+            bind.execute(sa.text("UPDATE chapter_blobs SET ref_count = ref_count + 1 WHERE hash = :h"), {"h": digest})
+        else:
+            bind.execute(
+                sa.text("INSERT INTO chapter_blobs (hash, content, size, ref_count) VALUES (:h, :c, :s, 1)"),
+                {"h": digest, "c": content, "s": len(content.encode("utf-8"))},
+            )
+        bind.execute(
+            sa.text("UPDATE chapter_versions SET content_hash = :h, content = '' WHERE id = :id"),
+            {"h": digest, "id": version_id},
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "chapter_versions" in inspector.get_table_names():
+        columns = {column["name"] for column in inspector.get_columns("chapter_versions")}
+        if "content_hash" in columns:
+            bind.execute(
+                sa.text(
+                    "UPDATE chapter_versions SET content = "
+                    "(SELECT content FROM chapter_blobs WHERE chapter_blobs.hash = chapter_versions.content_hash) "
+                    "WHERE content_hash IS NOT NULL"
+                )
+            )
+            with op.batch_alter_table("chapter_versions") as batch:
+                batch.drop_index("ix_chapter_versions_content_hash")
+                batch.drop_column("content_hash")
+
+    if "chapter_blobs" in inspector.get_table_names():
+        op.drop_table("chapter_blobs")
@@ -0,0 +1,48 @@
+"""External blob storage for chapter version bodies
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "chapter_blobs" not in inspector.get_table_names():
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("chapter_blobs")}
+    with op.batch_alter_table("chapter_blobs") as batch:
+        if "storage" not in columns:
+            batch.add_column(sa.Column("storage", sa.String(length=16), nullable=False, server_default="database"))
+        batch.alter_column("content", existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    # Bodies must be moved back first: python migrate_blobs.py --to database
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "chapter_blobs" not in inspector.get_table_names():
+        return
+
+    external = bind.execute(sa.text("SELECT COUNT(*) FROM chapter_blobs WHERE content IS NULL")).scalar()
+    if external:
+        raise RuntimeError(f"{external} chapter blobs live in an external store; run migrate_blobs.py --to database first")
+
+    with op.batch_alter_table("chapter_blobs") as batch:
+        batch.alter_column("content", existing_type=sa.Text(), nullable=False)
+        batch.drop_column("storage")
@@ -0,0 +1,75 @@
+"""Fractional rank keys for characters, plots and chapters
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+from app.core.fractional_index import RANK_TYPE, keys_between
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+# table -> integer column that used to define the order
+ORDERED_TABLES = {
+    "characters": "position",
+    "plots": "order",
+    "chapters": "chapter_number",
+}
+
+
+def _backfill(bind, table: str, display_column: str) -> None:
+    meta = sa.MetaData()
+    tbl = sa.Table(table, meta, autoload_with=bind)
+    rows = bind.execute(
+        sa.select(tbl.c.id, tbl.c.novel_id).order_by(tbl.c.novel_id, tbl.c[display_column], tbl.c.id)
+    ).all()
+    grouped = defaultdict(list)
+    for row_id, novel_id in rows:
+        grouped[novel_id].append(row_id)
+    for ids in grouped.values():
+        for row_id, rank in zip(ids, keys_between(None, None, len(ids))):
+            bind.execute(tbl.update().where(tbl.c.id == row_id).values(rank=rank))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, display_column in ORDERED_TABLES.items():
+        if table not in tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        if "rank" in columns:
+            continue
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("rank", RANK_TYPE, nullable=True))
+            batch.create_index(f"ix_{table}_novel_rank", ["novel_id", "rank"])
+        _backfill(bind, table, display_column)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table in ORDERED_TABLES:
+        if table not in tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        if "rank" not in columns:
+            continue
+        with op.batch_alter_table(table) as batch:
+            batch.drop_index(f"ix_{table}_novel_rank")
+            batch.drop_column("rank")
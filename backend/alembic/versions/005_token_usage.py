@@ -0,0 +1,74 @@
+"""Token usage ledger with hourly and daily rollups
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+BIGINT_PK_TYPE = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+
+
+def _rollup_columns(bucket_type):
+    return [
+        sa.Column("id", BIGINT_PK_TYPE, primary_key=True, autoincrement=True),
+        sa.Column("bucket", bucket_type, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("provider", sa.String(length=32), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("requests", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cache_hits", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("prompt_tokens", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("completion_tokens", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("latency_ms_total", sa.BigInteger(), nullable=False, server_default="0"),
+    ]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    tables = set(inspect(bind).get_table_names())
+
+    if "token_usage" not in tables:
+        op.create_table(
+            "token_usage",
+            sa.Column("id", BIGINT_PK_TYPE, primary_key=True, autoincrement=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+            sa.Column("novel_id", sa.String(length=36), nullable=True),
+            sa.Column("provider", sa.String(length=32), nullable=False),
+            sa.Column("model", sa.String(length=100), nullable=False),
+            sa.Column("prompt_tokens", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("completion_tokens", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("latency_ms", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("cache_hit", sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_token_usage_novel_id", "token_usage", ["novel_id"])
+        op.create_index("ix_token_usage_created_at", "token_usage", ["created_at"])
+        op.create_index("ix_token_usage_user_created", "token_usage", ["user_id", "created_at"])
+
+    for table, bucket_type in (("token_usage_hourly", sa.DateTime()), ("token_usage_daily", sa.Date())):
+        if table in tables:
+            continue
+        op.create_table(
+            table,
+            *_rollup_columns(bucket_type),
+            sa.UniqueConstraint("bucket", "user_id", "provider", "model", name=f"uq_{table}"),
+        )
+        op.create_index(f"ix_{table}_bucket", table, ["bucket"])
+
+
+def downgrade() -> None:
+    tables = set(inspect(op.get_bind()).get_table_names())
+    for table in ("token_usage_daily", "token_usage_hourly", "token_usage"):
+        if table in tables:
+            op.drop_table(table)
@@ -1,21 +1,44 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from ..core.cache import cache
+from ..core.config import settings
 from ..core.database import get_db
+from ..core.invalidation import InvalidationKind, publish_invalidation
 from ..core.logger import logger
-from ..core.security import create_access_token, hash_password, verify_password
+from ..core.principals import load_principal, principal_key
+from ..core.profiling import profile_buffer, profile_tokens
+from ..core.password_hasher import password_hasher
+from ..core.security import create_access_token
+from ..core.tracing import trace_buffer
 from ..models.admin import Admin
+from ..models.chapter import Chapter, ChapterVersion
 from ..models.novel import Novel
+from ..models.token_usage import TokenUsageDaily, TokenUsageHourly
+from ..models.user import User
+from ..models.user_daily_request import UserDailyRequest
 from ..schemas.novel import NovelResponse
-from ..schemas.admin import AdminCreate, AdminLogin, AdminResponse, AdminUpdate, Token
+from ..schemas.admin import (
+    AdminCreate,
+    AdminLogin,
+    AdminNovelStatsPage,
+    AdminResponse,
+    AdminUpdate,
+    Token,
+)
+from ..schemas.usage import UsageRollupResponse, UsageSummaryRow
+from ..services.counters import counter_aggregator
+from ..services.novel_stats import SORT_FIELDS as NOVEL_SORT_FIELDS, list_novel_stats
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 security = HTTPBearer()
@@ -43,7 +66,12 @@ async def get_current_admin(
             detail="Invalid token payload",
         )
     
-    admin = db.query(Admin).filter(Admin.id == admin_id).first()
+    admin = load_principal(
+        db,
+        principal_key("admin", payload),
+        lambda: db.query(Admin).filter(Admin.id == admin_id).first(),
+        lambda a: [f"admin:{a.id}"],
+    )
     if not admin:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -75,8 +103,14 @@ async def login(payload: AdminLogin, db: Session = Depends(get_db)):
     try:
         logger.info(f"Admin login attempt: {payload.username}")
         admin = db.query(Admin).filter(Admin.username == payload.username).first()
+        stored_hash = admin.hashed_password if admin else None
+        # 结束只读事务，哈希校验期间不占用连接池中的连接
+        db.rollback()
+        valid, new_hash = await password_hasher.verify_and_update(
+            payload.password, stored_hash, account=payload.username
+        )
         
-        if not admin or not verify_password(payload.password, admin.hashed_password):
+        if not admin or not valid:
             logger.warning(f"Failed login attempt for: {payload.username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -90,11 +124,15 @@ async def login(payload: AdminLogin, db: Session = Depends(get_db)):
                 detail="Admin account is inactive",
             )
         
+        admin_id = admin.id
         admin.last_login = datetime.utcnow()
+        if new_hash:
+            # 哈希成本已调整：登录成功时透明重算
+            admin.hashed_password = new_hash
         db.commit()
         
         access_token = create_access_token(
-            subject=admin.id,
+            subject=admin_id,
             expires_delta=timedelta(hours=24)
         )
         
@@ -142,7 +180,7 @@ async def register_admin(
         admin_data = payload.model_dump(exclude={"password", "is_superuser"})
         admin = Admin(
             **admin_data,
-            hashed_password=hash_password(payload.password),
+            hashed_password=await password_hasher.hash(payload.password),
             is_superuser=True if admin_count == 0 else payload.is_superuser
         )
         
@@ -235,10 +273,11 @@ async def update_admin(
             setattr(admin, field, value)
         
         if payload.password:
-            admin.hashed_password = hash_password(payload.password)
+            admin.hashed_password = await password_hasher.hash(payload.password)
         
         db.commit()
         db.refresh(admin)
+        publish_invalidation(InvalidationKind.ADMIN, admin.id)
         
         logger.info(f"Admin updated successfully: {admin_id}")
         return admin
@@ -277,6 +316,7 @@ async def delete_admin(
         
         db.delete(admin)
         db.commit()
+        publish_invalidation(InvalidationKind.ADMIN, str(admin_id))
         
         logger.info(f"Admin deleted successfully: {admin_id}")
     
@@ -291,31 +331,50 @@ async def delete_admin(
         ) from exc
 
 
+NOVEL_STATUSES = ("draft", "in_progress", "completed", "published")
+
+
+def _compute_stats(db: Session) -> dict:
+    """One aggregate query per table; novel statuses are folded with lower()."""
+    status_counts = dict(
+        db.query(func.lower(Novel.status), func.count(Novel.id)).group_by(func.lower(Novel.status)).all()
+    )
+    novels = {"total": sum(status_counts.values())}
+    novels.update({name: status_counts.pop(name, 0) for name in NOVEL_STATUSES})
+    novels.update({name or "unknown": count for name, count in status_counts.items()})
+
+    chapter_count, word_total = db.query(func.count(Chapter.id), func.coalesce(func.sum(Chapter.word_count), 0)).one()
+    requests, prompt_tokens, completion_tokens = db.query(
+        func.coalesce(func.sum(TokenUsageDaily.requests), 0),
+        func.coalesce(func.sum(TokenUsageDaily.prompt_tokens), 0),
+        func.coalesce(func.sum(TokenUsageDaily.completion_tokens), 0),
+    ).one()
+
+    return {
+        "novels": novels,
+        "chapters": {"total": chapter_count, "words": int(word_total)},
+        "versions": db.query(func.count(ChapterVersion.id)).scalar(),
+        "users": db.query(func.count(User.id)).scalar(),
+        "admins": db.query(func.count(Admin.id)).scalar(),
+        "tokens": {
+            "requests": int(requests),
+            "prompt": int(prompt_tokens),
+            "completion": int(completion_tokens),
+            "total": int(prompt_tokens) + int(completion_tokens),
+        },
+    }
+
+
 @router.get("/stats")
 async def get_stats(
     db: Session = Depends(get_db),
     _: Admin = Depends(get_current_admin)
 ):
-    """Get platform statistics."""
+    """Get platform statistics (cached for ``ADMIN_STATS_TTL`` seconds)."""
     try:
-        novel_count = db.query(Novel).count()
-        # Normalize to lowercase statuses used by the model (default 'draft')
-        draft_count = db.query(Novel).filter(Novel.status.in_(["draft", "DRAFT"])) .count()
-        in_progress_count = db.query(Novel).filter(Novel.status.in_(["in_progress", "IN_PROGRESS"])) .count()
-        completed_count = db.query(Novel).filter(Novel.status.in_(["completed", "COMPLETED"])) .count()
-        published_count = db.query(Novel).filter(Novel.status.in_(["published", "PUBLISHED"])) .count()
-        admin_count = db.query(Admin).count()
-        
-        return {
-            "novels": {
-                "total": novel_count,
-                "draft": draft_count,
-                "in_progress": in_progress_count,
-                "completed": completed_count,
-                "published": published_count,
-            },
-            "admins": admin_count,
-        }
+        return await cache.get_or_compute(
+            "admin:stats", lambda: _compute_stats(db), ttl=settings.ADMIN_STATS_TTL, tags=("novels", "admin_stats")
+        )
     except SQLAlchemyError as exc:
         logger.error(f"Database error in get_stats: {exc}")
         raise HTTPException(
@@ -344,3 +403,245 @@ async def admin_list_novels(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(exc),
         ) from exc
+
+
+@router.get("/novels/stats", response_model=AdminNovelStatsPage)
+async def admin_novel_stats(
+    sort_by: str = Query("created_at", pattern=f"^({'|'.join(NOVEL_SORT_FIELDS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    _: Admin = Depends(get_current_admin)
+):
+    """Novels with chapter/word/version counts and last activity, keyset-paginated."""
+    try:
+        items, next_cursor = list_novel_stats(db, sort_by, order == "desc", limit, cursor)
+        return {"items": items, "next_cursor": next_cursor}
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in admin_novel_stats: {exc}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(exc),
+        ) from exc
+
+
+@router.get("/counters")
+async def get_counters(
+    day: Optional[date] = None,
+    db: Session = Depends(get_db),
+    _: Admin = Depends(get_current_admin)
+):
+    """Live usage counters (persisted values merged with buffered increments) and the day's quota usage."""
+    try:
+        day = day or date.today()
+        daily = dict(
+            db.query(UserDailyRequest.user_id, UserDailyRequest.request_count)
+            .filter(UserDailyRequest.request_date == day)
+            .all()
+        )
+        return {
+            "backend": settings.COUNTER_BACKEND,
+            "pending": counter_aggregator.pending_count(),
+            "metrics": counter_aggregator.live_metrics(db),
+            "daily": {
+                "date": day.isoformat(),
+                "total": sum(daily.values()),
+                "users": {str(user_id): count for user_id, count in sorted(daily.items())},
+            },
+        }
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in get_counters: {exc}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(exc),
+        ) from exc
+
+
+# ============= Token usage (rollup tables only, never the raw ledger) =============
+
+
+def _usage_totals(requests, cache_hits, prompt_tokens, completion_tokens, latency_ms_total) -> Dict[str, float]:
+    requests = int(requests or 0)
+    prompt_tokens = int(prompt_tokens or 0)
+    completion_tokens = int(completion_tokens or 0)
+    return {
+        "requests": requests,
+        "cache_hits": int(cache_hits or 0),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "avg_latency_ms": round(int(latency_ms_total or 0) / requests, 1) if requests else 0.0,
+    }
+
+
+def _filter_rollup(query, model, start, end, user_id: Optional[int], provider: Optional[str], model_name: Optional[str]):
+    if start is not None:
+        query = query.filter(model.bucket >= start)
+    if end is not None:
+        query = query.filter(model.bucket < end)
+    if user_id is not None:
+        query = query.filter(model.user_id == user_id)
+    if provider:
+        query = query.filter(model.provider == provider)
+    if model_name:
+        query = query.filter(model.model == model_name)
+    return query
+
+
+def _rollup_rows(db: Session, model, start, end, user_id, provider, model_name, limit: int) -> List[UsageRollupResponse]:
+    query = _filter_rollup(db.query(model), model, start, end, user_id, provider, model_name)
+    rows = query.order_by(model.bucket.desc(), model.user_id).limit(limit).all()
+    return [
+        UsageRollupResponse(
+            bucket=row.bucket,
+            user_id=row.user_id,
+            provider=row.provider,
+            model=row.model,
+            **_usage_totals(row.requests, row.cache_hits, row.prompt_tokens, row.completion_tokens, row.latency_ms_total),
+        )
+        for row in rows
+    ]
+
+
+@router.get("/usage/hourly", response_model=List[UsageRollupResponse])
+async def get_usage_hourly(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    _: Admin = Depends(get_current_admin)
+):
+    """Hourly token usage buckets (UTC), newest first."""
+    try:
+        return _rollup_rows(db, TokenUsageHourly, start, end, user_id, provider, model, limit)
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in get_usage_hourly: {exc}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(exc),
+        ) from exc
+
+
+@router.get("/usage/daily", response_model=List[UsageRollupResponse])
+async def get_usage_daily(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user_id: Optional[int] = None,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    _: Admin = Depends(get_current_admin)
+):
+    """Daily token usage buckets (UTC dates), newest first."""
+    try:
+        return _rollup_rows(db, TokenUsageDaily, start, end, user_id, provider, model, limit)
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in get_usage_daily: {exc}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(exc),
+        ) from exc
+
+
+USAGE_GROUPS = {
+    "user": TokenUsageDaily.user_id,
+    "provider": TokenUsageDaily.provider,
+    "model": TokenUsageDaily.model,
+    "day": TokenUsageDaily.bucket,
+}
+
+
+@router.get("/usage/summary", response_model=List[UsageSummaryRow])
+async def get_usage_summary(
+    group_by: str = Query("model", pattern="^(user|provider|model|day)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user_id: Optional[int] = None,
+    provider: Optional[str] = None,
+    db: Session = Depends(get_db),
+    _: Admin = Depends(get_current_admin)
+):
+    """Token usage totals over a date range, grouped by one dimension."""
+    try:
+        column = USAGE_GROUPS[group_by]
+        query = db.query(
+            column,
+            func.sum(TokenUsageDaily.requests),
+            func.sum(TokenUsageDaily.cache_hits),
+            func.sum(TokenUsageDaily.prompt_tokens),
+            func.sum(TokenUsageDaily.completion_tokens),
+            func.sum(TokenUsageDaily.latency_ms_total),
+        )
+        query = _filter_rollup(query, TokenUsageDaily, start, end, user_id, provider, None)
+        rows = query.group_by(column).order_by(column).all()
+        return [UsageSummaryRow(key=str(key), **_usage_totals(*totals)) for key, *totals in rows]
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in get_usage_summary: {exc}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(exc),
+        ) from exc
+
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = Query(50, ge=1, le=500),
+    _: Admin = Depends(get_current_admin)
+):
+    """Most recent traces kept by head/tail sampling, newest first."""
+    return {
+        "enabled": settings.TRACING_ENABLED,
+        "sample_rate": settings.TRACE_SAMPLE_RATE,
+        "traces": trace_buffer.summaries(limit),
+    }
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(
+    trace_id: str,
+    _: Admin = Depends(get_current_admin)
+):
+    """All spans of one trace, ordered by start time."""
+    spans = trace_buffer.get(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
+
+
+@router.post("/profiles/token")
+async def issue_profile_token(current_admin: Admin = Depends(get_current_admin)):
+    """Single-use token that profiles the one request sending it in the X-Profile header."""
+    return {
+        "token": profile_tokens.issue(current_admin.id),
+        "header": "X-Profile",
+        "expires_in": settings.PROFILE_TOKEN_TTL_SECONDS,
+    }
+
+
+@router.get("/profiles")
+async def list_profiles(
+    limit: int = Query(20, ge=1, le=500),
+    _: Admin = Depends(get_current_admin)
+):
+    """Most recent request profiles, newest first."""
+    return {"enabled": settings.PROFILING_ENABLED, "profiles": profile_buffer.summaries(limit)}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    _: Admin = Depends(get_current_admin)
+):
+    """Folded stacks of one profile, ready for flamegraph.pl or speedscope."""
+    profile = profile_buffer.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(
+        profile["folded"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
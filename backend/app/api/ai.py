@@ -7,8 +7,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from ..core.cache import cache
 from ..core.database import get_db
+from ..core.dependencies import charges_daily_quota
 from ..core.logger import logger
+from ..core.tracing import traced, traced_async_client
+from ..core.write_buffer import chapter_write_buffer
 from ..models.chapter import Chapter
 from ..models.character import Character
 from ..models.novel import Novel
@@ -26,12 +30,13 @@ from ..schemas.ai import (
     AITestResponse,
 )
 from ..services.ai_service import AIService
+from ..services.reordering import display_values, order_by_rank
 from ..core.config import settings
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
 
-def _build_context(db: Session, novel_id: UUID, include_characters: bool = False, include_plots: bool = False, include_world: bool = False) -> Dict[str, Any]:
+def _load_novel_summary(db: Session, novel_id: UUID) -> Dict[str, Any]:
     try:
         novel = db.query(Novel).filter(Novel.id == str(novel_id)).first()
     except SQLAlchemyError as exc:
@@ -48,17 +53,26 @@ def _build_context(db: Session, novel_id: UUID, include_characters: bool = False
         genre = getattr(blueprint, "genre", None)
         description = getattr(blueprint, "full_synopsis", None) or getattr(blueprint, "one_sentence_summary", None)
 
-    context = {
-        "novel": {
-            "id": novel.id,
-            "title": novel.title,
-            "genre": genre,
-            "description": description,
-        }
+    return {
+        "id": novel.id,
+        "title": novel.title,
+        "genre": genre,
+        "description": description,
     }
+
+
+@traced("ai.build_context")
+def _build_context(db: Session, novel_id: UUID, include_characters: bool = False, include_plots: bool = False, include_world: bool = False) -> Dict[str, Any]:
+    # 小说与蓝图摘要读多写少，走进程内缓存；小说更新/删除时按 novel 标签失效
+    summary = cache.get_or_set(
+        f"novel:summary:{novel_id}",
+        lambda: _load_novel_summary(db, novel_id),
+        tags=(f"novel:{novel_id}",),
+    )
+    context = {"novel": dict(summary)}
     
     if include_characters:
-        characters = db.query(Character).filter(Character.novel_id == str(novel_id)).all()
+        characters = order_by_rank(db.query(Character).filter(Character.novel_id == str(novel_id)), Character).all()
         context["characters"] = [
             {
                 "name": c.name,
@@ -70,7 +84,7 @@ def _build_context(db: Session, novel_id: UUID, include_characters: bool = False
         ]
     
     if include_plots:
-        plots = db.query(Plot).filter(Plot.novel_id == str(novel_id)).order_by(Plot.order).all()
+        plots = order_by_rank(db.query(Plot).filter(Plot.novel_id == str(novel_id)), Plot).all()
         context["plots"] = [
             {
                 "title": p.title,
@@ -97,6 +111,7 @@ def _build_context(db: Session, novel_id: UUID, include_characters: bool = False
 
 
 @router.post("/generate", response_model=AIGenerateResponse)
+@charges_daily_quota
 async def generate_content(payload: AIGenerateRequest, db: Session = Depends(get_db)):
     """General AI content generation endpoint."""
     logger.info(f"AI generation request for novel {payload.novel_id} with provider {payload.provider}")
@@ -119,6 +134,7 @@ async def generate_content(payload: AIGenerateRequest, db: Session = Depends(get
 
 
 @router.post("/generate-character", response_model=AIGenerateResponse)
+@charges_daily_quota
 async def generate_character(payload: AICharacterGenerateRequest, db: Session = Depends(get_db)):
     """Generate a character profile using AI."""
     logger.info(f"AI character generation for novel {payload.novel_id}")
@@ -160,6 +176,7 @@ Format the response clearly with these sections."""
 
 
 @router.post("/generate-plot", response_model=AIGenerateResponse)
+@charges_daily_quota
 async def generate_plot(payload: AIPlotGenerateRequest, db: Session = Depends(get_db)):
     """Generate a plot outline using AI."""
     logger.info(f"AI plot generation for novel {payload.novel_id}")
@@ -209,22 +226,26 @@ Format the response clearly with these sections."""
 
 
 @router.post("/generate-chapter-outline", response_model=AIGenerateResponse)
+@charges_daily_quota
 async def generate_chapter_outline(payload: AIChapterOutlineRequest, db: Session = Depends(get_db)):
     """Generate a chapter outline using AI."""
     logger.info(f"AI chapter outline generation for novel {payload.novel_id}, chapter {payload.chapter_number}")
     try:
         context = _build_context(db, payload.novel_id, include_characters=True, include_plots=True, include_world=True)
         
-        existing_chapters = db.query(Chapter).filter(
-            Chapter.novel_id == str(payload.novel_id),
-            Chapter.chapter_number < payload.chapter_number
-        ).order_by(Chapter.chapter_number).all()
-
+        # 章节号由 rank 顺序推导（存储的 chapter_number 要等后台重排才更新），只读取目标章节之前的三章
+        first = max(payload.chapter_number - 4, 0)
+        recent_chapters = order_by_rank(
+            db.query(Chapter).filter(Chapter.novel_id == str(payload.novel_id)), Chapter
+        ).offset(first).limit(max(payload.chapter_number - 1 - first, 0)).all()
+        numbers = display_values(Chapter, recent_chapters, first)
+
+        recent = [(numbers[c.id], chapter_write_buffer.snapshot(c)) for c in recent_chapters]
         previous_summary = (
             "\n".join([
-                f"Chapter {c.chapter_number}: {c.title or ''} - {c.real_summary or ''}"
-                for c in existing_chapters[-3:]
-            ]) if existing_chapters else "This is the first chapter."
+                f"Chapter {number}: {c['title'] or ''} - {c['real_summary'] or ''}"
+                for number, c in recent
+            ]) if recent else "This is the first chapter."
         )
         
         prompt = f"""Create a detailed outline for Chapter {payload.chapter_number} of this novel.
@@ -268,6 +289,7 @@ Format the response clearly with these sections."""
 
 
 @router.post("/expand-content", response_model=AIGenerateResponse)
+@charges_daily_quota
 async def expand_content(payload: AIContentExpandRequest, db: Session = Depends(get_db)):
     """Expand a content snippet using AI."""
     logger.info(f"AI content expansion for chapter {payload.chapter_id}")
@@ -322,6 +344,7 @@ Target expansion: 2-3x the original length."""
 
 
 @router.post("/generate-world", response_model=AIGenerateResponse)
+@charges_daily_quota
 async def generate_world(payload: AIWorldGenerateRequest, db: Session = Depends(get_db)):
     """Generate or enhance world settings using AI."""
     logger.info(f"AI world generation for novel {payload.novel_id}")
@@ -362,6 +385,7 @@ Provide actionable details suitable for immediate writing."""
 
 
 @router.post("/test-config", response_model=AITestResponse)
+@charges_daily_quota
 async def test_ai_config(payload: AITestRequest):
     """Test AI provider connectivity and credentials without generating content."""
     logger.info(f"Testing AI config for provider={payload.provider}")
@@ -393,7 +417,6 @@ async def test_ai_config(payload: AITestRequest):
             return AITestResponse(ok=True, provider=prov, message="Anthropic 连接成功")
         else:
             # Assume OpenAI-compatible custom endpoint
-            import httpx
             if not payload.base_url:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="自定义 provider 需要提供 base_url")
             models_url = payload.base_url.rstrip("/")
@@ -404,7 +427,7 @@ async def test_ai_config(payload: AITestRequest):
             headers = {}
             if payload.api_key:
                 headers["Authorization"] = f"Bearer {payload.api_key}"
-            async with httpx.AsyncClient(timeout=15.0) as client:
+            async with traced_async_client(timeout=15.0) as client:
                 resp = await client.get(models_url, headers=headers)
                 if resp.status_code != 200:
                     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"HTTP {resp.status_code}: {resp.text}")
@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from ..core.database import get_db
+from ..core.dependencies import charges_daily_quota
 from ..core.logger import logger
 from ..services.ai_assistants import AssistantFactory
 from ..api.ai import _build_context
@@ -62,6 +63,7 @@ async def list_assistants():
 
 
 @router.post("/generate", response_model=AssistantResponse)
+@charges_daily_quota
 async def generate_with_assistant(
     payload: AssistantRequest,
     db: Session = Depends(get_db)
@@ -90,7 +92,7 @@ async def generate_with_assistant(
         )
 
         # 生成内容
-        content = await assistant.process(
+        result = await assistant.run(
             context=context,
             user_input=payload.user_input,
             max_tokens=payload.max_tokens
@@ -100,8 +102,8 @@ async def generate_with_assistant(
 
         return AssistantResponse(
             role=payload.role,
-            content=content,
-            tokens_used=0  # TODO: 从AI服务获取实际token使用量
+            content=result.get("content", ""),
+            tokens_used=result.get("tokens_used") or 0,
         )
 
     except ValueError as exc:
@@ -119,6 +121,7 @@ async def generate_with_assistant(
 
 
 @router.post("/generate-multiple", response_model=Dict[str, Any])
+@charges_daily_quota
 async def generate_multiple_versions(
     payload: AssistantRequest,
     num_versions: int = 2,
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 
 from ..core.config import settings
 from ..core.database import get_db
-from ..core.security import create_access_token, hash_password, verify_password
+from ..core.security import create_access_token, hash_password, verify_and_update_password
 from ..models.user import User
 from ..schemas.user import Token, UserCreate, UserLogin, UserResponse
 
@@ -55,8 +55,9 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """用户登录。"""
     user = db.query(User).filter(User.username == credentials.username).first()
+    valid, new_hash = verify_and_update_password(credentials.password, user.hashed_password) if user else (False, None)
 
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
@@ -68,6 +69,11 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="用户已被禁用",
         )
 
+    if new_hash:
+        # 哈希成本已调整：登录成功时透明重算
+        user.hashed_password = new_hash
+        db.commit()
+
     access_token = create_access_token(subject=str(user.id))
 
     return {"access_token": access_token, "token_type": "bearer"}
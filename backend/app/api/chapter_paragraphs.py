@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..core.database import get_db
+from ..core.fractional_index import key_between, keys_between
+from ..core.invalidation import InvalidationKind, publish_invalidation
+from ..core.logger import logger
+from ..core.write_buffer import chapter_write_buffer
+from ..models.chapter import Chapter, ChapterParagraph
+from ..schemas.chapter_paragraph import (
+    ChapterParagraphCreate,
+    ChapterParagraphPage,
+    ChapterParagraphResponse,
+    ChapterParagraphUpdate,
+    ChapterTextResponse,
+)
+
+router = APIRouter(prefix="/api/chapter-paragraphs", tags=["chapter-paragraphs"])
+
+PARAGRAPH_SEPARATOR = "\n"
+
+# 并发插入到同一锚点时会算出相同的 position，按最新的相邻段落重算键的次数
+INSERT_ATTEMPTS = 3
+
+
+def _count_words(text: str) -> int:
+    """与前端编辑器一致：统计非空白字符数。"""
+    return len("".join(text.split()))
+
+
+def _get_chapter(db: Session, chapter_id: int) -> Chapter:
+    chapter = db.query(Chapter).filter(Chapter.id == chapter_id).first()
+    if not chapter:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
+    return chapter
+
+
+def _get_paragraph(
+    db: Session, paragraph_id: int, chapter_id: Optional[int] = None, for_update: bool = False
+) -> ChapterParagraph:
+    query = db.query(ChapterParagraph).filter(ChapterParagraph.id == paragraph_id)
+    if chapter_id is not None:
+        query = query.filter(ChapterParagraph.chapter_id == chapter_id)
+    if for_update:
+        query = query.with_for_update()
+    paragraph = query.first()
+    if not paragraph:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paragraph not found")
+    return paragraph
+
+
+def _sync_chapter(db: Session, chapter_id: int, delta: int) -> Chapter:
+    """段落变更后在同一事务内同步章节：字数按增量原子更新，正文（chapters.outline）由段落重新拼接。
+
+    段落是已拆分章节的编辑入口，chapters.outline 始终是对外的正文，因此每次段落写入都回写它。
+    增量 UPDATE 同时锁住章节行，同一章节的并发段落写入由此串行，随后的拼接能读到对方已提交的段落。
+    """
+    chapter = _get_chapter(db, chapter_id)
+    chapter_write_buffer.absorb(chapter)
+    db.flush()
+    word_count = func.coalesce(Chapter.word_count, 0) + delta
+    db.execute(
+        update(Chapter)
+        .where(Chapter.id == chapter_id)
+        .values(word_count=case((word_count < 0, 0), else_=word_count))
+        .execution_options(synchronize_session=False)
+    )
+    db.expire(chapter, ["word_count"])
+    chapter.outline, _ = _assemble(db, chapter_id)
+    return chapter
+
+
+# ============= Paragraph Storage =============
+
+@router.post("/chapter/{chapter_id}/split", response_model=ChapterTextResponse)
+async def split_chapter(chapter_id: int, db: Session = Depends(get_db)):
+    """将章节当前正文拆分为段落（覆盖已有段落）"""
+    try:
+        logger.info(f"Splitting chapter {chapter_id} into paragraphs")
+        chapter = _get_chapter(db, chapter_id)
+        chapter_write_buffer.absorb(chapter)
+
+        db.query(ChapterParagraph).filter(ChapterParagraph.chapter_id == chapter_id).delete(synchronize_session=False)
+        lines = (chapter.outline or "").split(PARAGRAPH_SEPARATOR)
+        positions = keys_between(None, None, len(lines))
+        db.bulk_insert_mappings(
+            ChapterParagraph,
+            [
+                {"chapter_id": chapter_id, "position": pos, "content": line, "word_count": _count_words(line)}
+                for pos, line in zip(positions, lines)
+            ],
+        )
+        chapter.word_count = sum(_count_words(line) for line in lines)
+        db.commit()
+        publish_invalidation(InvalidationKind.CHAPTER, chapter_id, chapter.novel_id)
+
+        logger.info(f"Chapter {chapter_id} split into {len(lines)} paragraphs")
+        return ChapterTextResponse(
+            chapter_id=chapter_id,
+            content=chapter.outline or "",
+            word_count=chapter.word_count,
+            paragraph_count=len(lines),
+        )
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in split_chapter: {exc}")
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+@router.get("/chapter/{chapter_id}", response_model=ChapterParagraphPage)
+async def list_paragraphs(
+    chapter_id: int,
+    after: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """获取段落区间：after 为上一页最后一个 position（键集分页），或使用 offset"""
+    try:
+        query = db.query(ChapterParagraph).filter(ChapterParagraph.chapter_id == chapter_id)
+        if after is not None:
+            query = query.filter(ChapterParagraph.position > after)
+        query = query.order_by(ChapterParagraph.position)
+        if after is None and offset:
+            query = query.offset(offset)
+        paragraphs = query.limit(limit + 1).all()
+
+        has_more = len(paragraphs) > limit
+        paragraphs = paragraphs[:limit]
+        return ChapterParagraphPage(
+            chapter_id=chapter_id,
+            paragraphs=[ChapterParagraphResponse.model_validate(p) for p in paragraphs],
+            next_after=paragraphs[-1].position if has_more and paragraphs else None,
+        )
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in list_paragraphs: {exc}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+def _insert_position(db: Session, chapter_id: int, payload: ChapterParagraphCreate) -> str:
+    """按锚点与当前相邻段落计算新段落的 position"""
+    base = db.query(ChapterParagraph).filter(ChapterParagraph.chapter_id == chapter_id)
+    if payload.after_id is not None:
+        anchor = _get_paragraph(db, payload.after_id, chapter_id)
+        following = (
+            base.filter(ChapterParagraph.position > anchor.position)
+            .order_by(ChapterParagraph.position)
+            .first()
+        )
+        return key_between(anchor.position, following.position if following else None)
+    if payload.before_id is not None:
+        anchor = _get_paragraph(db, payload.before_id, chapter_id)
+        preceding = (
+            base.filter(ChapterParagraph.position < anchor.position)
+            .order_by(ChapterParagraph.position.desc())
+            .first()
+        )
+        return key_between(preceding.position if preceding else None, anchor.position)
+    _get_chapter(db, chapter_id)
+    last = base.order_by(ChapterParagraph.position.desc()).first()
+    return key_between(last.position if last else None, None)
+
+
+@router.post("/chapter/{chapter_id}", response_model=ChapterParagraphResponse, status_code=status.HTTP_201_CREATED)
+async def insert_paragraph(chapter_id: int, payload: ChapterParagraphCreate, db: Session = Depends(get_db)):
+    """在指定段落前/后插入新段落，只写入一行"""
+    try:
+        for _ in range(INSERT_ATTEMPTS):
+            paragraph = ChapterParagraph(
+                chapter_id=chapter_id,
+                position=_insert_position(db, chapter_id, payload),
+                content=payload.content,
+                word_count=_count_words(payload.content),
+            )
+            try:
+                with db.begin_nested():
+                    db.add(paragraph)
+                break
+            except IntegrityError:
+                logger.warning(f"Paragraph position {paragraph.position} taken in chapter {chapter_id}, retrying")
+        else:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Paragraph position conflict, please retry")
+
+        chapter = _sync_chapter(db, chapter_id, paragraph.word_count)
+        db.commit()
+        db.refresh(paragraph)
+        publish_invalidation(InvalidationKind.CHAPTER, chapter_id, chapter.novel_id)
+        return paragraph
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in insert_paragraph: {exc}")
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+@router.put("/{paragraph_id}", response_model=ChapterParagraphResponse)
+async def update_paragraph(paragraph_id: int, payload: ChapterParagraphUpdate, db: Session = Depends(get_db)):
+    """更新单个段落内容"""
+    try:
+        paragraph = _get_paragraph(db, paragraph_id, for_update=True)
+        new_count = _count_words(payload.content)
+        delta = new_count - paragraph.word_count
+        paragraph.content = payload.content
+        paragraph.word_count = new_count
+        chapter = _sync_chapter(db, paragraph.chapter_id, delta)
+        db.commit()
+        db.refresh(paragraph)
+        publish_invalidation(InvalidationKind.CHAPTER, chapter.id, chapter.novel_id)
+        return paragraph
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in update_paragraph: {exc}")
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+@router.delete("/{paragraph_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_paragraph(paragraph_id: int, db: Session = Depends(get_db)):
+    """删除单个段落"""
+    try:
+        paragraph = _get_paragraph(db, paragraph_id, for_update=True)
+        db.delete(paragraph)
+        chapter = _sync_chapter(db, paragraph.chapter_id, -paragraph.word_count)
+        db.commit()
+        publish_invalidation(InvalidationKind.CHAPTER, chapter.id, chapter.novel_id)
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in delete_paragraph: {exc}")
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+# ============= Reassembly =============
+
+def _assemble(db: Session, chapter_id: int) -> tuple[str, int]:
+    rows = (
+        db.query(ChapterParagraph.content)
+        .filter(ChapterParagraph.chapter_id == chapter_id)
+        .order_by(ChapterParagraph.position)
+        .all()
+    )
+    return PARAGRAPH_SEPARATOR.join(content for (content,) in rows), len(rows)
+
+
+@router.get("/chapter/{chapter_id}/text", response_model=ChapterTextResponse)
+async def get_chapter_text(chapter_id: int, db: Session = Depends(get_db)):
+    """按顺序拼接段落，返回完整正文"""
+    try:
+        chapter = _get_chapter(db, chapter_id)
+        content, count = _assemble(db, chapter_id)
+        return ChapterTextResponse(
+            chapter_id=chapter_id,
+            content=content,
+            word_count=chapter_write_buffer.snapshot(chapter)["word_count"],
+            paragraph_count=count,
+        )
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in get_chapter_text: {exc}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+@router.post("/chapter/{chapter_id}/materialize", response_model=ChapterTextResponse)
+async def materialize_chapter(chapter_id: int, db: Session = Depends(get_db)):
+    """按段落全量重算章节正文与字数（段落写入已增量同步，此接口用于校正）"""
+    try:
+        chapter = _get_chapter(db, chapter_id)
+        chapter_write_buffer.absorb(chapter)
+        content, count = _assemble(db, chapter_id)
+        chapter.outline = content
+        chapter.word_count = _count_words(content)
+        db.commit()
+        publish_invalidation(InvalidationKind.CHAPTER, chapter_id, chapter.novel_id)
+        logger.info(f"Chapter {chapter_id} materialized from {count} paragraphs")
+        return ChapterTextResponse(
+            chapter_id=chapter_id,
+            content=content,
+            word_count=chapter.word_count,
+            paragraph_count=count,
+        )
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in materialize_chapter: {exc}")
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
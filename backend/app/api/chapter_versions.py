@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, selectinload
 
 from ..core.database import get_db
+from ..core.invalidation import InvalidationKind, publish_invalidation
 from ..core.logger import logger
+from ..core.write_buffer import chapter_write_buffer
 from ..models.chapter import Chapter, ChapterVersion, ChapterEvaluation
+from ..services.chapter_blobs import build_version
 from ..schemas.chapter_version import (
     ChapterVersionCreate,
     ChapterVersionResponse,
@@ -33,14 +36,14 @@ async def create_version(payload: ChapterVersionCreate, db: Session = Depends(ge
         if not chapter:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
 
-        # 创建版本
-        version = ChapterVersion(
+        # 创建版本：正文按内容哈希去重存储
+        version = build_version(
+            db,
             chapter_id=payload.chapter_id,
+            content=payload.content,
             version_label=payload.version_label,
             provider=payload.provider,
-            content=payload.content,
         )
-        db.add(version)
         db.commit()
         db.refresh(version)
 
@@ -88,6 +91,57 @@ async def get_version(version_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
 
 
+@router.get("/{version_id}/content")
+async def read_version_content(
+    version_id: int,
+    start: int = Query(0, ge=0),
+    length: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+):
+    """按字节区间读取版本正文（外部存储使用 mmap / Range 读取）"""
+    try:
+        version = db.query(ChapterVersion).filter(ChapterVersion.id == version_id).first()
+        if not version:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
+
+        raw = None
+        if version.blob is not None:
+            total = version.blob.size
+        else:
+            raw = (version.legacy_content or "").encode("utf-8")
+            total = len(raw)
+        partial = bool(start or length)
+        if partial and start >= total:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{total}"},
+            )
+
+        if raw is None:
+            data = version.blob.read_bytes(start, length)
+        else:
+            data = raw[start:] if length is None else raw[start:start + length]
+    except HTTPException:
+        raise
+    except KeyError as exc:
+        logger.error(f"Blob missing for version {version_id}: {exc}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Version content missing") from exc
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in read_version_content: {exc}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+    headers = {"Accept-Ranges": "bytes"}
+    if partial:
+        headers["Content-Range"] = f"bytes {start}-{start + len(data) - 1}/{total}"
+    return Response(
+        content=data,
+        media_type="text/plain; charset=utf-8",
+        status_code=status.HTTP_206_PARTIAL_CONTENT if partial else status.HTTP_200_OK,
+        headers=headers,
+    )
+
+
 @router.post("/chapter/{chapter_id}/select/{version_id}", status_code=status.HTTP_200_OK)
 async def select_version(chapter_id: int, version_id: int, db: Session = Depends(get_db)):
     """设置章节的当前版本"""
@@ -106,12 +160,15 @@ async def select_version(chapter_id: int, version_id: int, db: Session = Depends
         if not version:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
 
+        # 先落下缓冲区中的待写内容，避免后台刷新覆盖本次选择
+        chapter_write_buffer.absorb(chapter)
         # 更新选中的版本
         chapter.selected_version_id = version_id
         # 同时更新章节的内容（可选，保持 outline 字段同步）
         chapter.outline = version.content
 
         db.commit()
+        publish_invalidation(InvalidationKind.CHAPTER, chapter_id, chapter.novel_id)
         logger.info(f"Version {version_id} selected for chapter {chapter_id}")
         return {"message": "Version selected successfully", "version_id": version_id}
     except HTTPException:
@@ -171,14 +228,15 @@ async def get_chapter_with_versions(chapter_id: int, db: Session = Depends(get_d
         if not chapter:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
 
+        values = chapter_write_buffer.snapshot(chapter)
         return ChapterWithVersionsResponse(
             id=chapter.id,
             novel_id=chapter.novel_id,
-            chapter_number=chapter.chapter_number,
-            title=chapter.title,
-            summary=chapter.real_summary,
-            word_count=chapter.word_count,
-            status=chapter.status.upper() if chapter.status else "DRAFT",
+            chapter_number=values["chapter_number"],
+            title=values["title"],
+            summary=values["real_summary"],
+            word_count=values["word_count"],
+            status=values["status"].upper() if values["status"] else "DRAFT",
             selected_version_id=chapter.selected_version_id,
             created_at=chapter.created_at,
             updated_at=chapter.updated_at,
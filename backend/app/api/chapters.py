@@ -1,19 +1,57 @@
 from __future__ import annotations
 
-from typing import List
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from ..core.database import get_db
+from ..core.invalidation import InvalidationKind, publish_invalidation
 from ..core.logger import logger
+from ..core.write_buffer import chapter_write_buffer
 from ..models.chapter import Chapter
 from ..schemas.chapter import ChapterCreate, ChapterResponse, ChapterUpdate
+from ..schemas.ordering import MoveRequest
+from ..services.reordering import display_value, display_values, move_item, order_by_rank, place_by_display
 
 router = APIRouter(prefix="/api/chapters", tags=["chapters"])
 
 
+def _build_response(
+    chapter: Chapter,
+    chapter_number: Optional[int] = None,
+    pending: Optional[Dict[str, Any]] = None,
+) -> ChapterResponse:
+    """Assemble a ChapterResponse, overlaying any buffered (unflushed) writes.
+
+    ``chapter_number`` overrides the stored display number when the caller
+    derived it from the chapter's rank position; ``pending`` passes buffered
+    values the caller already fetched for a whole page.
+    """
+    if pending is None:
+        pending = chapter_write_buffer.pending(chapter.id)
+    values = chapter_write_buffer.snapshot(chapter, pending=pending)
+    updated_at = chapter.updated_at
+    buffered_at = pending.get("buffered_at")
+    if buffered_at:
+        updated_at = datetime.fromtimestamp(buffered_at, tz=timezone.utc)
+    return ChapterResponse(
+        id=chapter.id,
+        novel_id=chapter.novel_id,
+        title=values["title"] or "",
+        chapter_number=chapter_number if chapter_number is not None else values["chapter_number"],
+        summary=values["real_summary"],
+        content=values["outline"],
+        word_count=values["word_count"],
+        status=values["status"].upper() if values["status"] else "DRAFT",
+        notes=None,
+        created_at=chapter.created_at,
+        updated_at=updated_at,
+    )
+
+
 @router.get("/", response_model=List[ChapterResponse])
 @router.get("", response_model=List[ChapterResponse])
 async def list_chapters(novel_id: str | None = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
@@ -22,24 +60,16 @@ async def list_chapters(novel_id: str | None = None, skip: int = 0, limit: int =
         logger.info(f"Fetching chapters with novel_id={novel_id}, skip={skip}, limit={limit}")
         query = db.query(Chapter)
         if novel_id:
-            query = query.filter(Chapter.novel_id == str(novel_id))
-        chapters = query.order_by(Chapter.chapter_number).offset(skip).limit(limit).all()
+            # 单部小说按 rank 排序，章节号由排序位置推导，移动后无需等待后台重排
+            query = order_by_rank(query.filter(Chapter.novel_id == str(novel_id)), Chapter)
+            chapters = query.offset(skip).limit(limit).all()
+            numbers = display_values(Chapter, chapters, skip)
+        else:
+            chapters = query.order_by(Chapter.chapter_number).offset(skip).limit(limit).all()
+            numbers = {}
+        pending = chapter_write_buffer.pending_many(c.id for c in chapters)
         logger.info(f"Retrieved {len(chapters)} chapters")
-        return [
-            ChapterResponse(
-                id=c.id,
-                novel_id=c.novel_id,
-                title=c.title or "",
-                chapter_number=c.chapter_number,
-                summary=c.real_summary,
-                content=c.outline,
-                word_count=c.word_count,
-                status=c.status.upper() if c.status else "DRAFT",
-                notes=None,
-                created_at=c.created_at,
-                updated_at=c.updated_at,
-            ) for c in chapters
-        ]
+        return [_build_response(c, numbers.get(c.id), pending.get(c.id, {})) for c in chapters]
     except SQLAlchemyError as exc:
         logger.error(f"Database error in list_chapters: {exc}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
@@ -60,19 +90,7 @@ async def get_chapter(chapter_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
     
     logger.info(f"Retrieved chapter: {chapter.title}")
-    return ChapterResponse(
-        id=chapter.id,
-        novel_id=chapter.novel_id,
-        title=chapter.title or "",
-        chapter_number=chapter.chapter_number,
-        summary=chapter.real_summary,
-        content=chapter.outline,
-        word_count=chapter.word_count,
-        status=chapter.status.upper() if chapter.status else "DRAFT",
-        notes=None,
-        created_at=chapter.created_at,
-        updated_at=chapter.updated_at,
-    )
+    return _build_response(chapter)
 
 
 @router.post("/", response_model=ChapterResponse, status_code=status.HTTP_201_CREATED)
@@ -91,23 +109,13 @@ async def create_chapter(payload: ChapterCreate, db: Session = Depends(get_db)):
             status=(data.get('status') or 'DRAFT').lower(),
             word_count=data.get('word_count') or 0,
         )
+        place_by_display(db, chapter, chapter.chapter_number)
         db.add(chapter)
         db.commit()
         db.refresh(chapter)
+        publish_invalidation(InvalidationKind.CHAPTER, chapter.id, chapter.novel_id)
         logger.info(f"Chapter created successfully: {chapter.id}")
-        return ChapterResponse(
-            id=chapter.id,
-            novel_id=chapter.novel_id,
-            title=chapter.title or "",
-            chapter_number=chapter.chapter_number,
-            summary=chapter.real_summary,
-            content=chapter.outline,
-            word_count=chapter.word_count,
-            status=chapter.status,
-            notes=None,
-            created_at=chapter.created_at,
-            updated_at=chapter.updated_at,
-        )
+        return _build_response(chapter)
     except SQLAlchemyError as exc:
         logger.error(f"Database error in create_chapter: {exc}")
         db.rollback()
@@ -125,36 +133,42 @@ async def update_chapter(chapter_id: int, payload: ChapterUpdate, db: Session =
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
 
         update_data = payload.model_dump(exclude_unset=True)
-        logger.debug(f"Update data: {update_data}")
+        logger.debug("Update data: %s", update_data)
+        columns = {}
         if 'title' in update_data:
-            chapter.title = update_data['title']
+            columns['title'] = update_data['title']
         if 'chapter_number' in update_data:
-            chapter.chapter_number = update_data['chapter_number']
+            columns['chapter_number'] = update_data['chapter_number']
         if 'summary' in update_data:
-            chapter.real_summary = update_data['summary']
+            columns['real_summary'] = update_data['summary']
         if 'content' in update_data:
-            chapter.outline = update_data['content']
+            columns['outline'] = update_data['content']
         if 'word_count' in update_data:
-            chapter.word_count = update_data['word_count']
+            columns['word_count'] = update_data['word_count']
         if 'status' in update_data:
-            chapter.status = update_data['status'].lower() if update_data['status'] else 'draft'
+            columns['status'] = update_data['status'].lower() if update_data['status'] else 'draft'
+
+        if columns.get('chapter_number') is not None:
+            # 修改章节号等同于移动：立即改写 rank（仅此一行），展示值随后由重排回写
+            place_by_display(db, chapter, columns['chapter_number'])
+            db.commit()
+
+        if chapter_write_buffer.enabled:
+            # 写后缓冲：合并到内存/Redis，由后台任务定期批量落库
+            chapter_write_buffer.put(chapter.id, columns)
+            publish_invalidation(InvalidationKind.CHAPTER, chapter.id, chapter.novel_id)
+            logger.info(f"Chapter update buffered: {chapter_id}")
+            return _build_response(chapter)
+
+        chapter_write_buffer.absorb(chapter)
+        for name, value in columns.items():
+            setattr(chapter, name, value)
 
         db.commit()
         db.refresh(chapter)
+        publish_invalidation(InvalidationKind.CHAPTER, chapter.id, chapter.novel_id)
         logger.info(f"Chapter updated successfully: {chapter_id}")
-        return ChapterResponse(
-            id=chapter.id,
-            novel_id=chapter.novel_id,
-            title=chapter.title or "",
-            chapter_number=chapter.chapter_number,
-            summary=chapter.real_summary,
-            content=chapter.outline,
-            word_count=chapter.word_count,
-            status=chapter.status.upper() if chapter.status else "DRAFT",
-            notes=None,
-            created_at=chapter.created_at,
-            updated_at=chapter.updated_at,
-        )
+        return _build_response(chapter)
     except HTTPException:
         raise
     except SQLAlchemyError as exc:
@@ -173,8 +187,10 @@ async def delete_chapter(chapter_id: int, db: Session = Depends(get_db)):
             logger.warning(f"Chapter not found for deletion: {chapter_id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
 
+        chapter_write_buffer.discard(chapter.id)
         db.delete(chapter)
         db.commit()
+        publish_invalidation(InvalidationKind.CHAPTER, chapter_id, chapter.novel_id)
         logger.info(f"Chapter deleted successfully: {chapter_id}")
     except HTTPException:
         raise
@@ -182,3 +198,26 @@ async def delete_chapter(chapter_id: int, db: Session = Depends(get_db)):
         logger.error(f"Database error in delete_chapter: {exc}")
         db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+@router.post("/{chapter_id}/move", response_model=ChapterResponse)
+async def move_chapter(chapter_id: int, payload: MoveRequest, db: Session = Depends(get_db)):
+    """Move a chapter before/after a sibling, rewriting only its own row."""
+    try:
+        logger.info(f"Moving chapter {chapter_id}: after={payload.after_id}, before={payload.before_id}")
+        chapter = db.query(Chapter).filter(Chapter.id == chapter_id).first()
+        if not chapter:
+            logger.warning(f"Chapter not found for move: {chapter_id}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
+
+        move_item(db, chapter, payload.after_id, payload.before_id)
+        db.commit()
+        db.refresh(chapter)
+        publish_invalidation(InvalidationKind.CHAPTER, chapter.id, chapter.novel_id)
+        return _build_response(chapter, display_value(db, chapter))
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in move_chapter: {exc}")
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
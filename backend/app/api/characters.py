@@ -7,9 +7,12 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from ..core.database import get_db
+from ..core.invalidation import InvalidationKind, publish_invalidation
 from ..core.logger import logger
 from ..models.character import Character
 from ..schemas.character import CharacterCreate, CharacterResponse, CharacterUpdate
+from ..schemas.ordering import MoveRequest
+from ..services.reordering import move_item, order_by_rank, place_by_display
 
 router = APIRouter(prefix="/api/characters", tags=["characters"])
 
@@ -22,7 +25,7 @@ async def list_characters(novel_id: str | None = None, skip: int = 0, limit: int
         logger.info(f"Fetching characters with novel_id={novel_id}, skip={skip}, limit={limit}")
         query = db.query(Character)
         if novel_id:
-            query = query.filter(Character.novel_id == str(novel_id))
+            query = order_by_rank(query.filter(Character.novel_id == str(novel_id)), Character)
         characters = query.offset(skip).limit(limit).all()
         logger.info(f"Retrieved {len(characters)} characters")
         # Build response objects to maintain schema compatibility
@@ -95,9 +98,11 @@ async def create_character(payload: CharacterCreate, db: Session = Depends(get_d
             relationship_to_protagonist=data.get('relationships'),
             extra={"description": data.get('description')} if data.get('description') else None,
         )
+        place_by_display(db, character, None)
         db.add(character)
         db.commit()
         db.refresh(character)
+        publish_invalidation(InvalidationKind.CHARACTER, character.id, character.novel_id)
         logger.info(f"Character created successfully: {character.id}")
         return CharacterResponse(
             id=character.id,
@@ -129,7 +134,7 @@ async def update_character(character_id: int, payload: CharacterUpdate, db: Sess
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Character not found")
 
         update_data = payload.model_dump(exclude_unset=True)
-        logger.debug(f"Update data: {update_data}")
+        logger.debug("Update data: %s", update_data)
         # Map update fields explicitly
         if 'name' in update_data:
             character.name = update_data['name']
@@ -150,6 +155,7 @@ async def update_character(character_id: int, payload: CharacterUpdate, db: Sess
 
         db.commit()
         db.refresh(character)
+        publish_invalidation(InvalidationKind.CHARACTER, character.id, character.novel_id)
         logger.info(f"Character updated successfully: {character_id}")
         return CharacterResponse(
             id=character.id,
@@ -182,6 +188,7 @@ async def delete_character(character_id: int, db: Session = Depends(get_db)):
 
         db.delete(character)
         db.commit()
+        publish_invalidation(InvalidationKind.CHARACTER, character_id, character.novel_id)
         logger.info(f"Character deleted successfully: {character_id}")
     except HTTPException:
         raise
@@ -189,3 +196,38 @@ async def delete_character(character_id: int, db: Session = Depends(get_db)):
         logger.error(f"Database error in delete_character: {exc}")
         db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+@router.post("/{character_id}/move", response_model=CharacterResponse)
+async def move_character(character_id: int, payload: MoveRequest, db: Session = Depends(get_db)):
+    """Move a character before/after a sibling, rewriting only its own row."""
+    try:
+        logger.info(f"Moving character {character_id}: after={payload.after_id}, before={payload.before_id}")
+        character = db.query(Character).filter(Character.id == character_id).first()
+        if not character:
+            logger.warning(f"Character not found for move: {character_id}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Character not found")
+
+        move_item(db, character, payload.after_id, payload.before_id)
+        db.commit()
+        db.refresh(character)
+        publish_invalidation(InvalidationKind.CHARACTER, character.id, character.novel_id)
+        return CharacterResponse(
+            id=character.id,
+            novel_id=character.novel_id,
+            name=character.name,
+            role=character.identity,
+            description=(character.extra or {}).get("description") if isinstance(character.extra, dict) else None,
+            personality=character.personality,
+            background=character.background,
+            appearance=character.appearance,
+            relationships=character.relationship_to_protagonist,
+            created_at=character.created_at,
+            updated_at=character.updated_at,
+        )
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in move_character: {exc}")
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
@@ -0,0 +1,31 @@
+import hmac
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from ..core.config import settings
+from ..core.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"], include_in_schema=False)
+
+
+def _authorized(request: Request) -> bool:
+    if not settings.METRICS_TOKEN:
+        return True
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode())
+
+
+@router.get("/metrics")
+def metrics(request: Request) -> Response:
+    """Prometheus scrape endpoint (aggregated across workers in multiprocess mode).
+
+    Guarded by ``METRICS_TOKEN`` when it is set.
+    """
+    if not _authorized(request):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -7,8 +7,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, selectinload
 
+from ..core.cache import cache
 from ..core.database import get_db
 from ..core.dependencies import get_current_user_or_demo
+from ..core.invalidation import InvalidationKind, publish_invalidation
 from ..core.logger import logger
 from ..models.novel import Novel, NovelBlueprint
 from ..models.user import User
@@ -55,18 +57,22 @@ async def list_novels(skip: int = 0, limit: int = 100, db: Session = Depends(get
     """Retrieve a paginated list of novels."""
     try:
         logger.info(f"Fetching novels with skip={skip}, limit={limit}")
-        novels = (
-            db.query(Novel)
-            .options(
-                selectinload(Novel.blueprint),
+
+        def _load():
+            novels = (
+                db.query(Novel)
+                .options(
+                    selectinload(Novel.blueprint),
+                )
+                .order_by(Novel.created_at.desc())
+                .offset(skip)
+                .limit(limit)
+                .all()
             )
-            .order_by(Novel.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
-        logger.info(f"Retrieved {len(novels)} novels")
-        return [_build_response(n) for n in novels]
+            logger.info(f"Retrieved {len(novels)} novels")
+            return [_build_response(n) for n in novels]
+
+        return await cache.get_or_compute(f"novels:list:{skip}:{limit}", _load, tags=("novels",))
     except SQLAlchemyError as exc:
         logger.error(f"Database error in list_novels: {exc}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
@@ -75,29 +81,29 @@ async def list_novels(skip: int = 0, limit: int = 100, db: Session = Depends(get
 @router.get("/{novel_id}", response_model=NovelResponse)
 async def get_novel(novel_id: UUID, db: Session = Depends(get_db)):
     """Retrieve a single novel by its identifier."""
-    try:
-        logger.info(f"Fetching novel with id={novel_id}")
-        novel = (
-            db.query(Novel)
-            .options(
-                selectinload(Novel.characters),
-                selectinload(Novel.chapters),
-                selectinload(Novel.plots),
-                selectinload(Novel.blueprint),
+    logger.info(f"Fetching novel with id={novel_id}")
+
+    def _load():
+        try:
+            # 响应只用到蓝图字段，不再预加载角色/章节/情节
+            novel = (
+                db.query(Novel)
+                .options(selectinload(Novel.blueprint))
+                .filter(Novel.id == str(novel_id))
+                .first()
             )
-            .filter(Novel.id == str(novel_id))
-            .first()
-        )
-    except SQLAlchemyError as exc:
-        logger.error(f"Database error in get_novel: {exc}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+        except SQLAlchemyError as exc:
+            logger.error(f"Database error in get_novel: {exc}")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+        if not novel:
+            logger.warning(f"Novel not found: {novel_id}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Novel not found")
+
+        logger.info(f"Retrieved novel: {novel.title}")
+        return _build_response(novel)
 
-    if not novel:
-        logger.warning(f"Novel not found: {novel_id}")
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Novel not found")
-    
-    logger.info(f"Retrieved novel: {novel.title}")
-    return _build_response(novel)
+    return await cache.get_or_compute(f"novel:{novel_id}", _load, tags=(f"novel:{novel_id}",))
 
 
 @router.post("/", response_model=NovelResponse, status_code=status.HTTP_201_CREATED)
@@ -145,6 +151,7 @@ async def create_novel(
 
         db.commit()
         db.refresh(novel)
+        publish_invalidation(InvalidationKind.NOVEL, novel.id)
         logger.info(f"Novel created successfully: {novel.id}")
         return _build_response(novel)
     except SQLAlchemyError as exc:
@@ -164,12 +171,13 @@ async def update_novel(novel_id: UUID, payload: NovelUpdate, db: Session = Depen
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Novel not found")
 
         update_data = payload.model_dump(exclude_unset=True)
-        logger.debug(f"Update data: {update_data}")
+        logger.debug("Update data: %s", update_data)
         for field, value in update_data.items():
             setattr(novel, field, value)
 
         db.commit()
         db.refresh(novel)
+        publish_invalidation(InvalidationKind.NOVEL, novel_id)
         logger.info(f"Novel updated successfully: {novel_id}")
         return _build_response(novel)
     except HTTPException:
@@ -192,6 +200,7 @@ async def delete_novel(novel_id: UUID, db: Session = Depends(get_db)):
 
         db.delete(novel)
         db.commit()
+        publish_invalidation(InvalidationKind.NOVEL, novel_id)
         logger.info(f"Novel deleted successfully: {novel_id}")
     except HTTPException:
         raise
@@ -9,7 +9,9 @@ from sqlalchemy.orm import Session
 from ..core.database import get_db
 from ..core.logger import logger
 from ..models.plot import Plot
+from ..schemas.ordering import MoveRequest
 from ..schemas.plot import PlotCreate, PlotResponse, PlotUpdate
+from ..services.reordering import display_value, display_values, move_item, order_by_rank, place_by_display
 
 router = APIRouter(prefix="/api/plots", tags=["plots"])
 
@@ -22,7 +24,12 @@ async def list_plots(novel_id: str | None = None, skip: int = 0, limit: int = 10
         logger.info(f"Fetching plots with novel_id={novel_id}, skip={skip}, limit={limit}")
         query = db.query(Plot)
         if novel_id:
-            query = query.filter(Plot.novel_id == str(novel_id))
+            # 单部小说按 rank 排序，order 由排序位置推导，移动后无需等待后台重排
+            query = order_by_rank(query.filter(Plot.novel_id == str(novel_id)), Plot)
+            plots = query.offset(skip).limit(limit).all()
+            orders = display_values(Plot, plots, skip)
+            logger.info(f"Retrieved {len(plots)} plots")
+            return [PlotResponse.model_validate(p).model_copy(update={"order": orders[p.id]}) for p in plots]
         plots = query.order_by(Plot.order).offset(skip).limit(limit).all()
         logger.info(f"Retrieved {len(plots)} plots")
         return plots
@@ -59,6 +66,8 @@ async def create_plot(payload: PlotCreate, db: Session = Depends(get_db)):
         data = payload.model_dump()
         data['novel_id'] = str(data['novel_id'])
         plot = Plot(**data)
+        # 显式给出 order 时按其插入对应位置，否则追加到末尾
+        place_by_display(db, plot, plot.order if "order" in payload.model_fields_set else None)
         db.add(plot)
         db.commit()
         db.refresh(plot)
@@ -81,9 +90,11 @@ async def update_plot(plot_id: int, payload: PlotUpdate, db: Session = Depends(g
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plot not found")
 
         update_data = payload.model_dump(exclude_unset=True)
-        logger.debug(f"Update data: {update_data}")
+        logger.debug("Update data: %s", update_data)
         for field, value in update_data.items():
             setattr(plot, field, value)
+        if update_data.get('order') is not None:
+            place_by_display(db, plot, update_data['order'])
 
         db.commit()
         db.refresh(plot)
@@ -116,3 +127,25 @@ async def delete_plot(plot_id: int, db: Session = Depends(get_db)):
         logger.error(f"Database error in delete_plot: {exc}")
         db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
+
+
+@router.post("/{plot_id}/move", response_model=PlotResponse)
+async def move_plot(plot_id: int, payload: MoveRequest, db: Session = Depends(get_db)):
+    """Move a plot before/after a sibling, rewriting only its own row."""
+    try:
+        logger.info(f"Moving plot {plot_id}: after={payload.after_id}, before={payload.before_id}")
+        plot = db.query(Plot).filter(Plot.id == plot_id).first()
+        if not plot:
+            logger.warning(f"Plot not found for move: {plot_id}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plot not found")
+
+        move_item(db, plot, payload.after_id, payload.before_id)
+        db.commit()
+        db.refresh(plot)
+        return PlotResponse.model_validate(plot).model_copy(update={"order": display_value(db, plot)})
+    except HTTPException:
+        raise
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error in move_plot: {exc}")
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)) from exc
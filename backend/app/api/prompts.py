@@ -3,8 +3,10 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from ..core.cache import cache
 from ..core.database import get_db
 from ..core.dependencies import get_current_admin, get_current_user
+from ..core.invalidation import InvalidationKind, publish_invalidation
 from ..models.prompt import Prompt
 from ..models.user import User
 from ..schemas.prompt import PromptCreate, PromptResponse, PromptUpdate
@@ -31,13 +33,17 @@ def get_prompt(
     _: User = Depends(get_current_user),
 ):
     """获取指定提示词。"""
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
-    if not prompt:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="提示词不存在",
-        )
-    return prompt
+
+    def _load():
+        prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
+        if not prompt:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="提示词不存在",
+            )
+        return PromptResponse.model_validate(prompt)
+
+    return cache.get_or_set(f"prompt:{prompt_id}", _load, tags=(f"prompt:{prompt_id}",))
 
 
 @router.get("/name/{name}", response_model=PromptResponse)
@@ -47,13 +53,20 @@ def get_prompt_by_name(
     _: User = Depends(get_current_user),
 ):
     """根据名称获取提示词。"""
+    cached = cache.get(f"prompt:name:{name}")
+    if cached is not None:
+        return cached
+
     prompt = db.query(Prompt).filter(Prompt.name == name).first()
     if not prompt:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="提示词不存在",
         )
-    return prompt
+    response = PromptResponse.model_validate(prompt)
+    # 以 id 打标签，改名/删除时旧名称的缓存一并失效
+    cache.set(f"prompt:name:{name}", response, tags=(f"prompt:{prompt.id}",))
+    return response
 
 
 @router.post("/", response_model=PromptResponse)
@@ -99,6 +112,7 @@ def update_prompt(
 
     db.commit()
     db.refresh(prompt)
+    publish_invalidation(InvalidationKind.PROMPT, prompt_id)
 
     return prompt
 
@@ -119,5 +133,6 @@ def delete_prompt(
 
     db.delete(prompt)
     db.commit()
+    publish_invalidation(InvalidationKind.PROMPT, prompt_id)
 
     return {"message": "提示词已删除"}
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from ..core.database import get_db
 from ..core.dependencies import get_current_admin, get_current_user
+from ..core.invalidation import InvalidationKind, publish_invalidation
 from ..core.security import hash_password
 from ..models.user import User
 from ..schemas.user import UserCreate, UserResponse, UserUpdate
@@ -98,6 +99,7 @@ def update_user(
 
     db.commit()
     db.refresh(user)
+    publish_invalidation(InvalidationKind.USER, user_id)
 
     return user
 
@@ -118,5 +120,6 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    publish_invalidation(InvalidationKind.USER, user_id)
 
     return {"message": "用户已删除"}
@@ -113,7 +113,7 @@ async def update_world_setting(world_id: int, payload: WorldSettingUpdate, db: S
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="World setting not found")
 
         update_data = payload.model_dump(exclude_unset=True)
-        logger.debug(f"Update data: {update_data}")
+        logger.debug("Update data: %s", update_data)
         for field, value in update_data.items():
             setattr(world_setting, field, value)
 
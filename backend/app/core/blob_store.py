@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import mmap
+import os
+import tempfile
+from datetime import datetime, timezone
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from .config import settings
+
+try:
+    import boto3  # type: ignore
+except ImportError:
+    boto3 = None
+
+
+class BlobStore(ABC):
+    """Content-addressed byte store for chapter version bodies.
+
+    Keys are SHA-256 hex digests, so objects are immutable and writes are
+    idempotent. ``get`` supports ranged reads via ``start``/``length``.
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        """Store bytes under a key; an existing object only gets its mtime refreshed.
+
+        The refresh keeps an object that a new version is about to reference
+        out of the garbage collector's grace window.
+        """
+
+    @abstractmethod
+    def get(self, key: str, start: int = 0, length: Optional[int] = None) -> bytes:
+        """Read a byte range of an object; raises KeyError if missing."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove an object if present."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether an object is stored under the key."""
+
+    @abstractmethod
+    def keys(self) -> Iterator[str]:
+        """Iterate over all stored keys."""
+
+    @abstractmethod
+    def modified(self, key: str) -> Optional[float]:
+        """Last write time of an object (epoch seconds), or None if missing."""
+
+
+class LocalBlobStore(BlobStore):
+    """Filesystem backend; objects are read through ``mmap``."""
+
+    name = "local"
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        # Two-level fan-out keeps directories small: ab/cd/abcd...
+        return self.root / key[:2] / key[2:4] / key
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if path.exists():
+            os.utime(path)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def get(self, key: str, start: int = 0, length: Optional[int] = None) -> bytes:
+        path = self._path(key)
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError as exc:
+            raise KeyError(key) from exc
+        with fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size == 0 or start >= size:
+                return b""
+            end = size if length is None else min(size, start + length)
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[start:end]
+
+    def delete(self, key: str) -> None:
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def keys(self) -> Iterator[str]:
+        if not self.root.exists():
+            return iter(())
+        return (p.name for p in self.root.glob("*/*/*") if p.is_file() and not p.name.startswith(".tmp-"))
+
+    def modified(self, key: str) -> Optional[float]:
+        try:
+            return self._path(key).stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+
+class LocalS3Client:
+    """Minimal boto3-compatible S3 client backed by a directory.
+
+    Stands in for MinIO/S3 in development and tests so the S3 code path can
+    be exercised without network access.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **_kwargs) -> Dict:  # noqa: N803
+        path = self.root / Bucket / Key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(Body)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None, **_kwargs) -> Dict:  # noqa: N803
+        path = self.root / Bucket / Key
+        if not path.exists():
+            raise KeyError(Key)
+        data = path.read_bytes()
+        if Range:
+            first, _, last = Range.removeprefix("bytes=").partition("-")
+            data = data[int(first): int(last) + 1 if last else None]
+        return {"Body": _Body(data)}
+
+    def head_object(self, Bucket: str, Key: str, **_kwargs) -> Dict:  # noqa: N803
+        path = self.root / Bucket / Key
+        if not path.exists():
+            raise KeyError(Key)
+        stat = path.stat()
+        return {
+            "ContentLength": stat.st_size,
+            "LastModified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        }
+
+    def delete_object(self, Bucket: str, Key: str, **_kwargs) -> Dict:  # noqa: N803
+        (self.root / Bucket / Key).unlink(missing_ok=True)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", **_kwargs) -> Dict:  # noqa: N803
+        base = self.root / Bucket
+        contents = [
+            {"Key": str(p.relative_to(base))}
+            for p in base.rglob("*")
+            if p.is_file() and str(p.relative_to(base)).startswith(Prefix)
+        ] if base.exists() else []
+        return {"Contents": contents, "IsTruncated": False}
+
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self) -> bytes:
+        return self._data
+
+
+class S3BlobStore(BlobStore):
+    """S3-compatible backend using a boto3-style client."""
+
+    name = "s3"
+
+    def __init__(self, client, bucket: str, prefix: str = "chapter-blobs/"):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def put(self, key: str, data: bytes) -> None:
+        # S3 cannot touch an object; rewriting the same bytes refreshes LastModified
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get(self, key: str, start: int = 0, length: Optional[int] = None) -> bytes:
+        kwargs = {}
+        if start or length is not None:
+            end = "" if length is None else str(start + length - 1)
+            kwargs["Range"] = f"bytes={start}-{end}"
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key, **kwargs)
+        except Exception as exc:  # noqa: BLE001
+            raise KeyError(key) from exc
+        return response["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except Exception:  # noqa: BLE001
+            return False
+
+    def keys(self) -> Iterator[str]:
+        kwargs = {"Bucket": self.bucket, "Prefix": self.prefix}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            for item in response.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
+            if not response.get("IsTruncated"):
+                break
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def modified(self, key: str) -> Optional[float]:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except Exception:  # noqa: BLE001
+            return None
+        return response["LastModified"].timestamp()
+
+
+_stores: Dict[str, BlobStore] = {}
+
+
+def get_blob_store(name: Optional[str] = None) -> Optional[BlobStore]:
+    """Return the store for a backend name (default: configured backend).
+
+    ``"database"`` means bodies stay inline in ``chapter_blobs.content`` and
+    no external store is used.
+    """
+    name = name or settings.BLOB_STORE_BACKEND
+    if name == "database":
+        return None
+    if name not in _stores:
+        if name == "local":
+            _stores[name] = LocalBlobStore(settings.BLOB_STORE_PATH)
+        elif name == "s3":
+            if settings.BLOB_STORE_S3_ENDPOINT.startswith("file://"):
+                client = LocalS3Client(settings.BLOB_STORE_S3_ENDPOINT.removeprefix("file://"))
+            elif boto3 is not None:
+                client = boto3.client("s3", endpoint_url=settings.BLOB_STORE_S3_ENDPOINT or None)
+            else:
+                raise RuntimeError("boto3 is required for the s3 blob store backend")
+            _stores[name] = S3BlobStore(client, settings.BLOB_STORE_S3_BUCKET)
+        else:
+            raise ValueError(f"Unknown blob store backend: {name}")
+    return _stores[name]
+
+
+def register_blob_store(store: BlobStore) -> None:
+    """Override the instance used for a backend name (tests, custom setups)."""
+    _stores[store.name] = store
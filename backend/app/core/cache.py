@@ -1,47 +1,343 @@
+"""In-process LRU cache with TTL, tags and an optional Redis L2 tier.
+
+The L1 tier is bounded by entry count and by (estimated) memory; entries
+expire individually. Every entry may carry tags so a write can evict all
+derived entries at once (``invalidate_tags("novel:<id>")``). When
+``CACHE_L2_ENABLED`` is set, values are also written to Redis so other
+workers can warm their L1 from it; the tags travel with the value so a
+warmed copy is still evicted by ``invalidate_tags``.
+
+Cached values are shared between callers and must be treated as immutable;
+cache response models or plain data, never live ORM objects.
+"""
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Any, Optional
+import asyncio
+import inspect
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
 
-# Simple in-memory cache using functools
-# For production, consider using Redis
+from .config import settings
+from .logger import logger
+from .metrics import observe_cache
+from .timing import timed
 
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
 
-@lru_cache(maxsize=128)
-def get_cached_model(model_id: str) -> Optional[Any]:
-    """Cache model lookups."""
-    return None
+_MISSING = object()
 
 
-def invalidate_cache(cache_key: str) -> None:
-    """Invalidate a specific cache entry."""
-    # This would be implemented with Redis in production
-    pass
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    l2_hits: int = 0
+    sets: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: Optional[float]
+    size: int
+    tags: frozenset
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:  # noqa: BLE001
+        return 1024
 
 
 class CacheManager:
-    """Simple cache manager for development."""
-    
-    def __init__(self):
-        self._cache = {}
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Get a value from cache."""
-        return self._cache.get(key)
-    
-    def set(self, key: str, value: Any, ttl: int = 300) -> None:
-        """Set a value in cache with TTL (time to live in seconds)."""
-        self._cache[key] = value
-        # Note: TTL not implemented in this simple version
-    
+    """Thread-safe LRU cache with per-entry TTL, tag invalidation and stats."""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: Optional[float] = 300,
+        redis_client=None,
+        namespace: str = "cache",
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+        self._redis = redis_client
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._async_locks: Dict[str, asyncio.Lock] = {}
+        self._sync_locks: Dict[str, threading.Lock] = {}
+        self.stats = CacheStats()
+
+    # ----- L1 bookkeeping (caller holds self._lock) -----
+
+    def _remove(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return entry
+
+    def _evict_overflow(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _store_local(self, key: str, value: Any, ttl: Optional[float], tags: Iterable[str]) -> None:
+        size = _estimate_size(value)
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            entry = _Entry(value=value, expires_at=expires_at, size=size, tags=frozenset(tags))
+            self._entries[key] = entry
+            self._bytes += size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._evict_overflow()
+
+    # ----- L2 (Redis) -----
+
+    def _l2_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _l2_tag_key(self, tag: str) -> str:
+        return f"{self.namespace}:tag:{tag}"
+
+    def _l2_call(self, operation: str, func: Callable[[], Any]) -> Any:
+        if self._redis is None:
+            return None
+        try:
+            return func()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Cache L2 {operation} failed, disabling Redis tier: {exc}")
+            self._redis = None
+            return None
+
+    def _l2_get(self, key: str) -> Tuple[Any, Tuple[str, ...]]:
+        """``(value, tags)`` stored in Redis, or ``(_MISSING, ())``."""
+        raw = self._l2_call("get", lambda: self._redis.get(self._l2_key(key)))
+        if raw is None:
+            return _MISSING, ()
+        try:
+            value, tags = pickle.loads(raw)
+        except Exception:  # noqa: BLE001
+            return _MISSING, ()
+        return value, tuple(tags)
+
+    def _l2_set(self, key: str, value: Any, ttl: Optional[float], tags: Iterable[str]) -> None:
+        if self._redis is None:
+            return
+
+        def _write():
+            pipe = self._redis.pipeline()
+            payload = pickle.dumps((value, tuple(tags)), protocol=pickle.HIGHEST_PROTOCOL)
+            if ttl:
+                pipe.setex(self._l2_key(key), int(ttl), payload)
+            else:
+                pipe.set(self._l2_key(key), payload)
+            for tag in tags:
+                pipe.sadd(self._l2_tag_key(tag), key)
+            pipe.execute()
+
+        self._l2_call("set", _write)
+
+    # ----- public API -----
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a cached value, consulting Redis on an L1 miss."""
+        with timed("cache"):
+            return self._get(key, default)
+
+    def _get(self, key: str, default: Any) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                    self._remove(key)
+                    self.stats.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    observe_cache(self.namespace, "memory", True)
+                    return entry.value
+        observe_cache(self.namespace, "memory", False)
+
+        if self._redis is None:
+            with self._lock:
+                self.stats.misses += 1
+            return default
+
+        value, tags = self._l2_get(key)
+        observe_cache(self.namespace, "redis", value is not _MISSING)
+        if value is not _MISSING:
+            ttl = self._l2_call("ttl", lambda: self._redis.ttl(self._l2_key(key)))
+            self._store_local(key, value, ttl if ttl and ttl > 0 else self.default_ttl, tags)
+            with self._lock:
+                self.stats.hits += 1
+                self.stats.l2_hits += 1
+            return value
+
+        with self._lock:
+            self.stats.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        """Set a value with a TTL in seconds (``None`` = default, ``0`` = no expiry)."""
+        ttl = self.default_ttl if ttl is None else ttl
+        tags = tuple(tags)
+        with timed("cache"):
+            self._store_local(key, value, ttl, tags)
+            self._l2_set(key, value, ttl, tags)
+        with self._lock:
+            self.stats.sets += 1
+
     def delete(self, key: str) -> None:
-        """Delete a key from cache."""
-        self._cache.pop(key, None)
-    
+        """Delete a key from both tiers."""
+        with self._lock:
+            self._remove(key)
+        self._l2_call("delete", lambda: self._redis.delete(self._l2_key(key)))
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Evict every entry carrying any of ``tags``; returns local evictions."""
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    if self._remove(key) is not None:
+                        removed += 1
+            self.stats.invalidations += removed
+
+        if self._redis is not None:
+            def _drop():
+                for tag in tags:
+                    tag_key = self._l2_tag_key(tag)
+                    keys = [self._l2_key(k.decode() if isinstance(k, bytes) else k) for k in self._redis.smembers(tag_key)]
+                    self._redis.delete(tag_key, *keys)
+
+            self._l2_call("invalidate", _drop)
+        return removed
+
     def clear(self) -> None:
-        """Clear all cache."""
-        self._cache.clear()
+        """Clear the local tier (Redis entries expire on their own)."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Synchronous read-through; concurrent threads compute a key only once."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            lock = self._sync_locks.setdefault(key, threading.Lock())
+        with lock:
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = compute()
+                self.set(key, value, ttl, tags)
+        with self._lock:
+            self._sync_locks.pop(key, None)
+        return value
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any | Awaitable[Any]],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Async read-through with a per-key lock so a miss is computed once.
+
+        ``compute`` may be a plain function or a coroutine function; plain
+        functions run inline (they typically use the request's DB session).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        lock = self._async_locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                value = self.get(key, _MISSING)
+                if value is _MISSING:
+                    value = compute()
+                    if inspect.isawaitable(value):
+                        value = await value
+                    self.set(key, value, ttl, tags)
+        finally:
+            if not lock.locked():
+                self._async_locks.pop(key, None)
+        return value
+
+    def info(self) -> Dict[str, Any]:
+        """Stats snapshot for admin/metrics endpoints."""
+        with self._lock:
+            data = asdict(self.stats)
+            data.update(
+                entries=len(self._entries),
+                bytes=self._bytes,
+                hit_ratio=round(self.stats.hit_ratio, 4),
+                l2_enabled=self._redis is not None,
+            )
+        return data
+
+
+def _create_redis_client():
+    if not settings.CACHE_L2_ENABLED or redis is None:
+        return None
+    try:
+        client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        client.ping()
+        return client
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(f"Redis cache tier unavailable, using in-process cache only: {exc}")
+        return None
+
+
+def invalidate_cache(cache_key: str) -> None:
+    """Invalidate a specific cache entry."""
+    cache.delete(cache_key)
 
 
 # Global cache instance
-cache = CacheManager()
+cache = CacheManager(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    default_ttl=settings.CACHE_DEFAULT_TTL,
+    redis_client=_create_redis_client(),
+)
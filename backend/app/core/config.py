@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -35,23 +35,122 @@ class Settings(BaseSettings):
     APP_NAME: str = "AI Novel Platform"
     DEBUG: bool = True
 
+    # Logging (queued, non-blocking). LOG_FILE_ENABLED defaults to "not DEBUG".
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_DIR: str = "logs"
+    LOG_FILE_ENABLED: Optional[bool] = None
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
+    LOG_QUEUE_SIZE: int = 10000
+    # Fraction of requests whose per-request INFO lines are kept
+    LOG_SAMPLE_RATE: float = 1.0
+
     # Security
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 hours
 
+    # Password hashing (bcrypt cost; stored hashes are upgraded on next login)
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_MAX_PER_ACCOUNT: int = 3
+
     # Admin
     ADMIN_DEFAULT_USERNAME: str = "admin"
     ADMIN_DEFAULT_PASSWORD: str = "admin123"
     ALLOW_USER_REGISTRATION: bool = False
 
-    # Quota
+    # Quota (AI calls per user per day; 0 disables)
     DAILY_REQUEST_LIMIT: int = 100
 
+    # Usage counters (UsageMetric / UserDailyRequest): database | memory | redis
+    COUNTER_BACKEND: str = "memory"
+    COUNTER_FLUSH_SECONDS: float = 5.0
+
+    # Token usage ledger (batched writer + hourly/daily rollups)
+    TOKEN_LEDGER_ENABLED: bool = True
+    TOKEN_LEDGER_FLUSH_SECONDS: float = 2.0
+    TOKEN_LEDGER_BATCH_SIZE: int = 500
+    TOKEN_LEDGER_MAX_PENDING: int = 10000
+
+    # Sliding-window rate limits: route group -> "count/period"
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | redis
+    RATE_LIMITS: Dict[str, str] = {"default": "300/minute", "ai": "30/minute", "auth": "20/minute"}
+    # Per-identity overrides, e.g. {"user:42": {"ai": "120/minute"}, "key:<sha256[:16]>": {...}}
+    RATE_LIMIT_OVERRIDES: Dict[str, Dict[str, str]] = {}
+
     # Caching (Redis)
     AI_CACHE_ENABLED: bool = False
+
+    # LLM record/replay cassettes: off | record | replay (latency scale 0 = instant)
+    AI_CASSETTE_MODE: str = "off"
+    AI_CASSETTE_PATH: str = "./data/cassettes/llm.jsonl"
+    AI_CASSETTE_LATENCY_SCALE: float = 1.0
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
 
+    # In-process read cache (LRU + TTL), optionally backed by Redis
+    CACHE_MAX_ENTRIES: int = 2048
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_DEFAULT_TTL: float = 300.0
+    CACHE_L2_ENABLED: bool = False
+    # Cross-worker cache invalidation: memory (single process) | redis (pub/sub)
+    INVALIDATION_BUS_BACKEND: str = "memory"
+    INVALIDATION_CHANNEL: str = "ai-novel:invalidate"
+    # HTTP response cache for read-heavy GET endpoints
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: float = 60.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    # Admin dashboard aggregates (seconds)
+    ADMIN_STATS_TTL: float = 30.0
+    # Authenticated principal cache (seconds; 0 disables)
+    PRINCIPAL_CACHE_TTL: float = 60.0
+
+    # Chapter write-behind buffer (coalesces rapid autosaves)
+    CHAPTER_WRITE_BUFFER_ENABLED: bool = False
+    CHAPTER_WRITE_BUFFER_FLUSH_SECONDS: float = 5.0
+    CHAPTER_WRITE_BUFFER_BACKEND: str = "memory"  # memory | redis
+
+    # Chapter version body storage
+    BLOB_STORE_BACKEND: str = "database"  # database | local | s3
+    BLOB_STORE_PATH: str = "./data/blobs"
+    BLOB_STORE_S3_BUCKET: str = "ai-novel"
+    BLOB_STORE_S3_ENDPOINT: str = ""  # file:///path uses the local S3 stand-in
+    BLOB_GC_GRACE_SECONDS: int = 3600  # GC leaves younger blob rows and objects alone
+
+    # Fractional-rank ordering (characters / plots / chapters)
+    RANK_REBALANCE_INTERVAL_SECONDS: float = 300.0
+
+    # Prometheus metrics at /metrics (set PROMETHEUS_MULTIPROC_DIR for multi-worker)
+    METRICS_ENABLED: bool = True
+    METRICS_SAMPLE_SECONDS: float = 1.0
+    METRICS_TOKEN: str = ""  # when set, /metrics requires "Authorization: Bearer <token>"
+    # Server-Timing header; requests slower than SERVER_TIMING_LOG_MS are logged
+    SERVER_TIMING_ENABLED: bool = True
+    SERVER_TIMING_LOG_MS: float = 500.0
+
+    # Local tracing: head sampling ratio plus tail sampling of errors/slow traces
+    TRACING_ENABLED: bool = True
+    TRACE_SAMPLE_RATE: float = 0.05
+    TRACE_TAIL_SAMPLING: bool = True
+    TRACE_TAIL_LATENCY_MS: float = 1000.0
+    TRACE_BUFFER_SIZE: int = 200
+    TRACE_EXPORT_FILE: str = ""
+
+    # On-demand profiling of single requests carrying an admin-issued profiling token
+    PROFILING_ENABLED: bool = True
+    PROFILE_SAMPLE_INTERVAL_MS: float = 1.0
+    PROFILE_BUFFER_SIZE: int = 20
+    PROFILE_TOKEN_TTL_SECONDS: int = 900
+    PROFILE_TOKEN_BACKEND: str = "memory"  # memory | redis
+    PROFILE_EXPORT_DIR: str = ""
+
+    # Event loop watchdog: lag heartbeat plus stack capture when the loop is blocked
+    LOOP_WATCHDOG_ENABLED: bool = True
+    LOOP_WATCHDOG_INTERVAL_MS: float = 100.0
+    LOOP_BLOCK_THRESHOLD_MS: float = 250.0
+
     model_config = SettingsConfigDict(
         env_file=(
             # Project root .env
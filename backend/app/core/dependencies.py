@@ -1,13 +1,23 @@
+import functools
+import inspect
+import typing
+from dataclasses import dataclass
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
 from ..core.config import settings
 from ..core.database import get_db
-from ..core.security import decode_access_token, hash_password
+from ..core.principals import load_principal, principal_key
+from ..core.rate_limit import sliding_limiter
+from ..core.password_hasher import password_hasher
+from ..core.security import decode_access_token
 from ..models.user import User
+from ..services.counters import counter_aggregator
+from ..services.quota import consume_daily_request
+from ..services.token_ledger import bind_usage_user
 
 security = HTTPBearer()
 security_optional = HTTPBearer(auto_error=False)
@@ -37,7 +47,12 @@ async def get_current_user(
             detail="无效的认证凭证",
         )
 
-    user = db.query(User).filter(User.id == user_lookup_id).first()
+    user = load_principal(
+        db,
+        principal_key("user", payload),
+        lambda: db.query(User).filter(User.id == user_lookup_id).first(),
+        lambda u: [f"user:{u.id}"],
+    )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,20 +88,30 @@ async def get_current_user_or_demo(
             detail="未认证的请求",
         )
 
-    # 确保存在 demo 用户（仅用于开发环境的无登录使用场景）
+    # 确保存在 demo 用户（仅用于开发环境的无登录使用场景）；结果进入主体缓存，避免每次请求查询
     demo_username = "demo"
-    demo = db.query(User).filter(User.username == demo_username).first()
+
+    def demo_tags(user: User) -> list:
+        return [f"user:{user.id}"]
+
+    demo = load_principal(
+        db,
+        "principal:demo",
+        lambda: db.query(User).filter(User.username == demo_username).first(),
+        demo_tags,
+    )
     if demo is None:
         demo = User(
             username=demo_username,
             email=None,
-            hashed_password=hash_password("demo"),
+            hashed_password=await password_hasher.hash("demo"),
             is_admin=False,
             is_active=True,
         )
         db.add(demo)
         db.commit()
         db.refresh(demo)
+        demo = load_principal(db, "principal:demo", lambda: demo, demo_tags)
 
     return demo
 
@@ -101,3 +126,74 @@ async def get_current_admin(
             detail="需要管理员权限",
         )
     return current_user
+
+
+# 匿名调用的每日额度按滚动 24 小时窗口计算
+ANONYMOUS_QUOTA_WINDOW_SECONDS = 86400
+
+
+@dataclass
+class DailyQuota:
+    """本次请求的 AI 配额主体：登录用户按用户计数，匿名调用按客户端标识（API Key / IP）计数。"""
+
+    db: Session
+    user: Optional[User]
+    identity: str
+
+    def charge(self) -> None:
+        """计入一次 AI 调用；额度用尽时抛出 429（管理员不受限）。"""
+        counter_aggregator.incr_metric("ai_requests")
+        limit = settings.DAILY_REQUEST_LIMIT
+        if limit <= 0 or (self.user is not None and self.user.is_admin):
+            return
+        if self.user is not None:
+            allowed = consume_daily_request(self.db, self.user.id, limit) is not None
+        else:
+            allowed = sliding_limiter.backend.hit(
+                f"quota:{self.identity}", limit, ANONYMOUS_QUOTA_WINDOW_SECONDS
+            )[0]
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"今日 AI 调用次数已达上限（{limit} 次）",
+            )
+
+
+async def enforce_daily_quota(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional),
+    db: Session = Depends(get_db),
+) -> DailyQuota:
+    """确定本次 AI 调用的配额主体，并将 token 用量归属到登录用户（匿名调用不归属）。
+
+    带凭证的请求按 get_current_user 严格校验；无凭证的请求不再回退到 demo 用户，
+    否则所有匿名调用方会共用同一份额度。实际计数由 charges_daily_quota 在参数校验之后进行。
+    """
+    user = await get_current_user(credentials, db) if credentials is not None else None  # type: ignore[arg-type]
+    bind_usage_user(user.id if user is not None else None)
+    return DailyQuota(db=db, user=user, identity=sliding_limiter.identity(request))
+
+
+def charges_daily_quota(endpoint):
+    """端点装饰器：请求参数与请求体校验通过后、端点执行前扣减每日 AI 配额。
+
+    FastAPI 在校验请求体之前就会执行依赖，放在 dependencies=[...] 中的计数会让 422 请求也占用额度；
+    这里把 enforce_daily_quota 作为额外的关键字参数注入，在端点入口处才调用 charge()。
+    """
+    signature = inspect.signature(endpoint)
+    hints = typing.get_type_hints(endpoint)
+    parameters = [p.replace(annotation=hints.get(p.name, p.annotation)) for p in signature.parameters.values()]
+    parameters.append(inspect.Parameter(
+        "_daily_quota", inspect.Parameter.KEYWORD_ONLY,
+        default=Depends(enforce_daily_quota), annotation=DailyQuota,
+    ))
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, _daily_quota: DailyQuota, **kwargs):
+        _daily_quota.charge()
+        return await endpoint(*args, **kwargs)
+
+    wrapper.__signature__ = signature.replace(
+        parameters=parameters, return_annotation=hints.get("return", signature.return_annotation)
+    )
+    return wrapper
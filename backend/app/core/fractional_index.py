@@ -0,0 +1,185 @@
+"""Lexicographic fractional indexing.
+
+Order keys are base-62 strings that sort correctly with plain byte-wise
+comparison, and a new key can always be generated between any two existing
+ones. Moving or inserting an item therefore rewrites only that item's row.
+
+Keys consist of a variable-length integer part (the head character encodes
+its length) followed by an optional fractional part, so appending at the
+end grows keys logarithmically instead of linearly.
+"""
+from __future__ import annotations
+
+from typing import List, Optional
+
+from sqlalchemy import String
+
+BASE_62_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_SMALLEST_INTEGER = "A" + BASE_62_DIGITS[0] * 26
+
+# Rank columns need byte-wise ordering; the default PostgreSQL/MySQL collations do not provide it.
+RANK_TYPE = (
+    String(255)
+    .with_variant(String(255, collation="C"), "postgresql")
+    .with_variant(String(255, collation="utf8mb4_bin"), "mysql")
+)
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    digits = BASE_62_DIGITS
+    zero = digits[0]
+    if b is not None and a >= b:
+        raise ValueError(f"{a!r} >= {b!r}")
+    if a.endswith(zero) or (b is not None and b.endswith(zero)):
+        raise ValueError("trailing zero")
+    if b:
+        # Skip the common prefix (treating a as zero-padded)
+        n = 0
+        while (a[n] if n < len(a) else zero) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = digits.index(a[0]) if a else 0
+    digit_b = digits.index(b[0]) if b is not None else len(digits)
+    if digit_b - digit_a > 1:
+        return digits[round(0.5 * (digit_a + digit_b))]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return digits[digit_a] + _midpoint(a[1:], None)
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"invalid order key head: {head!r}")
+
+
+def _integer_part(key: str) -> str:
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"invalid order key: {key!r}")
+    return key[:length]
+
+
+def _validate(key: str) -> None:
+    if key == _SMALLEST_INTEGER:
+        raise ValueError(f"invalid order key: {key!r}")
+    integer = _integer_part(key)
+    if key[len(integer):].endswith(BASE_62_DIGITS[0]):
+        raise ValueError(f"invalid order key: {key!r}")
+
+
+def _increment_integer(x: str) -> Optional[str]:
+    digits = BASE_62_DIGITS
+    head, digs = x[0], list(x[1:])
+    carry = True
+    for i in reversed(range(len(digs))):
+        d = digits.index(digs[i]) + 1
+        if d == len(digits):
+            digs[i] = digits[0]
+        else:
+            digs[i] = digits[d]
+            carry = False
+            break
+    if not carry:
+        return head + "".join(digs)
+    if head == "Z":
+        return "a" + digits[0]
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digs.append(digits[0])
+    else:
+        digs.pop()
+    return head + "".join(digs)
+
+
+def _decrement_integer(x: str) -> Optional[str]:
+    digits = BASE_62_DIGITS
+    head, digs = x[0], list(x[1:])
+    borrow = True
+    for i in reversed(range(len(digs))):
+        d = digits.index(digs[i]) - 1
+        if d == -1:
+            digs[i] = digits[-1]
+        else:
+            digs[i] = digits[d]
+            borrow = False
+            break
+    if not borrow:
+        return head + "".join(digs)
+    if head == "a":
+        return "Z" + digits[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digs.append(digits[-1])
+    else:
+        digs.pop()
+    return head + "".join(digs)
+
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """Return a key strictly between ``a`` and ``b`` (``None`` = open end)."""
+    if a is not None:
+        _validate(a)
+    if b is not None:
+        _validate(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"{a!r} >= {b!r}")
+
+    if a is None:
+        if b is None:
+            return "a" + BASE_62_DIGITS[0]
+        ib = _integer_part(b)
+        fb = b[len(ib):]
+        if ib == _SMALLEST_INTEGER:
+            return ib + _midpoint("", fb)
+        if ib < b:
+            return ib
+        result = _decrement_integer(ib)
+        if result is None:
+            raise ValueError("cannot decrement any more")
+        return result
+
+    ia = _integer_part(a)
+    fa = a[len(ia):]
+    if b is None:
+        result = _increment_integer(ia)
+        return ia + _midpoint(fa, None) if result is None else result
+
+    ib = _integer_part(b)
+    fb = b[len(ib):]
+    if ia == ib:
+        return ia + _midpoint(fa, fb)
+    result = _increment_integer(ia)
+    if result is None:
+        raise ValueError("cannot increment any more")
+    if result < b:
+        return result
+    return ia + _midpoint(fa, None)
+
+
+def keys_between(a: Optional[str], b: Optional[str], n: int) -> List[str]:
+    """Return ``n`` ascending keys between ``a`` and ``b``, kept as short as possible."""
+    if n <= 0:
+        return []
+    if n == 1:
+        return [key_between(a, b)]
+    if b is None:
+        keys = [key_between(a, None)]
+        for _ in range(n - 1):
+            keys.append(key_between(keys[-1], None))
+        return keys
+    if a is None:
+        keys = [key_between(None, b)]
+        for _ in range(n - 1):
+            keys.append(key_between(None, keys[-1]))
+        return list(reversed(keys))
+    mid = n // 2
+    c = key_between(a, b)
+    return keys_between(a, c, mid) + [c] + keys_between(c, b, n - mid - 1)
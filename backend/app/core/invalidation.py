@@ -0,0 +1,164 @@
+"""Cross-worker cache invalidation bus.
+
+Write paths call :func:`publish_invalidation` after committing. The event is
+applied to the local cache immediately and, with the Redis backend, also
+published on ``INVALIDATION_CHANNEL`` so every other worker evicts the same
+entries. The memory backend only dispatches locally, which is all a single
+process (or the test suite) needs.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from typing import Callable, Dict, List, Optional
+
+from .cache import cache
+from .config import settings
+from .logger import logger
+
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+
+class InvalidationKind(str, Enum):
+    NOVEL = "novel"
+    CHAPTER = "chapter"
+    CHARACTER = "character"
+    PROMPT = "prompt"
+    USER = "user"
+    ADMIN = "admin"
+    SYSTEM_CONFIG = "system_config"
+
+
+@dataclass
+class InvalidationEvent:
+    kind: InvalidationKind
+    key: str
+    novel_id: Optional[str] = None
+    origin: str = ""
+    event_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["kind"] = self.kind.value
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "InvalidationEvent":
+        data = json.loads(raw)
+        data["kind"] = InvalidationKind(data["kind"])
+        return cls(**data)
+
+
+Handler = Callable[[InvalidationEvent], None]
+
+
+def event_tags(event: InvalidationEvent) -> List[str]:
+    """Cache tags evicted by an event."""
+    if event.kind is InvalidationKind.NOVEL:
+        return ["novels", f"novel:{event.key}"]
+    if event.kind in (InvalidationKind.CHAPTER, InvalidationKind.CHARACTER):
+        tags = [f"{event.kind.value}:{event.key}"]
+        if event.novel_id:
+            tags.append(f"novel:{event.novel_id}")
+        return tags
+    if event.kind is InvalidationKind.SYSTEM_CONFIG:
+        return ["system_config", f"system_config:{event.key}"]
+    return [f"{event.kind.value}:{event.key}"]
+
+
+def _evict_cache(event: InvalidationEvent) -> None:
+    cache.invalidate_tags(*event_tags(event))
+
+
+class InvalidationBus:
+    """Fan-out of invalidation events to local handlers and, optionally, Redis."""
+
+    def __init__(self, redis_client=None, channel: str = "ai-novel:invalidate"):
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.channel = channel
+        self._redis = redis_client
+        self._handlers: Dict[Optional[InvalidationKind], List[Handler]] = {None: [_evict_cache]}
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: Handler, kind: Optional[InvalidationKind] = None) -> None:
+        """Register a handler for one kind, or for every event when ``kind`` is None."""
+        with self._lock:
+            self._handlers.setdefault(kind, []).append(handler)
+
+    def dispatch(self, event: InvalidationEvent) -> None:
+        with self._lock:
+            handlers = list(self._handlers.get(None, ())) + list(self._handlers.get(event.kind, ()))
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"Invalidation handler failed for {event.kind.value}:{event.key}: {exc}")
+
+    def publish(self, kind: InvalidationKind, key: object, novel_id: Optional[object] = None) -> InvalidationEvent:
+        event = InvalidationEvent(
+            kind=kind,
+            key=str(key),
+            novel_id=str(novel_id) if novel_id is not None else None,
+            origin=self.worker_id,
+        )
+        self.dispatch(event)
+        if self._redis is not None:
+            try:
+                self._redis.publish(self.channel, event.to_json())
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(f"Invalidation publish failed, other workers may serve stale data: {exc}")
+        return event
+
+    def _on_message(self, message) -> None:
+        try:
+            event = InvalidationEvent.from_json(message["data"])
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Ignoring malformed invalidation message: {exc}")
+            return
+        if event.origin != self.worker_id:
+            self.dispatch(event)
+
+    def start(self) -> None:
+        if self._redis is None or self._listener is not None:
+            return
+        try:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self._on_message})
+            self._listener = pubsub.run_in_thread(sleep_time=0.5, daemon=True)
+            logger.info(f"Invalidation bus listening on {self.channel}")
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Invalidation bus listener unavailable: {exc}")
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+def _create_bus() -> InvalidationBus:
+    client = None
+    if settings.INVALIDATION_BUS_BACKEND == "redis" and redis is not None:
+        try:
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+            client.ping()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis invalidation bus unavailable, using local dispatch: {exc}")
+            client = None
+    return InvalidationBus(client, settings.INVALIDATION_CHANNEL)
+
+
+# Global bus instance
+invalidation_bus = _create_bus()
+
+
+def publish_invalidation(kind: InvalidationKind, key: object, novel_id: Optional[object] = None) -> None:
+    """Evict cached data derived from ``kind``/``key`` in every worker."""
+    invalidation_bus.publish(kind, key, novel_id)
@@ -1,45 +1,203 @@
+"""Application logging.
+
+Callers never touch a stream or file: the ``ai_novel`` logger only has a
+:class:`QueueHandler`, which pushes records onto a bounded in-memory queue,
+and a :class:`QueueListener` thread formats them and writes to stdout and a
+size-rotated ``logs/app.log``. If the queue is full the record is dropped and
+counted instead of blocking the event loop.
+
+Formatting is lazy: records keep their ``%``-style arguments and are only
+rendered on the listener thread (unless an argument is mutable, in which case
+the message is rendered up front so later mutations cannot leak in).
+
+Every record carries the current ``request_id``. Records logged with
+``extra={"sampled": True}`` (per-request access lines and similar high-volume
+INFO output) are kept for a ``LOG_SAMPLE_RATE`` fraction of requests; the
+decision is made per request id, so a sampled request keeps all its lines.
+"""
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import queue
+import re
 import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
 
 from .config import settings
 
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "sampled"}
+
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+
+class RequestIdMiddleware:
+    """Bind (or accept a well-formed incoming) request id and echo it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = Headers(scope=scope).get(REQUEST_ID_HEADER, "")
+        request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the request id and drop unsampled high-volume records."""
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        if self.sample_rate < 1.0 and getattr(record, "sampled", False) and record.levelno <= logging.INFO:
+            key = record.request_id if record.request_id != "-" else f"{record.created}"
+            return (zlib.crc32(key.encode("utf-8")) % 10000) < self.sample_rate * 10000
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that defers formatting and never blocks on a full queue."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A lone mapping argument becomes ``record.args`` itself and is mutable
+        if record.args and (
+            isinstance(record.args, dict) or not all(isinstance(arg, _IMMUTABLE_ARGS) for arg in record.args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def _build_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+
+_listener: Optional[QueueListener] = None
+
 
 def setup_logger(name: str = "ai_novel") -> logging.Logger:
-    """Setup application logger with console and file handlers."""
+    """Route ``name`` through a queue to console and rotating file handlers."""
+    global _listener
     logger = logging.getLogger(name)
-    
+
     # Set log level based on debug mode
     log_level = logging.DEBUG if settings.DEBUG else logging.INFO
     logger.setLevel(log_level)
-    
+
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
-    
-    # Console handler
+
+    formatter = _build_formatter()
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
-    console_format = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    console_handler.setFormatter(console_format)
-    logger.addHandler(console_handler)
-    
-    # File handler (optional, for production)
-    if not settings.DEBUG:
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        file_handler = logging.FileHandler(log_dir / "app.log")
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+
+    # File handler (production by default)
+    if settings.LOG_FILE_ENABLED if settings.LOG_FILE_ENABLED is not None else not settings.DEBUG:
+        log_dir = Path(settings.LOG_DIR)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            log_dir / "app.log",
+            maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
         file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(console_format)
-        logger.addHandler(file_handler)
-    
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    # Logger-level filter: sampled-out records are dropped before any handler runs
+    logger.addFilter(RequestContextFilter(settings.LOG_SAMPLE_RATE))
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    logger.addHandler(queue_handler)
+
+    _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
     return logger
 
 
+def start_logging() -> None:
+    """(Re)start the listener thread after :func:`stop_logging`."""
+    if _listener is not None and _listener._thread is None:
+        _listener.start()
+
+
+def stop_logging() -> None:
+    """Drain the queue and stop the listener thread (idempotent)."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
 # Create default logger instance
 logger = setup_logger()
@@ -0,0 +1,181 @@
+"""Event loop lag watchdog and blocking-call detector.
+
+Handlers are ``async def`` but some of the work they do is not: sync
+SQLAlchemy sessions, bcrypt, Redis clients. While such a call runs nothing
+else on the worker makes progress, which only shows up as tail latency.
+
+:class:`LoopWatchdog` runs a heartbeat task on the loop every
+``LOOP_WATCHDOG_INTERVAL_MS``; how late each beat wakes up is the loop lag,
+exported as ``event_loop_lag_seconds`` (it takes over lag sampling from the
+metrics sampler). A daemon thread watches the heartbeat: once it is more
+than ``LOOP_BLOCK_THRESHOLD_MS`` overdue the loop is stuck in a call, so the
+thread grabs the loop thread's current stack, finds the ASGI scope of the
+request being served in it and logs both. Each stall is reported once and
+counted in ``event_loop_stalls_total{route}`` (``unmatched`` outside a
+routed request, so raw paths never become label values).
+
+For tests, :func:`fail_on_slow_callbacks` turns on asyncio debug mode and
+raises :class:`SlowCallbackError` if any callback (one step of a task)
+took longer than the given number of milliseconds; ``tests/conftest.py``
+applies it to every async test with ``--asyncio-slow-callback-ms``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .config import settings
+from .logger import logger
+from .metrics import EVENT_LOOP_LAG, EVENT_LOOP_LAG_HIST, EVENT_LOOP_STALLS, metrics_sampler
+
+# Innermost frames kept in a stall report
+STACK_LIMIT = 40
+
+
+def _route_context(frame) -> Dict[str, Optional[str]]:
+    """Method, path and route template of the request a stack is serving."""
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            return {
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "route": getattr(scope.get("route"), "path", None),
+            }
+        frame = frame.f_back
+    return {"method": None, "path": None, "route": None}
+
+
+class LoopWatchdog:
+    """Heartbeat on the event loop plus a thread that reports when it stalls."""
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_lag = 0.0
+        self.stalls = 0
+        self.last_stall: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._reported_beat: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._last_beat = time.monotonic()
+            self.last_lag = max(0.0, loop.time() - expected)
+            EVENT_LOOP_LAG.set(self.last_lag)
+            EVENT_LOOP_LAG_HIST.observe(self.last_lag)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(min(self.interval, self.threshold) / 2):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked >= self.threshold and beat != self._reported_beat:
+                self._reported_beat = beat
+                self._report(blocked)
+
+    def _report(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        context = _route_context(frame)
+        stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+        del frame
+        self.stalls += 1
+        self.last_stall = {**context, "blocked_ms": round(blocked * 1000, 1), "stack": stack, "at": time.time()}
+        EVENT_LOOP_STALLS.labels(context["route"] or "unmatched").inc()
+        logger.warning(
+            "Event loop blocked for %.0f ms+ in %s %s (route %s)\n%s",
+            blocked * 1000, context["method"] or "-", context["path"] or "-", context["route"] or "-", stack,
+        )
+
+    def start(self) -> None:
+        if not settings.LOOP_WATCHDOG_ENABLED or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._reported_beat = None
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        metrics_sampler.measure_lag = False
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        metrics_sampler.measure_lag = True
+
+
+# Global watchdog instance
+loop_watchdog = LoopWatchdog(
+    interval=settings.LOOP_WATCHDOG_INTERVAL_MS / 1000,
+    threshold=settings.LOOP_BLOCK_THRESHOLD_MS / 1000,
+)
+
+
+class SlowCallbackError(AssertionError):
+    """Raised by :func:`fail_on_slow_callbacks` when the loop was blocked."""
+
+
+class _SlowCallbackHandler(logging.Handler):
+    def __init__(self, records: List[str]):
+        super().__init__(logging.WARNING)
+        self.records = records
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if isinstance(record.msg, str) and record.msg.startswith("Executing ") and " took " in record.msg:
+            self.records.append(record.getMessage())
+
+
+@contextmanager
+def fail_on_slow_callbacks(loop: asyncio.AbstractEventLoop, threshold_ms: float) -> Iterator[List[str]]:
+    """Run ``loop`` in debug mode and fail if a callback took over ``threshold_ms``.
+
+    Yields the list of slow-callback messages collected so far.
+    """
+    records: List[str] = []
+    handler = _SlowCallbackHandler(records)
+    asyncio_logger = logging.getLogger("asyncio")
+    previous = loop.get_debug(), loop.slow_callback_duration, asyncio_logger.level
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold_ms / 1000
+    if asyncio_logger.getEffectiveLevel() > logging.WARNING:
+        asyncio_logger.setLevel(logging.WARNING)
+    asyncio_logger.addHandler(handler)
+    try:
+        yield records
+    finally:
+        asyncio_logger.removeHandler(handler)
+        loop.set_debug(previous[0])
+        loop.slow_callback_duration = previous[1]
+        asyncio_logger.setLevel(previous[2])
+    if records:
+        raise SlowCallbackError(
+            f"{len(records)} event loop callback(s) exceeded {threshold_ms:g} ms:\n" + "\n".join(records)
+        )
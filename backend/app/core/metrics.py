@@ -0,0 +1,272 @@
+"""Prometheus metrics.
+
+Instruments HTTP requests (latency histogram per route template, in-flight
+gauge), SQL statements (count and duration per operation), LLM calls
+(latency, tokens and, for streamed calls, time to first token per
+provider/model), cache lookups per tier and background queue depths /
+event-loop lag, and renders them at ``/metrics``.
+
+Multi-worker deployments set ``PROMETHEUS_MULTIPROC_DIR`` (an empty,
+writable directory shared by the workers) before starting; every worker then
+writes its samples to mmap files there and ``/metrics`` aggregates all of
+them, whichever worker serves the scrape. Gauges use the ``live*`` modes so
+values from exited workers disappear.
+
+``prometheus_client`` is optional: without it every metric is a no-op and
+``/metrics`` explains what is missing.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .logger import logger
+from .timing import record as record_timing
+
+try:
+    from prometheus_client import (  # type: ignore
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:
+    Counter = Gauge = Histogram = None
+
+
+class _NoopMetric:
+    def labels(self, *_args, **_kwargs) -> "_NoopMetric":
+        return self
+
+    def inc(self, *_args, **_kwargs) -> None:
+        pass
+
+    def dec(self, *_args, **_kwargs) -> None:
+        pass
+
+    def set(self, *_args, **_kwargs) -> None:
+        pass
+
+    def observe(self, *_args, **_kwargs) -> None:
+        pass
+
+
+def _metric(kind, name: str, documentation: str, labels: Tuple[str, ...] = (), **kwargs):
+    if kind is None:
+        return _NoopMetric()
+    return kind(name, documentation, labels, **kwargs)
+
+
+_HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0, 120.0)
+
+HTTP_REQUESTS = _metric(Counter, "http_requests_total", "HTTP requests", ("method", "route", "status"))
+HTTP_DURATION = _metric(
+    Histogram, "http_request_duration_seconds", "HTTP request latency", ("method", "route"), buckets=_HTTP_BUCKETS
+)
+HTTP_IN_FLIGHT = _metric(Gauge, "http_requests_in_flight", "HTTP requests being served", multiprocess_mode="livesum")
+
+DB_QUERIES = _metric(Counter, "db_queries_total", "SQL statements executed", ("operation",))
+DB_DURATION = _metric(
+    Histogram, "db_query_duration_seconds", "SQL statement duration", ("operation",), buckets=_DB_BUCKETS
+)
+DB_ERRORS = _metric(Counter, "db_query_errors_total", "SQL statements that raised", ("operation",))
+
+LLM_REQUESTS = _metric(Counter, "llm_requests_total", "LLM generations", ("provider", "model", "outcome"))
+LLM_DURATION = _metric(
+    Histogram, "llm_request_duration_seconds", "LLM generation latency", ("provider", "model"), buckets=_LLM_BUCKETS
+)
+LLM_TTFT = _metric(
+    Histogram, "llm_time_to_first_token_seconds", "Time until the first token arrived", ("provider", "model"),
+    buckets=_LLM_BUCKETS,
+)
+LLM_TOKENS = _metric(Counter, "llm_tokens_total", "LLM tokens", ("provider", "model", "kind"))
+
+CACHE_LOOKUPS = _metric(Counter, "cache_lookups_total", "Cache lookups by tier and result", ("cache", "tier", "result"))
+
+QUEUE_DEPTH = _metric(Gauge, "queue_depth", "Pending items in background queues", ("queue",), multiprocess_mode="livesum")
+EVENT_LOOP_LAG = _metric(Gauge, "event_loop_lag_seconds", "Latest event loop scheduling lag", multiprocess_mode="livemax")
+EVENT_LOOP_LAG_HIST = _metric(
+    Histogram, "event_loop_lag_distribution_seconds", "Event loop scheduling lag",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+EVENT_LOOP_STALLS = _metric(Counter, "event_loop_stalls_total", "Event loop blocked past the threshold", ("route",))
+
+
+# ============= HTTP =============
+
+
+class MetricsMiddleware:
+    """Per-route latency, request counts and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # 使用路由模板作为标签，避免路径参数导致标签基数爆炸
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_DURATION.labels(scope["method"], route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(scope["method"], route, str(status["code"])).inc()
+
+
+# ============= Database =============
+
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    operation = _operation(statement)
+    DB_QUERIES.labels(operation).inc()
+    DB_DURATION.labels(operation).observe(elapsed)
+    record_timing("db", elapsed)
+
+
+def _handle_error(context):
+    stack = context.connection.info.get("query_started") if context.connection is not None else None
+    if stack:
+        stack.pop()
+    DB_ERRORS.labels(_operation(context.statement or "")).inc()
+
+
+def instrument_sqlalchemy() -> None:
+    """Time every SQL statement on every engine (idempotent)."""
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+
+# ============= LLM / cache =============
+
+
+def observe_llm(
+    provider: str,
+    model: str,
+    duration: float,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    ttft: Optional[float] = None,
+    outcome: str = "ok",
+) -> None:
+    LLM_REQUESTS.labels(provider, model, outcome).inc()
+    if outcome != "ok":
+        return
+    LLM_DURATION.labels(provider, model).observe(duration)
+    if ttft is not None:  # only streamed generations know when the first token arrived
+        LLM_TTFT.labels(provider, model).observe(ttft)
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider, model, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider, model, "completion").inc(completion_tokens)
+
+
+def observe_cache(cache: str, tier: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, tier, "hit" if hit else "miss").inc()
+
+
+# ============= Queue depths and event loop lag =============
+
+
+class MetricsSampler:
+    """Per-worker background task sampling queue depths and event loop lag.
+
+    Lag is left to the loop watchdog while it runs (``measure_lag`` off),
+    which samples it at a finer interval.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.measure_lag = True
+        self._queues: Dict[str, Callable[[], int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.last_lag = 0.0
+
+    def register_queue(self, name: str, depth: Callable[[], int]) -> None:
+        self._queues[name] = depth
+
+    def sample_queues(self) -> None:
+        for name, depth in self._queues.items():
+            try:
+                QUEUE_DEPTH.labels(name).set(depth())
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("Queue depth probe %s failed: %s", name, exc)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            if self.measure_lag:
+                self.last_lag = max(0.0, loop.time() - expected)
+                EVENT_LOOP_LAG.set(self.last_lag)
+                EVENT_LOOP_LAG_HIST.observe(self.last_lag)
+            self.sample_queues()
+
+    def start(self) -> None:
+        if settings.METRICS_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if Counter is not None and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            multiprocess.mark_process_dead(os.getpid())
+
+
+# Global sampler instance
+metrics_sampler = MetricsSampler(interval=settings.METRICS_SAMPLE_SECONDS)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return ``(body, content_type)`` for a scrape, merged across workers."""
+    if Counter is None:
+        return b"# prometheus_client is not installed\n", "text/plain; charset=utf-8"
+    metrics_sampler.sample_queues()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,125 @@
+"""Non-blocking password hashing.
+
+bcrypt costs ~100-300 ms of CPU per call. Running it inline in an
+``async def`` route stalls every other request on the event loop, so the
+async helpers here run it on a bounded thread pool (bcrypt releases the
+GIL). Admission is limited in two ways:
+
+* ``PASSWORD_HASH_MAX_QUEUE`` bounds the jobs queued or running; above it
+  new work is rejected with 503 instead of piling up behind a login burst.
+* ``PASSWORD_HASH_MAX_PER_ACCOUNT`` bounds concurrent verifications of one
+  account, so a credential-stuffing burst against a single user gets 429.
+
+``verify_and_update`` also returns a fresh hash when the stored one was
+made with an outdated cost (``PASSWORD_HASH_ROUNDS``), allowing callers to
+transparently rehash on a successful login.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, status
+
+from . import security
+from .config import settings
+from .logger import logger
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    def __init__(self, max_workers: int = 4, max_queue: int = 64, max_per_account: int = 3):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_account = max_per_account
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._per_account: Dict[str, int] = {}
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    @contextmanager
+    def _admit(self, account: Optional[str]):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.rejected += 1
+                logger.warning(f"Password hashing queue full ({self._pending}); rejecting request")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service busy, retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            if account is not None and self._per_account.get(account, 0) >= self.max_per_account:
+                self.rejected += 1
+                logger.warning(f"Login burst for account {account!r}; rejecting request")
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many concurrent login attempts",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            if account is not None:
+                self._per_account[account] = self._per_account.get(account, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if account is not None:
+                    remaining = self._per_account.get(account, 1) - 1
+                    if remaining:
+                        self._per_account[account] = remaining
+                    else:
+                        self._per_account.pop(account, None)
+
+    async def _run(self, func: Callable[..., T], *args, account: Optional[str] = None) -> T:
+        with self._admit(account):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: Optional[str], account: Optional[str] = None) -> bool:
+        valid, _ = await self.verify_and_update(password, hashed_password, account)
+        return valid
+
+    async def verify_and_update(
+        self, password: str, hashed_password: Optional[str], account: Optional[str] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """Return ``(valid, new_hash)``; ``new_hash`` is set when a rehash is due.
+
+        A missing hash (unknown account) still spends one dummy verification
+        so response time does not reveal whether the account exists.
+        """
+        if not hashed_password:
+            await self._run(security.pwd_context.dummy_verify, account=account)
+            return False, None
+        return await self._run(security.pwd_context.verify_and_update, password, hashed_password, account=account)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global hasher instance
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    max_per_account=settings.PASSWORD_HASH_MAX_PER_ACCOUNT,
+)
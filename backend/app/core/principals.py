@@ -0,0 +1,55 @@
+"""Short-TTL cache of authenticated principals (users and admins).
+
+Authenticated requests otherwise load the ``User``/``Admin`` row on every
+call. Entries are keyed by the token's ``sub`` and ``iat`` and hold a
+detached copy of the row; a hit is attached to the request session with
+``Session.merge(load=False)``, which issues no SQL. Entries are tagged
+``user:<id>`` / ``admin:<id>`` so the invalidation bus evicts them when the
+account is updated, deactivated or deleted.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .cache import cache
+from .config import settings
+
+T = TypeVar("T")
+
+
+def _detached_copy(obj: T) -> T:
+    mapper = sa_inspect(obj).mapper
+    copy = mapper.class_(**{attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def principal_key(kind: str, payload: dict) -> str:
+    return f"principal:{kind}:{payload.get('sub')}:{payload.get('iat')}"
+
+
+def load_principal(
+    db: Session,
+    key: str,
+    loader: Callable[[], Optional[T]],
+    tags: Callable[[T], Iterable[str]],
+) -> Optional[T]:
+    """Return the cached principal for ``key`` or load it with ``loader``.
+
+    Missing rows are not cached, so a deleted account keeps failing
+    authentication instead of being served from the cache.
+    """
+    if settings.PRINCIPAL_CACHE_TTL <= 0:
+        return loader()
+
+    cached: Any = cache.get(key)
+    if cached is not None:
+        return db.merge(cached, load=False)
+
+    principal = loader()
+    if principal is not None:
+        cache.set(key, _detached_copy(principal), ttl=settings.PRINCIPAL_CACHE_TTL, tags=tuple(tags(principal)))
+    return principal
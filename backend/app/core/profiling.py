@@ -0,0 +1,307 @@
+"""On-demand profiling of single requests.
+
+An admin mints a profiling token (``POST /api/admin/profiles/token``) and
+sends it in the ``X-Profile`` header of the request to diagnose. That one
+request then runs under a statistical stack sampler. Tokens are random,
+single-use nonces kept server-side (in Redis with
+``PROFILE_TOKEN_BACKEND=redis`` so any worker can redeem them) that expire
+after ``PROFILE_TOKEN_TTL_SECONDS``; they grant nothing but profiling and
+are never accepted as bearer credentials. The folded stacks ("frame;frame;frame
+count", the input format of flamegraph.pl, speedscope and inferno) are kept
+in a ring buffer listed at ``GET /api/admin/profiles`` and, when
+``PROFILE_EXPORT_DIR`` is set, also written to ``<id>.folded`` files.
+
+The sampler walks every busy thread, so sync endpoints running on the
+thread pool are captured along with the event loop; requests running
+concurrently with the profiled one show up too. Idle threads (waiting on a
+lock, queue or selector) are skipped.
+
+:class:`ProfilingMiddleware` is plain ASGI: requests without the header pay
+one header scan and no extra task, context or body wrapping, and with
+``PROFILING_ENABLED`` off the middleware is not installed at all.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .logger import current_request_id, logger
+
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+PROFILE_HEADER = b"x-profile"
+
+# (file basename, function) of frames where a thread is parked rather than working
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+def _token_key(token: str) -> str:
+    # Only digests are stored, so a leaked store does not leak usable tokens
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class _MemoryTokenBackend:
+    """Process-local tokens; only the worker that issued a token can redeem it."""
+
+    def __init__(self):
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, key: str, admin_id: str, ttl: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for stale in [k for k, (_, expires) in self._tokens.items() if expires <= now]:
+                del self._tokens[stale]
+            self._tokens[key] = (admin_id, now + ttl)
+
+    def pop(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._tokens.pop(key, None)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+
+
+class _RedisTokenBackend:
+    """Tokens in Redis with a TTL, redeemable on any worker."""
+
+    def __init__(self, client, prefix: str = "profile-token"):
+        self._client = client
+        self._prefix = prefix
+
+    def put(self, key: str, admin_id: str, ttl: int) -> None:
+        self._client.setex(f"{self._prefix}:{key}", ttl, admin_id)
+
+    def pop(self, key: str) -> Optional[str]:
+        pipe = self._client.pipeline()  # MULTI/EXEC: exactly one caller gets the value
+        pipe.get(f"{self._prefix}:{key}")
+        pipe.delete(f"{self._prefix}:{key}")
+        admin_id, _ = pipe.execute()
+        return admin_id
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(f"{self._prefix}:*"):
+            self._client.delete(key)
+
+
+def _create_token_backend():
+    if settings.PROFILE_TOKEN_BACKEND == "redis" and redis is not None:
+        try:
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True)
+            client.ping()
+            return _RedisTokenBackend(client)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis profiling tokens unavailable, falling back to memory: {exc}")
+    return _MemoryTokenBackend()
+
+
+class ProfileTokens:
+    """Issues and redeems single-use profiling tokens."""
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = _create_token_backend()
+        return self._backend
+
+    def issue(self, admin_id: str) -> str:
+        token = secrets.token_urlsafe(32)
+        self.backend.put(_token_key(token), str(admin_id), settings.PROFILE_TOKEN_TTL_SECONDS)
+        return token
+
+    def redeem(self, token: str) -> Optional[str]:
+        """Admin id the token was issued to; the token is spent either way."""
+        try:
+            return self.backend.pop(_token_key(token))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Profiling token lookup failed: %s", exc)
+            return None
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+profile_tokens = ProfileTokens()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the Python stacks of all busy threads from a background thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude: Optional[int] = None) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        self.samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == exclude:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(f"thread:{names.get(ident, ident)}")
+            self.counts[";".join(reversed(stack))] += 1
+
+
+def fold(counts: Counter) -> str:
+    """Folded-stack text, heaviest stacks first."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class ProfileBuffer:
+    """Ring buffer of the most recent request profiles."""
+
+    def __init__(self, capacity: int = 20):
+        self.capacity = capacity
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Dict[str, Any]) -> None:
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def summaries(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._profiles.values())[-limit:]
+        return [{k: v for k, v in p.items() if k != "folded"} for p in reversed(profiles)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+profile_buffer = ProfileBuffer(settings.PROFILE_BUFFER_SIZE)
+
+
+def _flag(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """Profiles requests that carry a valid profiling token (see module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _flag(scope)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+        admin_id = profile_tokens.redeem(token)
+        if admin_id is None:
+            logger.warning("Ignoring invalid or spent profiling token for %s %s", scope["method"], scope["path"])
+            await self.app(scope, receive, send)
+            return
+        await self._profile(scope, receive, send, admin_id)
+
+    async def _profile(self, scope, receive, send, admin_id: str) -> None:
+        profile_id = uuid.uuid4().hex[:16]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000).start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            counts = sampler.stop()
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            self._store(profile_id, scope, status["code"], duration_ms, sampler, counts, admin_id)
+
+    @staticmethod
+    def _store(profile_id: str, scope, status_code: int, duration_ms: float, sampler: StackSampler,
+               counts: Counter, admin_id: str) -> None:
+        folded = fold(counts)
+        profile_buffer.add({
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": duration_ms,
+            "samples": sampler.samples,
+            "stacks": len(counts),
+            "interval_ms": settings.PROFILE_SAMPLE_INTERVAL_MS,
+            "request_id": current_request_id(),
+            "admin_id": admin_id,
+            "created_at": time.time(),
+            "folded": folded,
+        })
+        if settings.PROFILE_EXPORT_DIR:
+            try:
+                directory = Path(settings.PROFILE_EXPORT_DIR)
+                directory.mkdir(parents=True, exist_ok=True)
+                (directory / f"{profile_id}.folded").write_text(folded, encoding="utf-8")
+            except OSError as exc:
+                logger.warning("Could not export profile %s: %s", profile_id, exc)
+        logger.info("Profiled %s %s in %.1f ms (%d samples, profile %s)",
+                    scope["method"], scope["path"], duration_ms, sampler.samples, profile_id)
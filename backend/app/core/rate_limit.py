@@ -1,7 +1,260 @@
+"""Request rate limiting.
+
+``limiter`` is the slowapi instance used for per-route decorators.
+``RateLimitMiddleware`` applies sliding-window limits to every request,
+bucketed by route group (``ai``, ``auth``, ``default``) and caller identity
+(verified JWT subject, hashed ``X-API-Key``, or client IP). Limits come from
+``RATE_LIMITS`` with per-identity ``RATE_LIMIT_OVERRIDES``. With
+``RATE_LIMIT_BACKEND=redis`` windows live in sorted sets updated by one Lua
+script, so all workers share them; otherwise (or if Redis is unreachable)
+each process keeps its own windows in memory.
+"""
 from __future__ import annotations
 
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import hashlib
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+
+from .config import settings
+from .logger import logger
+
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+try:
+    from slowapi import Limiter
+    from slowapi.util import get_remote_address
+
+    # Create a rate limiter instance
+    limiter = Limiter(key_func=get_remote_address)
+except ImportError:
+    limiter = None
+
+
+# ============= Sliding-window limits per route group =============
+
+# Longest matching path prefix decides the route group; everything else is "default".
+ROUTE_GROUPS = {
+    "/api/ai": "ai",  # also covers /api/ai-assistants
+    "/auth": "auth",
+    "/api/admin/login": "auth",
+}
+EXEMPT_PATHS = ("/health", "/metrics", "/docs", "/openapi.json", "/redoc")
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Atomically drop expired hits, count the window and record the new hit if allowed.
+_SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+if count < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, math.ceil(window * 1000))
+    return {1, limit - count - 1, '0'}
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+return {0, 0, tostring(tonumber(oldest[2]) + window - now)}
+"""
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Parse ``"30/minute"`` (or ``"5/10second"``) into ``(limit, window_seconds)``."""
+    count, _, period = rate.partition("/")
+    digits = "".join(ch for ch in period if ch.isdigit())
+    unit = period[len(digits):].rstrip("s") or "second"
+    if unit not in _UNITS:
+        raise ValueError(f"invalid rate: {rate!r}")
+    return int(count), (int(digits) if digits else 1) * _UNITS[unit]
+
+
+class _MemoryWindowBackend:
+    """Process-local sliding windows (timestamps per key).
+
+    Keys whose newest hit is older than their window are swept every
+    ``sweep_interval`` seconds, so idle callers do not accumulate.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self._hits: Dict[str, Deque[float]] = {}
+        self._windows: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    def _sweep(self, now: float) -> None:
+        idle = [key for key, hits in self._hits.items() if not hits or hits[-1] <= now - self._windows[key]]
+        for key in idle:
+            del self._hits[key]
+            del self._windows[key]
+        self._next_sweep = now + self._sweep_interval
+
+    def hit(self, key: str, limit: int, window: float) -> Tuple[bool, int, float]:
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            hits = self._hits.setdefault(key, deque())
+            self._windows[key] = window
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) < limit:
+                hits.append(now)
+                return True, limit - len(hits), 0.0
+            return False, 0, hits[0] + window - now
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hits.clear()
+            self._windows.clear()
+
+
+class _RedisWindowBackend:
+    """Sliding windows in Redis sorted sets, shared by every worker."""
+
+    def __init__(self, client, prefix: str = "ratelimit"):
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(_SLIDING_WINDOW_LUA)
+
+    def hit(self, key: str, limit: int, window: float) -> Tuple[bool, int, float]:
+        allowed, remaining, retry_after = self._script(
+            keys=[f"{self._prefix}:{key}"],
+            args=[time.time(), window, limit, uuid.uuid4().hex],
+        )
+        return bool(allowed), int(remaining), float(retry_after)
+
+    def reset(self) -> None:
+        for key in self._client.scan_iter(f"{self._prefix}:*"):
+            self._client.delete(key)
+
+
+def _create_backend():
+    if settings.RATE_LIMIT_BACKEND == "redis" and redis is not None:
+        try:
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True)
+            client.ping()
+            return _RedisWindowBackend(client)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis rate limiting unavailable, falling back to memory: {exc}")
+    return _MemoryWindowBackend()
+
+
+class SlidingWindowLimiter:
+    """Per-identity, per-route-group sliding-window rate limits."""
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = _create_backend()
+        return self._backend
+
+    @staticmethod
+    def route_group(path: str) -> str:
+        matches = [prefix for prefix in ROUTE_GROUPS if path.startswith(prefix)]
+        return ROUTE_GROUPS[max(matches, key=len)] if matches else "default"
+
+    @staticmethod
+    def identity(request: Request) -> str:
+        """Bucket owner: verified user id, then API key, then client IP."""
+        auth = request.headers.get("authorization", "")
+        if auth.lower().startswith("bearer "):
+            from .security import decode_access_token
+
+            try:
+                return f"user:{decode_access_token(auth[7:])['sub']}"
+            except Exception:  # noqa: BLE001
+                pass
+        api_key = request.headers.get("x-api-key")
+        if api_key:
+            return f"key:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    @staticmethod
+    def rate_for(identity: str, group: str) -> Optional[str]:
+        override = settings.RATE_LIMIT_OVERRIDES.get(identity, {})
+        return override.get(group) or settings.RATE_LIMITS.get(group) or settings.RATE_LIMITS.get("default")
+
+    def hit(self, identity: str, group: str) -> Tuple[bool, int, int, float]:
+        """Record one request; returns ``(allowed, limit, remaining, retry_after)``."""
+        rate = self.rate_for(identity, group)
+        if not rate:
+            return True, 0, 0, 0.0
+        limit, window = parse_rate(rate)
+        allowed, remaining, retry_after = self.backend.hit(f"{group}:{identity}", limit, window)
+        return allowed, limit, remaining, retry_after
+
+    def reset(self) -> None:
+        self.backend.reset()
+
+
+# Global sliding-window limiter
+sliding_limiter = SlidingWindowLimiter()
+
+
+class RateLimitMiddleware:
+    """Applies ``sliding_limiter`` to every request (see module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED
+                or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        group = sliding_limiter.route_group(scope["path"])
+        identity = sliding_limiter.identity(Request(scope))
+        try:
+            allowed, limit, remaining, retry_after = sliding_limiter.hit(identity, group)
+        except Exception as exc:  # noqa: BLE001
+            # 限流存储不可用时放行，避免整站不可用
+            logger.error(f"Rate limiter error, allowing request: {exc}")
+            await self.app(scope, receive, send)
+            return
+
+        if not allowed:
+            logger.warning(f"Rate limit exceeded: {identity} on {group} ({limit})")
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={
+                    "Retry-After": str(max(1, int(retry_after + 0.999))),
+                    "X-RateLimit-Limit": str(limit),
+                    "X-RateLimit-Remaining": "0",
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(limit)
+                headers["X-RateLimit-Remaining"] = str(remaining)
+            await send(message)
 
-# Create a rate limiter instance
-limiter = Limiter(key_func=get_remote_address)
+        await self.app(scope, receive, send_wrapper)
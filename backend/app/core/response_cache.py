@@ -0,0 +1,113 @@
+"""HTTP response cache for read-heavy GET endpoints.
+
+Serialized JSON bodies are cached per route, query string and caller (the
+Authorization header is hashed, so users never share entries). Each rule
+derives cache tags from the request, usually ``novel:<id>``; the
+invalidation bus evicts those tags whenever a write touches the novel, so
+only the affected responses are dropped. Responses carry ``X-Cache: HIT``
+or ``X-Cache: MISS``.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+
+from .cache import CacheManager, _create_redis_client
+from .config import settings
+from .invalidation import event_tags, invalidation_bus
+from .logger import logger
+
+CACHE_HEADER = "X-Cache"
+
+
+@dataclass(frozen=True)
+class ResponseCacheRule:
+    paths: tuple
+    # Returns the tags for a cacheable request, or None to bypass the cache.
+    tags: Callable[[Request], Optional[List[str]]]
+    ttl: Optional[float] = None
+
+
+def _novel_scoped(request: Request) -> Optional[List[str]]:
+    novel_id = request.query_params.get("novel_id")
+    return [f"novel:{novel_id}"] if novel_id else None
+
+
+RESPONSE_CACHE_RULES = [
+    ResponseCacheRule(paths=("/api/novels", "/api/novels/"), tags=lambda _request: ["novels"]),
+    ResponseCacheRule(paths=("/api/chapters", "/api/chapters/"), tags=_novel_scoped),
+    ResponseCacheRule(paths=("/api/characters", "/api/characters/"), tags=_novel_scoped),
+    # 助手列表为静态注册表，仅随进程重启变化
+    ResponseCacheRule(paths=("/api/ai-assistants/",), tags=lambda _request: ["ai_assistants"], ttl=3600),
+]
+
+_RULES_BY_PATH = {path: rule for rule in RESPONSE_CACHE_RULES for path in rule.paths}
+
+response_cache = CacheManager(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    default_ttl=settings.RESPONSE_CACHE_TTL,
+    redis_client=_create_redis_client(),
+    namespace="http",
+)
+invalidation_bus.subscribe(lambda event: response_cache.invalidate_tags(*event_tags(event)))
+
+
+def _cache_key(request: Request) -> str:
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    caller = request.headers.get("authorization", "")
+    caller_hash = hashlib.sha256(caller.encode("utf-8")).hexdigest()[:16] if caller else "anon"
+    return f"{request.url.path}?{query}#{caller_hash}"
+
+
+class ResponseCacheMiddleware:
+    """Serves cached GET bodies and stores cacheable misses as they stream out."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        rule = _RULES_BY_PATH.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if rule is None or not settings.RESPONSE_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        if "no-cache" in request.headers.get("cache-control", ""):
+            await self.app(scope, receive, send)
+            return
+        tags = rule.tags(request)
+        if tags is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = _cache_key(request)
+        cached = response_cache.get(key)
+        if cached is not None:
+            status_code, media_type, body = cached
+            response = Response(content=body, status_code=status_code, media_type=media_type, headers={CACHE_HEADER: "HIT"})
+            await response(scope, receive, send)
+            return
+
+        # 仅缓存 200 的 JSON 响应；响应体边发送边收集，结束后写入缓存
+        state = {"media_type": None, "chunks": []}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                media_type = headers.get("content-type", "")
+                if message["status"] == 200 and media_type.startswith("application/json"):
+                    state["media_type"] = media_type
+                    headers[CACHE_HEADER] = "MISS"
+            elif message["type"] == "http.response.body" and state["media_type"] is not None:
+                state["chunks"].append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    body = b"".join(state["chunks"])
+                    response_cache.set(key, (200, state["media_type"], body), ttl=rule.ttl, tags=tags)
+                    logger.debug("Response cached: %s tags=%s", key, tags)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
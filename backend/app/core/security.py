@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
@@ -7,8 +7,20 @@ from passlib.context import CryptContext
 
 from .config import settings
 
+
+def build_pwd_context(rounds: int) -> CryptContext:
+    """创建密码哈希上下文；min/max 与默认成本一致，成本调整后旧哈希会被标记为需要重算。"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
 # 统一的密码哈希上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_pwd_context(settings.PASSWORD_HASH_ROUNDS)
 
 
 def hash_password(password: str) -> str:
@@ -21,6 +33,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """验证密码；若哈希成本已过时，同时返回新的哈希值。"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def create_access_token(
     subject: str,
     *,
@@ -53,6 +70,7 @@ def decode_access_token(token: str) -> Dict[str, Any]:
     except JWTError as exc:
         raise credentials_exception from exc
 
-    if "sub" not in payload:
+    # 只接受普通访问令牌：带用途限定（scope）的令牌不能充当登录凭证
+    if "sub" not in payload or "scope" in payload:
         raise credentials_exception
     return payload
@@ -0,0 +1,137 @@
+"""Request-scoped timing breakdown (``Server-Timing``).
+
+The middleware binds a :class:`RequestTimings` collector to the request's
+context; the DB cursor hooks, the cache tiers, AIService and JSON rendering
+add their elapsed time to it under a fixed name (``db``, ``cache``, ``llm``,
+``serialize``). When the response leaves, the totals are emitted as a
+``Server-Timing`` header, which browser devtools render as a waterfall, and
+requests slower than ``SERVER_TIMING_LOG_MS`` also get one structured log line.
+
+Outside a request (background tasks, CLI) nothing is bound and recording is a
+single context variable lookup.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+from .config import settings
+from .logger import logger
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Accumulated seconds and call counts per component for one request."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._totals: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        # DB work of sync routes runs in the threadpool, hence the lock
+        with self._lock:
+            entry = self._totals.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            parts = {name: {"ms": round(total * 1000, 2), "count": int(count)} for name, (total, count) in self._totals.items()}
+        parts["total"] = {"ms": round((time.perf_counter() - self.started) * 1000, 2), "count": 1}
+        return parts
+
+    def header_value(self) -> str:
+        return ", ".join(
+            f'{name};dur={part["ms"]};desc="{part["count"]}x"' if name != "total" else f'total;dur={part["ms"]}'
+            for name, part in self.summary().items()
+        )
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Add ``seconds`` under ``name`` to the current request, if any."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+class TimedJSONResponse(JSONResponse):
+    """Default response class that attributes body rendering to ``serialize``."""
+
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+class ServerTimingMiddleware:
+    """Binds a :class:`RequestTimings` per request and emits it when the response starts."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SERVER_TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        origin = Headers(scope=scope).get("origin")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[SERVER_TIMING_HEADER] = timings.header_value()
+                if origin and origin in settings.cors_origins_list:
+                    # Cross-origin pages only see the breakdown when explicitly allowed
+                    headers["Timing-Allow-Origin"] = origin
+                self._log(scope, message["status"], timings)
+            await send(message)
+
+        token = _current.set(timings)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def _log(scope, status_code: int, timings: RequestTimings) -> None:
+        summary = timings.summary()
+        if summary["total"]["ms"] < settings.SERVER_TIMING_LOG_MS:
+            return
+        route = getattr(scope.get("route"), "path", scope["path"])
+        logger.info(
+            "Request timing %s",
+            json.dumps({
+                "method": scope["method"],
+                "route": route,
+                "status": status_code,
+                "timings": summary,
+            }, separators=(",", ":")),
+        )
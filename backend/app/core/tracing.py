@@ -0,0 +1,392 @@
+"""Offline request tracing with OpenTelemetry-shaped spans.
+
+Spans carry W3C ids (32-hex trace id, 16-hex span id), a parent, a kind,
+start/end times in unix nanoseconds, attributes and a status, and are
+propagated through a context variable, so nested work (DB statements in
+the threadpool, AIService, assistants, outgoing httpx calls) attaches to the
+request that caused it. Incoming ``traceparent`` headers continue the
+caller's trace and outgoing httpx requests carry one.
+
+Sampling happens twice:
+
+- head: the root span samples ``TRACE_SAMPLE_RATE`` of new traces (or
+  follows the caller's sampled flag);
+- tail: when ``TRACE_TAIL_SAMPLING`` is on, unsampled traces are still
+  recorded and kept at the end if they errored or took longer than
+  ``TRACE_TAIL_LATENCY_MS``. With it off, unsampled traces cost nothing.
+
+Finished traces go to an in-memory ring buffer (``/api/admin/traces``) and,
+when ``TRACE_EXPORT_FILE`` is set, to a JSON-lines file written by a
+background thread.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+
+from .config import settings
+from .logger import logger
+
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_MAX_STATEMENT_LENGTH = 500
+
+
+class _Trace:
+    """Spans of one trace recorded in this process."""
+
+    __slots__ = ("trace_id", "sampled", "spans", "error", "_lock")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List[Dict[str, Any]] = []
+        self.error = False
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attributes", "start_ns", "status", "_token")
+
+    def __init__(self, trace: _Trace, name: str, kind: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.status = "UNSET"
+        self._token = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)[:500]
+        self.trace.error = True
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.trace.sampled else '00'}"
+
+    def end(self) -> Dict[str, Any]:
+        end_ns = time.time_ns()
+        data = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": end_ns,
+            "duration_ms": round((end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+        self.trace.add(data)
+        return data
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# ============= Exporters =============
+
+
+class TraceBuffer:
+    """Ring buffer of the most recent finished traces."""
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace_id: str, spans: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._traces[trace_id] = spans
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.capacity:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return list(spans) if spans is not None else None
+
+    def summaries(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces.items())[-limit:]
+        result = []
+        for trace_id, spans in reversed(traces):
+            ids = {span["span_id"] for span in spans}
+            root = next((s for s in spans if s["parent_span_id"] not in ids), spans[-1])
+            result.append({
+                "trace_id": trace_id,
+                "name": root["name"],
+                "start_time_unix_nano": root["start_time_unix_nano"],
+                "duration_ms": root["duration_ms"],
+                "span_count": len(spans),
+                "error": any(span["status"] == "ERROR" for span in spans),
+            })
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+class _FileExporter:
+    """Appends one JSON line per span from a background thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.SimpleQueue[List[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        self._queue.put(spans)
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                with open(self.path, "a", encoding="utf-8") as handle:
+                    for span in spans:
+                        handle.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+            except OSError as exc:
+                logger.warning("Trace export to %s failed: %s", self.path, exc)
+
+
+trace_buffer = TraceBuffer(capacity=settings.TRACE_BUFFER_SIZE)
+_file_exporter: Optional[_FileExporter] = None
+
+
+def _export(trace: _Trace, root: Dict[str, Any]) -> None:
+    global _file_exporter
+    keep = trace.sampled or trace.error or root["duration_ms"] >= settings.TRACE_TAIL_LATENCY_MS
+    if not keep:
+        return
+    spans = sorted(trace.spans, key=lambda span: span["start_time_unix_nano"])
+    trace_buffer.add(trace.trace_id, spans)
+    if settings.TRACE_EXPORT_FILE:
+        if _file_exporter is None or _file_exporter.path != settings.TRACE_EXPORT_FILE:
+            _file_exporter = _FileExporter(settings.TRACE_EXPORT_FILE)
+        _file_exporter.export(spans)
+
+
+# ============= Span API =============
+
+
+def _start_root(name: str, kind: str, attributes: Dict[str, Any], traceparent: Optional[str]) -> Optional[Span]:
+    match = _TRACEPARENT.match(traceparent or "")
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        sampled = bool(int(flags, 16) & 1)
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+        sampled = random.random() < settings.TRACE_SAMPLE_RATE
+    if not sampled and not settings.TRACE_TAIL_SAMPLING:
+        return None
+    return Span(_Trace(trace_id, sampled), name, kind, parent_id, attributes)
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: str = "INTERNAL",
+    attributes: Optional[Dict[str, Any]] = None,
+    traceparent: Optional[str] = None,
+    root: bool = False,
+) -> Iterator[Optional[Span]]:
+    """Open a child of the current span (or a new root when ``root``).
+
+    Yields ``None`` when there is nothing to record, so instrumentation costs
+    one context variable lookup outside traced requests.
+    """
+    parent = _current_span.get()
+    if root:
+        span = _start_root(name, kind, dict(attributes or {}), traceparent) if settings.TRACING_ENABLED else None
+    elif parent is not None:
+        span = Span(parent.trace, name, kind, parent.span_id, dict(attributes or {}))
+    else:
+        span = None
+    if span is None:
+        yield None
+        return
+
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.record_error(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        data = span.end()
+        if root:
+            _export(span.trace, data)
+
+
+def traced(name: str, **attributes: Any) -> Callable:
+    """Decorator wrapping a sync or async function in a child span."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(name, attributes=attributes):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name, attributes=attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ============= FastAPI =============
+
+
+class TracingMiddleware:
+    """Root ``SERVER`` span per request, continuing an incoming ``traceparent``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        attributes = {"http.method": method, "http.target": path}
+        with start_span(
+            f"{method} {path}", kind="SERVER", attributes=attributes,
+            traceparent=Headers(scope=scope).get(TRACEPARENT_HEADER), root=True,
+        ) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        span.name = f"{method} {route}"
+                        span.set_attribute("http.route", route)
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "ERROR"
+                        span.trace.error = True
+                    MutableHeaders(scope=message)[TRACEPARENT_HEADER] = span.traceparent()
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+# ============= SQLAlchemy =============
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    span = Span(parent.trace, f"db {statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'SQL'}",
+                "CLIENT", parent.span_id, {
+                    "db.system": conn.dialect.name,
+                    "db.statement": statement[:_MAX_STATEMENT_LENGTH],
+                    "db.executemany": executemany,
+                })
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        span = spans.pop()
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set_attribute("db.rowcount", cursor.rowcount)
+        span.end()
+
+
+def _handle_error(context):
+    spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+    if spans:
+        span = spans.pop()
+        span.record_error(context.original_exception)
+        span.end()
+
+
+def instrument_sqlalchemy() -> None:
+    """Record a span per SQL statement issued inside a traced request (idempotent)."""
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+
+# ============= httpx =============
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Wraps an httpx transport with a CLIENT span and ``traceparent`` injection."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attributes = {"http.method": request.method, "http.url": str(request.url.copy_with(query=None))}
+        with start_span(f"HTTP {request.method} {request.url.host}", kind="CLIENT", attributes=attributes) as span:
+            if span is not None:
+                request.headers[TRACEPARENT_HEADER] = span.traceparent()
+            response = await self._transport.handle_async_request(request)
+            if span is not None:
+                span.set_attribute("http.status_code", response.status_code)
+                if response.status_code >= 500:
+                    span.status = "ERROR"
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def traced_async_client(**kwargs: Any) -> httpx.AsyncClient:
+    """``httpx.AsyncClient`` whose requests are traced."""
+    return httpx.AsyncClient(transport=TracingTransport(kwargs.pop("transport", None)), **kwargs)
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .logger import logger
+
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+# Chapter columns that may be buffered; everything else goes straight to the DB.
+BUFFERED_CHAPTER_FIELDS = ("title", "chapter_number", "real_summary", "outline", "word_count", "status")
+
+
+class _MemoryBackend:
+    """Process-local pending writes keyed by chapter id.
+
+    A flush moves the pending entries to ``_inflight``; they stay readable
+    until the flush commits, and a direct writer that absorbs or discards a
+    chapter meanwhile removes it from the batch.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._inflight: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def merge(self, chapter_id: int, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.setdefault(chapter_id, {}).update(fields)
+
+    def _get(self, chapter_id: int) -> Dict[str, Any]:
+        merged = dict(self._inflight.get(chapter_id) or {})
+        merged.update(self._pending.get(chapter_id) or {})
+        return merged
+
+    def get(self, chapter_id: int) -> Dict[str, Any]:
+        with self._lock:
+            return self._get(chapter_id)
+
+    def get_many(self, chapter_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            return {chapter_id: self._get(chapter_id) for chapter_id in chapter_ids}
+
+    def discard(self, chapter_id: int) -> Dict[str, Any]:
+        with self._lock:
+            merged = self._inflight.pop(chapter_id, None) or {}
+            merged.update(self._pending.pop(chapter_id, None) or {})
+            return merged
+
+    def pop_all(self) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._inflight = dict(pending)
+        return pending
+
+    def claimed(self, chapter_ids: Iterable[int]) -> Set[int]:
+        """Chapters of the current batch that no direct writer took over."""
+        with self._lock:
+            return {chapter_id for chapter_id in chapter_ids if chapter_id in self._inflight}
+
+    def done(self, pending: Dict[int, Dict[str, Any]]) -> None:
+        with self._lock:
+            for chapter_id in pending:
+                self._inflight.pop(chapter_id, None)
+
+    def restore(self, pending: Dict[int, Dict[str, Any]]) -> None:
+        """Put back entries whose flush failed without clobbering newer writes."""
+        with self._lock:
+            for chapter_id, fields in pending.items():
+                if self._inflight.pop(chapter_id, None) is None:
+                    continue  # 已被直接写入吸收
+                merged = dict(fields)
+                merged.update(self._pending.get(chapter_id) or {})
+                self._pending[chapter_id] = merged
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+class _RedisBackend:
+    """Pending writes shared by all workers through Redis hashes.
+
+    A flush RENAMEs each chapter's hash to a ``flushing`` key, which readers
+    still overlay and direct writers still absorb until the flush commits.
+    """
+
+    dirty_key = "chapter_write_buffer:dirty"
+
+    def __init__(self, client):
+        self._client = client
+
+    def _key(self, chapter_id: int) -> str:
+        return f"chapter_write_buffer:{chapter_id}"
+
+    def _flushing_key(self, chapter_id: int) -> str:
+        return f"chapter_write_buffer:flushing:{chapter_id}"
+
+    @staticmethod
+    def _decode(*hashes: Dict[str, str]) -> Dict[str, Any]:
+        merged: Dict[str, Any] = {}
+        for raw in hashes:
+            merged.update({k: json.loads(v) for k, v in raw.items()})
+        return merged
+
+    def merge(self, chapter_id: int, fields: Dict[str, Any]) -> None:
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hset(self._key(chapter_id), mapping={k: json.dumps(v) for k, v in fields.items()})
+        pipe.sadd(self.dirty_key, chapter_id)
+        pipe.execute()
+
+    def get(self, chapter_id: int) -> Dict[str, Any]:
+        return self.get_many([chapter_id])[chapter_id]
+
+    def get_many(self, chapter_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        chapter_ids = list(chapter_ids)
+        pipe = self._client.pipeline(transaction=False)
+        for chapter_id in chapter_ids:
+            pipe.hgetall(self._flushing_key(chapter_id))
+            pipe.hgetall(self._key(chapter_id))
+        raw = pipe.execute()
+        return {
+            chapter_id: self._decode(raw[2 * index], raw[2 * index + 1])
+            for index, chapter_id in enumerate(chapter_ids)
+        }
+
+    def discard(self, chapter_id: int) -> Dict[str, Any]:
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hgetall(self._flushing_key(chapter_id))
+        pipe.hgetall(self._key(chapter_id))
+        pipe.delete(self._flushing_key(chapter_id), self._key(chapter_id))
+        pipe.srem(self.dirty_key, chapter_id)
+        flushing, raw, _, _ = pipe.execute()
+        return self._decode(flushing, raw)
+
+    def pop_all(self) -> Dict[int, Dict[str, Any]]:
+        pending: Dict[int, Dict[str, Any]] = {}
+        for raw_id in self._client.smembers(self.dirty_key):
+            chapter_id = int(raw_id)
+            # 先移出脏集合再改名：期间的新写入会重新标记，下次刷新时处理
+            self._client.srem(self.dirty_key, chapter_id)
+            try:
+                self._client.rename(self._key(chapter_id), self._flushing_key(chapter_id))
+            except redis.ResponseError:  # 已被吸收或并入上一批
+                continue
+            fields = self._decode(self._client.hgetall(self._flushing_key(chapter_id)))
+            if fields:
+                pending[chapter_id] = fields
+        return pending
+
+    def claimed(self, chapter_ids: Iterable[int]) -> Set[int]:
+        chapter_ids = list(chapter_ids)
+        pipe = self._client.pipeline(transaction=False)
+        for chapter_id in chapter_ids:
+            pipe.exists(self._flushing_key(chapter_id))
+        return {chapter_id for chapter_id, exists in zip(chapter_ids, pipe.execute()) if exists}
+
+    def done(self, pending: Dict[int, Dict[str, Any]]) -> None:
+        if pending:
+            self._client.delete(*(self._flushing_key(chapter_id) for chapter_id in pending))
+
+    def restore(self, pending: Dict[int, Dict[str, Any]]) -> None:
+        for chapter_id in self.claimed(pending):
+            current = self._decode(self._client.hgetall(self._key(chapter_id)))
+            self.merge(chapter_id, {**pending[chapter_id], **current})
+            self._client.delete(self._flushing_key(chapter_id))
+
+    def __len__(self) -> int:
+        return int(self._client.scard(self.dirty_key))
+
+
+def _create_backend():
+    if settings.CHAPTER_WRITE_BUFFER_BACKEND == "redis" and redis is not None:
+        try:
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True)
+            client.ping()
+            return _RedisBackend(client)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis write buffer unavailable, falling back to memory: {exc}")
+    return _MemoryBackend()
+
+
+class ChapterWriteBuffer:
+    """Write-behind buffer that coalesces rapid chapter saves.
+
+    Updates are merged per chapter and written in a single transaction every
+    ``CHAPTER_WRITE_BUFFER_FLUSH_SECONDS``. Readers overlay pending values via
+    :meth:`snapshot`, and direct writers call :meth:`absorb` first so a later
+    flush never overwrites their change with stale buffered data. A flush
+    locks the chapter rows and then skips any chapter a direct writer
+    absorbed after the batch was taken; flushes never overlap.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, backend=None):
+        self._session_factory = session_factory
+        self._backend = backend
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CHAPTER_WRITE_BUFFER_ENABLED
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = _create_backend()
+        return self._backend
+
+    def put(self, chapter_id: int, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge column updates for a chapter; returns all pending values."""
+        updates = {k: v for k, v in fields.items() if k in BUFFERED_CHAPTER_FIELDS}
+        updates["buffered_at"] = time.time()
+        self.backend.merge(chapter_id, updates)
+        return self.backend.get(chapter_id)
+
+    def pending_count(self) -> int:
+        return len(self._backend) if self._backend is not None else 0
+
+    def pending(self, chapter_id: int) -> Dict[str, Any]:
+        if not self.enabled and self._backend is None:
+            return {}
+        return self.backend.get(chapter_id)
+
+    def pending_many(self, chapter_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Pending values for several chapters in one backend round trip."""
+        if not self.enabled and self._backend is None:
+            return {}
+        return self.backend.get_many(chapter_ids)
+
+    def snapshot(
+        self,
+        chapter,
+        fields: Iterable[str] = BUFFERED_CHAPTER_FIELDS,
+        pending: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Return chapter column values with any buffered writes applied.
+
+        ``pending`` skips the lookup when the caller already fetched it.
+        """
+        values = {name: getattr(chapter, name) for name in fields}
+        if pending is None:
+            pending = self.pending(chapter.id)
+        values.update({k: v for k, v in pending.items() if k in values})
+        return values
+
+    def absorb(self, chapter) -> None:
+        """Move pending values onto an ORM chapter that is about to be committed."""
+        if not self.enabled and self._backend is None:
+            return
+        for name, value in self.backend.discard(chapter.id).items():
+            if name in BUFFERED_CHAPTER_FIELDS:
+                setattr(chapter, name, value)
+
+    def discard(self, chapter_id: int) -> None:
+        if not self.enabled and self._backend is None:
+            return
+        self.backend.discard(chapter_id)
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write all pending chapters in one transaction; returns rows written."""
+        if self._backend is None:
+            return 0
+        with self._flush_lock:
+            return self._flush(db)
+
+    def _flush(self, db: Optional[Session]) -> int:
+        pending = self.backend.pop_all()
+        if not pending:
+            return 0
+
+        from ..models.chapter import Chapter  # local import to avoid circulars
+
+        own_session = db is None
+        if own_session:
+            if self._session_factory is None:
+                from .database import SessionLocal
+                self._session_factory = SessionLocal
+            db = self._session_factory()
+        written = 0
+        try:
+            chapters = db.query(Chapter).filter(Chapter.id.in_(list(pending))).with_for_update().all()
+            # Checked under the row locks: a direct write absorbed since pop_all wins
+            claimed = self.backend.claimed(pending)
+            for chapter in chapters:
+                if chapter.id not in claimed:
+                    continue
+                for name, value in pending[chapter.id].items():
+                    if name in BUFFERED_CHAPTER_FIELDS:
+                        setattr(chapter, name, value)
+                written += 1
+            db.commit()
+            self.backend.done(pending)
+            logger.debug("Chapter write buffer flushed %d chapters", written)
+        except SQLAlchemyError as exc:
+            logger.error(f"Chapter write buffer flush failed: {exc}")
+            db.rollback()
+            self.backend.restore(pending)
+            written = 0
+        finally:
+            if own_session:
+                db.close()
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.CHAPTER_WRITE_BUFFER_FLUSH_SECONDS)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"Chapter write buffer loop error: {exc}")
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the periodic flush and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+
+# Global buffer instance
+chapter_write_buffer = ChapterWriteBuffer()
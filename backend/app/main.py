@@ -5,16 +5,30 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
-from .api import admin, ai, auth, chapters, characters, novels, plots, prompts, users, worlds, chapter_versions, ai_assistants
+from .api import admin, ai, auth, chapters, characters, metrics, novels, plots, prompts, users, worlds, chapter_versions, chapter_paragraphs, ai_assistants
 from .core.config import settings
 from .core.database import Base, engine
-from .core.logger import logger
+from .core.logger import RequestIdMiddleware, logger, start_logging, stop_logging
+from .core.loop_watchdog import loop_watchdog
 from .core.database import SessionLocal
-from .core.security import hash_password
+from .core.password_hasher import password_hasher
+from .core.invalidation import invalidation_bus
+from .core.metrics import MetricsMiddleware, instrument_sqlalchemy, metrics_sampler
+from .core.profiling import ProfilingMiddleware
+from .core.rate_limit import RateLimitMiddleware
+from .core.response_cache import ResponseCacheMiddleware
+from .core.timing import ServerTimingMiddleware, TimedJSONResponse
+from .core.tracing import TracingMiddleware, instrument_sqlalchemy as trace_sqlalchemy
+from .core.write_buffer import chapter_write_buffer
+from .services.counters import counter_aggregator
+from .services.reordering import rank_rebalancer
+from .services.token_ledger import token_ledger
 try:
     from slowapi import _rate_limit_exceeded_handler
     from slowapi.errors import RateLimitExceeded
     from .core.rate_limit import limiter as _real_limiter
+    if _real_limiter is None:
+        raise ImportError("slowapi is not installed")
     _RATE_LIMIT_ENABLED = True
 except Exception as _e:  # noqa: N816
     # Gracefully handle environments where slowapi or its deps are missing
@@ -33,11 +47,21 @@ except Exception as _e:  # noqa: N816
 else:
     limiter = _real_limiter
 
+# Time SQL statements on every engine and trace them inside requests
+instrument_sqlalchemy()
+trace_sqlalchemy()
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+metrics_sampler.register_queue("password_hasher", lambda: password_hasher.queue_depth)
+metrics_sampler.register_queue("chapter_write_buffer", chapter_write_buffer.pending_count)
+metrics_sampler.register_queue("counter_aggregator", counter_aggregator.pending_count)
+metrics_sampler.register_queue("token_ledger", token_ledger.pending_count)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    start_logging()
     logger.info(f"Starting {settings.APP_NAME}")
     logger.info(f"Debug mode: {settings.DEBUG}")
     try:
@@ -53,7 +77,7 @@ async def lifespan(app: FastAPI):
                             username=getattr(settings, "ADMIN_DEFAULT_USERNAME", "admin"),
                             email=f"{getattr(settings, 'ADMIN_DEFAULT_USERNAME', 'admin')}@example.com",
                             full_name="Dev Admin",
-                            hashed_password=hash_password(getattr(settings, "ADMIN_DEFAULT_PASSWORD", "admin123")),
+                            hashed_password=await password_hasher.hash(getattr(settings, "ADMIN_DEFAULT_PASSWORD", "admin123")),
                             is_active=True,
                             is_superuser=True,
                         )
@@ -62,9 +86,27 @@ async def lifespan(app: FastAPI):
                         logger.info("Default admin created. You can log in via /admin/login.")
             except Exception as _exc:  # noqa: BLE001
                 logger.warning(f"Admin bootstrap skipped/failed: {_exc}")
+        invalidation_bus.start()
+        chapter_write_buffer.start()
+        rank_rebalancer.start()
+        counter_aggregator.start()
+        token_ledger.start()
+        metrics_sampler.start()
+        loop_watchdog.start()
         yield
     finally:
+        # Persist buffered chapter saves before the process exits
+        await chapter_write_buffer.stop()
+        await rank_rebalancer.stop()
+        # Write buffered usage counters
+        await counter_aggregator.stop()
+        await token_ledger.stop()
+        await loop_watchdog.stop()
+        await metrics_sampler.stop()
+        invalidation_bus.stop()
+        password_hasher.shutdown()
         logger.info(f"Shutting down {settings.APP_NAME}")
+        stop_logging()
 
 
 app = FastAPI(
@@ -73,6 +115,7 @@ app = FastAPI(
     description="AI-powered novel writing platform",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
 )
 
 # Add rate limiter if available
@@ -80,6 +123,10 @@ if _RATE_LIMIT_ENABLED:
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Cached GET responses (X-Cache: HIT/MISS), evicted via the invalidation bus.
+# Innermost, so hits still get CORS headers and pass through request logging.
+app.add_middleware(ResponseCacheMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -92,11 +139,31 @@ app.add_middleware(
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f"Request: {request.method} {request.url.path}")
+    logger.info("Request: %s %s", request.method, request.url.path, extra={"sampled": True})
+    counter_aggregator.incr_metric("api_requests")
     response = await call_next(request)
-    logger.info(f"Response: {response.status_code}")
+    logger.info("Response: %s", response.status_code, extra={"sampled": True})
     return response
 
+# Sliding-window limits per route group and caller (outside the response cache, so cached hits count too)
+app.add_middleware(RateLimitMiddleware)
+
+# Server-Timing breakdown (db, cache, llm, serialize) per request
+app.add_middleware(ServerTimingMiddleware)
+
+# Per-route latency and in-flight requests (outside rate limiting and Server-Timing, so 429s and their time are included)
+app.add_middleware(MetricsMiddleware)
+
+# Root span per request (continues an incoming traceparent)
+app.add_middleware(TracingMiddleware)
+
+# Single-request profiling for admin-issued tokens (unflagged requests pass straight through)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Request id for every log record (X-Request-ID in and out); outermost
+app.add_middleware(RequestIdMiddleware)
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(prompts.router)
@@ -106,9 +173,11 @@ app.include_router(worlds.router)
 app.include_router(plots.router)
 app.include_router(chapters.router)
 app.include_router(chapter_versions.router)
+app.include_router(chapter_paragraphs.router)
 app.include_router(ai.router)
 app.include_router(ai_assistants.router)
 app.include_router(admin.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -1,12 +1,13 @@
 from ..core.database import Base
 from .admin import Admin
 from .character import Character
-from .chapter import Chapter, ChapterVersion, ChapterEvaluation
+from .chapter import Chapter, ChapterBlob, ChapterEvaluation, ChapterParagraph, ChapterVersion
 from .llm_config import LLMConfig
 from .novel import Novel, NovelBlueprint, NovelConversation, CharacterRelationship
 from .plot import Plot
 from .prompt import Prompt
 from .system_config import SystemConfig
+from .token_usage import TokenUsage, TokenUsageDaily, TokenUsageHourly
 from .usage_metric import UsageMetric
 from .user import User
 from .user_daily_request import UserDailyRequest
@@ -18,6 +19,8 @@ __all__ = [
     "Character",
     "CharacterRelationship",
     "Chapter",
+    "ChapterBlob",
+    "ChapterParagraph",
     "ChapterVersion",
     "ChapterEvaluation",
     "LLMConfig",
@@ -27,6 +30,9 @@ __all__ = [
     "Plot",
     "Prompt",
     "SystemConfig",
+    "TokenUsage",
+    "TokenUsageDaily",
+    "TokenUsageHourly",
     "UsageMetric",
     "User",
     "UserDailyRequest",
@@ -3,11 +3,26 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Integer, String, Text, func
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+    update,
+)
 from sqlalchemy.dialects.mysql import LONGTEXT
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from ..core.blob_store import get_blob_store
 from ..core.database import Base
+from ..core.fractional_index import RANK_TYPE
 
 BIGINT_PK_TYPE = BigInteger().with_variant(Integer, "sqlite")
 LONG_TEXT_TYPE = Text().with_variant(LONGTEXT, "mysql")
@@ -17,10 +32,13 @@ class Chapter(Base):
     """章节正文状态，指向选中的版本。"""
 
     __tablename__ = "chapters"
+    __table_args__ = (Index("ix_chapters_novel_rank", "novel_id", "rank"),)
 
     id: Mapped[int] = mapped_column(BIGINT_PK_TYPE, primary_key=True, autoincrement=True)
     novel_id: Mapped[str] = mapped_column(ForeignKey("novels.id", ondelete="CASCADE"), nullable=False)
     chapter_number: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 分数索引排序键；chapter_number 为展示值，由后台重排回写
+    rank: Mapped[Optional[str]] = mapped_column(RANK_TYPE, nullable=True)
     title: Mapped[Optional[str]] = mapped_column(String(255))
     outline: Mapped[Optional[str]] = mapped_column(Text)
     real_summary: Mapped[Optional[str]] = mapped_column(Text)
@@ -50,6 +68,38 @@ class Chapter(Base):
     evaluations: Mapped[list["ChapterEvaluation"]] = relationship(
         back_populates="chapter", cascade="all, delete-orphan", order_by="ChapterEvaluation.created_at"
     )
+    paragraphs: Mapped[list["ChapterParagraph"]] = relationship(
+        back_populates="chapter", cascade="all, delete-orphan", order_by="ChapterParagraph.position"
+    )
+
+
+class ChapterBlob(Base):
+    """按 SHA-256 内容寻址的版本正文，相同文本只存一份。
+
+    storage 为 "database" 时正文保存在 content 列；否则 content 为空，
+    正文位于外部 blob 存储（local / s3），数据库只保留哈希与大小。
+    """
+
+    __tablename__ = "chapter_blobs"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    content: Mapped[Optional[str]] = mapped_column(LONG_TEXT_TYPE, nullable=True)
+    storage: Mapped[str] = mapped_column(String(16), nullable=False, default="database")
+    size: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def read_bytes(self, start: int = 0, length: Optional[int] = None) -> bytes:
+        """按字节区间读取正文；外部存储走 mmap / Range 读取。"""
+        if self.content is not None:
+            data = self.content.encode("utf-8")
+            return data[start:] if length is None else data[start:start + length]
+        return get_blob_store(self.storage).get(self.hash, start, length)
+
+    def read_text(self) -> str:
+        if self.content is not None:
+            return self.content
+        return self.read_bytes().decode("utf-8")
 
 
 class ChapterVersion(Base):
@@ -61,7 +111,9 @@ class ChapterVersion(Base):
     chapter_id: Mapped[int] = mapped_column(ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False)
     version_label: Mapped[Optional[str]] = mapped_column(String(64))
     provider: Mapped[Optional[str]] = mapped_column(String(64))
-    content: Mapped[str] = mapped_column(LONG_TEXT_TYPE, nullable=False)
+    # 旧版直接存放正文；新版本写入空串，正文由 content_hash 指向 chapter_blobs
+    legacy_content: Mapped[str] = mapped_column("content", LONG_TEXT_TYPE, nullable=False, default="")
+    content_hash: Mapped[Optional[str]] = mapped_column(ForeignKey("chapter_blobs.hash"), nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     chapter: Mapped[Chapter] = relationship(
@@ -69,10 +121,60 @@ class ChapterVersion(Base):
         back_populates="versions",
         foreign_keys=[chapter_id],
     )
+    blob: Mapped[Optional[ChapterBlob]] = relationship(lazy="joined")
     evaluations: Mapped[list["ChapterEvaluation"]] = relationship(
         back_populates="version", cascade="all, delete-orphan"
     )
 
+    @property
+    def content(self) -> str:
+        """版本正文：优先读取内容寻址的 blob，兼容未迁移的旧行。"""
+        if self.blob is not None:
+            return self.blob.read_text()
+        return self.legacy_content
+
+
+@event.listens_for(ChapterVersion, "after_insert")
+def _retain_blob(mapper, connection, target: ChapterVersion) -> None:
+    """新版本引用 blob 时引用计数 +1。"""
+    if target.content_hash:
+        connection.execute(
+            update(ChapterBlob)
+            .where(ChapterBlob.hash == target.content_hash)
+            .values(ref_count=ChapterBlob.ref_count + 1)
+        )
+
+
+@event.listens_for(ChapterVersion, "after_delete")
+def _release_blob(mapper, connection, target: ChapterVersion) -> None:
+    """删除版本（含级联删除）时引用计数 -1。
+
+    归零的 blob 不在这里删除：并发保存可能刚取到同一哈希、尚未提交新版本，
+    删除交给带宽限期的 collect_garbage。
+    """
+    if target.content_hash:
+        connection.execute(
+            update(ChapterBlob)
+            .where(ChapterBlob.hash == target.content_hash)
+            .values(ref_count=ChapterBlob.ref_count - 1)
+        )
+
+
+class ChapterParagraph(Base):
+    """章节工作稿的段落级表示，position 为分数索引键，插入/修改只写单行。"""
+
+    __tablename__ = "chapter_paragraphs"
+    __table_args__ = (UniqueConstraint("chapter_id", "position", name="uq_chapter_paragraph_position"),)
+
+    id: Mapped[int] = mapped_column(BIGINT_PK_TYPE, primary_key=True, autoincrement=True)
+    chapter_id: Mapped[int] = mapped_column(ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False)
+    position: Mapped[str] = mapped_column(RANK_TYPE, nullable=False)
+    content: Mapped[str] = mapped_column(LONG_TEXT_TYPE, nullable=False, default="")
+    word_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    chapter: Mapped[Chapter] = relationship(back_populates="paragraphs")
+
 
 class ChapterEvaluation(Base):
     """章节评估记录。"""
@@ -3,10 +3,11 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, JSON, String, Text, func
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, JSON, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..core.database import Base
+from ..core.fractional_index import RANK_TYPE
 
 BIGINT_PK_TYPE = BigInteger().with_variant(Integer, "sqlite")
 
@@ -15,6 +16,7 @@ class Character(Base):
     """蓝图角色信息。"""
 
     __tablename__ = "characters"
+    __table_args__ = (Index("ix_characters_novel_rank", "novel_id", "rank"),)
 
     id: Mapped[int] = mapped_column(BIGINT_PK_TYPE, primary_key=True, autoincrement=True)
     novel_id: Mapped[str] = mapped_column(ForeignKey("novels.id", ondelete="CASCADE"), nullable=False)
@@ -28,6 +30,8 @@ class Character(Base):
     background: Mapped[Optional[str]] = mapped_column(Text)
     extra: Mapped[Optional[dict]] = mapped_column(JSON)
     position: Mapped[int] = mapped_column(Integer, default=0)
+    # 分数索引排序键；整数字段为展示值，由后台重排回写
+    rank: Mapped[Optional[str]] = mapped_column(RANK_TYPE, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
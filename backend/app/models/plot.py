@@ -3,16 +3,18 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..core.database import Base
+from ..core.fractional_index import RANK_TYPE
 
 BIGINT_PK_TYPE = BigInteger().with_variant(Integer, "sqlite")
 
 
 class Plot(Base):
     __tablename__ = "plots"
+    __table_args__ = (Index("ix_plots_novel_rank", "novel_id", "rank"),)
 
     id: Mapped[int] = mapped_column(BIGINT_PK_TYPE, primary_key=True, autoincrement=True)
     novel_id: Mapped[str] = mapped_column(ForeignKey("novels.id", ondelete="CASCADE"), nullable=False)
@@ -23,6 +25,8 @@ class Plot(Base):
     characters: Mapped[Optional[str]] = mapped_column(Text)
     conflicts: Mapped[Optional[str]] = mapped_column(Text)
     order: Mapped[int] = mapped_column(Integer, default=0)
+    # 分数索引排序键；整数字段为展示值，由后台重排回写
+    rank: Mapped[Optional[str]] = mapped_column(RANK_TYPE, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
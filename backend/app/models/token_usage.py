@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..core.database import Base
+
+BIGINT_PK_TYPE = BigInteger().with_variant(Integer, "sqlite")
+
+
+class TokenUsage(Base):
+    """AI 生成的逐次 token 用量流水（仅追加，由批量写入器写入）。"""
+
+    __tablename__ = "token_usage"
+    __table_args__ = (Index("ix_token_usage_user_created", "user_id", "created_at"),)
+
+    id: Mapped[int] = mapped_column(BIGINT_PK_TYPE, primary_key=True, autoincrement=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    novel_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True, index=True)
+    provider: Mapped[str] = mapped_column(String(32), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    latency_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cache_hit: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)  # UTC
+
+
+class _UsageRollupColumns:
+    """按 用户/提供商/模型 聚合的用量列（user_id=0 表示匿名调用）。"""
+
+    id: Mapped[int] = mapped_column(BIGINT_PK_TYPE, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    provider: Mapped[str] = mapped_column(String(32), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    requests: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cache_hits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    prompt_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    latency_ms_total: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class TokenUsageHourly(_UsageRollupColumns, Base):
+    """按小时汇总的 token 用量（UTC 整点）。"""
+
+    __tablename__ = "token_usage_hourly"
+    __table_args__ = (
+        UniqueConstraint("bucket", "user_id", "provider", "model", name="uq_token_usage_hourly"),
+    )
+
+    bucket: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class TokenUsageDaily(_UsageRollupColumns, Base):
+    """按天汇总的 token 用量（UTC 日期）。"""
+
+    __tablename__ = "token_usage_daily"
+    __table_args__ = (
+        UniqueConstraint("bucket", "user_id", "provider", "model", name="uq_token_usage_daily"),
+    )
+
+    bucket: Mapped[date] = mapped_column(Date, nullable=False, index=True)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -51,3 +51,21 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
     admin_id: Optional[UUID] = None
+
+
+class AdminNovelStats(BaseModel):
+    id: str
+    title: str
+    status: Optional[str] = None
+    user_id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    chapter_count: int = 0
+    word_count: int = 0
+    version_count: int = 0
+    last_activity: Optional[datetime] = None
+
+
+class AdminNovelStatsPage(BaseModel):
+    items: List[AdminNovelStats]
+    next_cursor: Optional[str] = None
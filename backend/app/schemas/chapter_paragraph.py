@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ChapterParagraphCreate(BaseModel):
+    content: str = ""
+    # 插入位置：给定 after_id 或 before_id 之一；都不给则追加到末尾
+    after_id: Optional[int] = None
+    before_id: Optional[int] = None
+
+
+class ChapterParagraphUpdate(BaseModel):
+    content: str
+
+
+class ChapterParagraphResponse(BaseModel):
+    id: int
+    chapter_id: int
+    position: str
+    content: str
+    word_count: int
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ChapterParagraphPage(BaseModel):
+    """段落区间；next_after 用于继续向后翻页（键集分页）"""
+    chapter_id: int
+    paragraphs: list[ChapterParagraphResponse] = []
+    next_after: Optional[str] = None
+
+
+class ChapterTextResponse(BaseModel):
+    chapter_id: int
+    content: str
+    word_count: int
+    paragraph_count: int = Field(0, ge=0)
@@ -21,6 +21,7 @@ class ChapterVersionCreate(ChapterVersionBase):
 class ChapterVersionResponse(ChapterVersionBase):
     id: int
     chapter_id: int
+    content_hash: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class MoveRequest(BaseModel):
+    """拖拽排序：移动到 after_id 之后或 before_id 之前；都为空时移到最前。"""
+
+    after_id: Optional[int] = None
+    before_id: Optional[int] = None
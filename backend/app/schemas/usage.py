@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Union
+
+from pydantic import BaseModel
+
+
+class UsageTotals(BaseModel):
+    requests: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    avg_latency_ms: float = 0.0
+
+
+class UsageRollupResponse(UsageTotals):
+    """小时/天汇总表中的一行（bucket 为 UTC 整点或日期）。"""
+
+    bucket: Union[datetime, date]
+    user_id: int
+    provider: str
+    model: str
+
+
+class UsageSummaryRow(UsageTotals):
+    """按某一维度（user/provider/model/day）汇总的用量。"""
+
+    key: str
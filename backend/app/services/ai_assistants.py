@@ -15,6 +15,7 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 
+from ..core.tracing import start_span
 from ..services.ai_service import AIService
 
 
@@ -51,17 +52,25 @@ class BaseAssistant(ABC):
         """构建提示词"""
         pass
 
+    async def run(
+        self, context: Dict[str, Any], user_input: str, max_tokens: int = 2000
+    ) -> Dict[str, Any]:
+        """处理用户输入，返回完整生成结果（content、tokens_used 等）"""
+        with start_span("assistant.run", attributes={"assistant.role": self.role}):
+            with start_span("assistant.build_prompt"):
+                prompt = self.build_prompt(context, user_input)
+            return await self.ai_service.generate(
+                prompt=prompt,
+                context=context,
+                max_tokens=max_tokens,
+                temperature=self.temperature,
+            )
+
     async def process(
         self, context: Dict[str, Any], user_input: str, max_tokens: int = 2000
     ) -> str:
         """处理用户输入，生成响应"""
-        prompt = self.build_prompt(context, user_input)
-        result = await self.ai_service.generate(
-            prompt=prompt,
-            context=context,
-            max_tokens=max_tokens,
-            temperature=self.temperature,
-        )
+        result = await self.run(context, user_input, max_tokens=max_tokens)
         return result.get("content", "")
 
     def get_info(self) -> Dict[str, str]:
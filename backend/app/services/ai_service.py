@@ -1,10 +1,16 @@
 from typing import Dict, Any, Optional
 import hashlib
 import json
+import time
 
 import httpx
 
 from ..core.config import settings
+from ..core.metrics import observe_cache, observe_llm
+from ..core.timing import timed
+from ..core.tracing import start_span
+from .llm_cassette import cassette_enabled, llm_http_client
+from .token_ledger import UsageRecord, token_ledger
 
 try:
     import redis  # type: ignore
@@ -46,8 +52,42 @@ class AIService:
         return ""
 
     async def generate(self, prompt: str, context: Dict[str, Any], max_tokens: int = 2000, temperature: Optional[float] = None) -> Dict[str, Any]:
-        """Generate content using AI based on provider"""
-        full_prompt = self.build_context_prompt(context, prompt)
+        """Generate content using AI based on provider; usage is recorded in the token ledger."""
+        started = time.perf_counter()
+        with start_span("ai.generate", attributes={"llm.provider": self.provider, "llm.model": self.model_name}) as span:
+            try:
+                result, cache_hit = await self._generate(prompt, context, max_tokens, temperature)
+            except Exception:
+                observe_llm(self.provider, self.model_name, time.perf_counter() - started, outcome="error")
+                raise
+            if span is not None:
+                span.set_attribute("llm.cache_hit", cache_hit)
+                span.set_attribute("llm.prompt_tokens", int(result.get("prompt_tokens") or 0))
+                span.set_attribute("llm.completion_tokens", int(result.get("completion_tokens") or 0))
+        elapsed = time.perf_counter() - started
+        # 命中缓存不消耗 token
+        prompt_tokens = 0 if cache_hit else int(result.get("prompt_tokens") or 0)
+        completion_tokens = 0 if cache_hit else int(result.get("completion_tokens") or 0)
+        observe_llm(
+            self.provider, self.model_name, elapsed, prompt_tokens, completion_tokens,
+            outcome="cached" if cache_hit else "ok",
+        )
+        novel = context.get("novel") or {}
+        token_ledger.record(UsageRecord(
+            provider=self.provider,
+            model=self.model_name,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=int(elapsed * 1000),
+            cache_hit=cache_hit,
+            novel_id=str(novel["id"]) if novel.get("id") is not None else None,
+        ))
+        return result
+
+    async def _generate(self, prompt: str, context: Dict[str, Any], max_tokens: int, temperature: Optional[float]):
+        """Return ``(result, cache_hit)``."""
+        with start_span("ai.build_context_prompt"):
+            full_prompt = self.build_context_prompt(context, prompt)
         # Development-friendly fallback: if running in DEBUG and no valid key/base_url provided,
         # return a deterministic mock response so that frontend flows remain testable without errors.
         # This does NOT run in production (DEBUG=False) and does not replace real providers when keys exist.
@@ -68,19 +108,20 @@ class AIService:
                     "content": f"[DEV-MOCK:{self.provider}]\nModel: {self.model_name}\nPrompt: {prompt[:160]}...\n(Provide real API key to generate actual content.)",
                     "tokens_used": 0,
                     "model": self.model_name,
-                }
+                }, False
             if self.provider not in ("openai", "anthropic") and not self.base_url:
                 return {
                     "content": f"[DEV-MOCK:custom]\nNo base_url provided. Echo prompt preview: {prompt[:160]}...",
                     "tokens_used": 0,
                     "model": self.model_name,
-                }
+                }, False
         cache_key = None
         if _redis_client:
             cache_input = f"{self.provider}:{self.model_name}:{prompt}".encode("utf-8")
             cache_key = hashlib.md5(cache_input).hexdigest()
             try:
-                cached_value = _redis_client.get(cache_key)
+                with timed("cache"), start_span("ai.cache.lookup", kind="CLIENT", attributes={"db.system": "redis"}):
+                    cached_value = _redis_client.get(cache_key)
             except Exception:  # noqa: BLE001
                 cached_value = None
                 # Disable cache for this process to avoid repeated connection errors
@@ -89,18 +130,20 @@ class AIService:
                 except Exception:
                     pass
                 globals().update({"_redis_client": None})
+            observe_cache("ai", "redis", bool(cached_value))
             if cached_value:
                 try:
-                    return json.loads(cached_value)
+                    return json.loads(cached_value), True
                 except json.JSONDecodeError:
                     pass
 
-        if self.provider == "openai":
-            result = await self._generate_openai(full_prompt, max_tokens, temperature)
-        elif self.provider == "anthropic":
-            result = await self._generate_anthropic(full_prompt, max_tokens, temperature)
-        else:
-            result = await self._generate_custom(full_prompt, max_tokens, temperature)
+        with timed("llm"), start_span(f"llm.{self.provider}", kind="CLIENT", attributes={"llm.model": self.model_name}):
+            if self.provider == "openai":
+                result = await self._generate_openai(full_prompt, max_tokens, temperature)
+            elif self.provider == "anthropic":
+                result = await self._generate_anthropic(full_prompt, max_tokens, temperature)
+            else:
+                result = await self._generate_custom(full_prompt, max_tokens, temperature)
 
         if _redis_client and cache_key:
             try:
@@ -108,7 +151,7 @@ class AIService:
             except Exception:  # noqa: BLE001
                 pass
 
-        return result
+        return result, False
 
     async def _generate_openai(self, prompt: str, max_tokens: int, temperature: Optional[float]) -> Dict[str, Any]:
         """Generate using OpenAI API"""
@@ -118,16 +161,20 @@ class AIService:
             except ImportError as e:
                 raise Exception("OpenAI SDK is not installed. Set provider to 'custom' or install openai.") from e
 
-            client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
-            response = await client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                temperature=temperature if temperature is not None else 0.7
-            )
+            # 录制/回放模式下让 SDK 走 cassette 传输层；退出时 SDK 一并关闭该 httpx 客户端
+            extra = {"http_client": llm_http_client(timeout=60.0)} if cassette_enabled() else {}
+            async with AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, **extra) as client:
+                response = await client.chat.completions.create(
+                    model=self.model_name,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature if temperature is not None else 0.7
+                )
             return {
                 "content": response.choices[0].message.content,
                 "tokens_used": response.usage.total_tokens,
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
                 "model": self.model_name
             }
         except Exception as e:
@@ -141,16 +188,19 @@ class AIService:
             except ImportError as e:
                 raise Exception("Anthropic SDK is not installed. Set provider to 'custom' or install anthropic.") from e
 
-            client = AsyncAnthropic(api_key=self.api_key, base_url=self.base_url)
-            response = await client.messages.create(
-                model=self.model_name,
-                max_tokens=max_tokens,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature if temperature is not None else 0.7
-            )
+            extra = {"http_client": llm_http_client(timeout=60.0)} if cassette_enabled() else {}
+            async with AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, **extra) as client:
+                response = await client.messages.create(
+                    model=self.model_name,
+                    max_tokens=max_tokens,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature if temperature is not None else 0.7
+                )
             return {
                 "content": response.content[0].text,
                 "tokens_used": response.usage.input_tokens + response.usage.output_tokens,
+                "prompt_tokens": response.usage.input_tokens,
+                "completion_tokens": response.usage.output_tokens,
                 "model": self.model_name
             }
         except Exception as e:
@@ -174,7 +224,7 @@ class AIService:
                 api_url = f"{base}/v1/chat/completions"
                 use_chat = True
 
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with llm_http_client(timeout=60.0) as client:
                 payload = {
                     "model": self.model_name,
                     "max_tokens": max_tokens,
@@ -256,12 +306,18 @@ class AIService:
                 if not content:
                     raise Exception(f"Invalid API response structure or empty choices: {data}")
 
-                usage = data.get("usage", {})
-                tokens_used = usage.get("total_tokens") or (
-                    (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
-                )
+                usage = data.get("usage") or {}
+                prompt_tokens = usage.get("prompt_tokens") or usage.get("input_tokens") or 0
+                completion_tokens = usage.get("completion_tokens") or usage.get("output_tokens") or 0
+                tokens_used = usage.get("total_tokens") or (prompt_tokens + completion_tokens)
 
-                return {"content": content, "tokens_used": tokens_used or 0, "model": self.model_name}
+                return {
+                    "content": content,
+                    "tokens_used": tokens_used or 0,
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "model": self.model_name,
+                }
         except httpx.TimeoutException:
             raise Exception("API request timeout (60s)")
         except httpx.RequestError as e:
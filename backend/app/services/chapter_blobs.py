@@ -0,0 +1,205 @@
+"""
+Content-addressed storage for chapter version bodies.
+
+版本正文按 SHA-256 存入 chapter_blobs，相同文本的多个版本共享同一行；
+引用计数由 ChapterVersion 的 after_insert / after_delete 事件维护；
+计数归零的 blob 只由 collect_garbage 回收。
+正文可以留在数据库中，也可以放到外部 blob 存储（BLOB_STORE_BACKEND）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.blob_store import BlobStore, get_blob_store
+from ..core.config import settings
+from ..core.logger import logger
+from ..models.chapter import ChapterBlob, ChapterVersion
+
+
+def content_hash(content: str) -> str:
+    """计算正文的 SHA-256 十六进制摘要。"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_or_create_blob(db: Session, content: str) -> ChapterBlob:
+    """返回正文对应的 blob，不存在时创建（引用计数由版本插入时递增）。
+
+    复用已有行时加行锁直到调用方提交，垃圾回收不会删除即将被新版本引用的行。
+    """
+    digest = content_hash(content)
+    blob = db.get(ChapterBlob, digest, with_for_update=True, populate_existing=True)
+    if blob is not None:
+        return blob
+
+    data = content.encode("utf-8")
+    store = get_blob_store()
+    if store is not None:
+        # 先写外部存储再写元数据；内容寻址保证重复写入无副作用
+        store.put(digest, data)
+        blob = ChapterBlob(hash=digest, content=None, storage=store.name, size=len(data), ref_count=0)
+    else:
+        blob = ChapterBlob(hash=digest, content=content, storage="database", size=len(data), ref_count=0)
+    try:
+        with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # 并发写入了同一内容，直接复用已有行
+        blob = db.get(ChapterBlob, digest)
+    return blob
+
+
+def build_version(
+    db: Session,
+    chapter_id: int,
+    content: str,
+    version_label: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> ChapterVersion:
+    """创建指向内容寻址 blob 的新版本（调用方负责 commit）。"""
+    blob = get_or_create_blob(db, content)
+    version = ChapterVersion(
+        chapter_id=chapter_id,
+        version_label=version_label,
+        provider=provider,
+        legacy_content="",
+        content_hash=blob.hash,
+        blob=blob,
+    )
+    db.add(version)
+    return version
+
+
+def backfill_legacy_versions(db: Session, batch_size: int = 500) -> int:
+    """将仍在 chapter_versions.content 中存放正文的旧行迁移到 blob 表。"""
+    migrated = 0
+    while True:
+        versions = (
+            db.query(ChapterVersion)
+            .filter(ChapterVersion.content_hash.is_(None))
+            .order_by(ChapterVersion.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not versions:
+            break
+        for version in versions:
+            blob = get_or_create_blob(db, version.legacy_content or "")
+            db.flush()
+            db.execute(
+                update(ChapterBlob)
+                .where(ChapterBlob.hash == blob.hash)
+                .values(ref_count=ChapterBlob.ref_count + 1)
+            )
+            version.content_hash = blob.hash
+            version.legacy_content = ""
+        db.commit()
+        migrated += len(versions)
+    logger.info(f"Backfilled {migrated} chapter versions into content-addressed blobs")
+    return migrated
+
+
+def migrate_blobs(db: Session, target: str, batch_size: int = 200) -> int:
+    """在数据库与外部存储之间搬迁 blob 正文（双向），返回搬迁数量。
+
+    每批先写目标位置并提交元数据，提交成功后才删除源存储中的对象。
+    """
+    target_store = get_blob_store(target)
+    moved = 0
+    while True:
+        blobs = (
+            db.query(ChapterBlob)
+            .filter(ChapterBlob.storage != target)
+            .order_by(ChapterBlob.hash)
+            .limit(batch_size)
+            .all()
+        )
+        if not blobs:
+            break
+        stale = []
+        for blob in blobs:
+            data = blob.read_bytes()
+            if target_store is None:
+                blob.content = data.decode("utf-8")
+            else:
+                target_store.put(blob.hash, data)
+                blob.content = None
+            if blob.storage != "database":
+                stale.append((blob.storage, blob.hash))
+            blob.storage = target
+            blob.size = len(data)
+        db.commit()
+        for storage, digest in stale:
+            get_blob_store(storage).delete(digest)
+        moved += len(blobs)
+    logger.info(f"Migrated {moved} chapter blobs to {target}")
+    return moved
+
+
+def collect_garbage(
+    db: Session,
+    store: Optional[BlobStore] = None,
+    grace_seconds: Optional[float] = None,
+) -> int:
+    """按实际引用重算引用计数并删除无人引用的 blob，返回删除数量。
+
+    同时清理外部存储中已没有元数据行的对象（版本删除时只删除元数据行）。
+    保存正文时先写外部存储、再与版本一起提交 blob 行，因此创建时间（对象为
+    修改时间）在 grace_seconds（默认 BLOB_GC_GRACE_SECONDS）内的行与对象
+    一律跳过；被并发保存锁定复用的行（get_or_create_blob）也会跳过。
+    """
+    grace = settings.BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = time.time() - grace
+    referenced = (
+        select(func.count(ChapterVersion.id))
+        .where(ChapterVersion.content_hash == ChapterBlob.hash)
+        .scalar_subquery()
+    )
+    db.execute(update(ChapterBlob).values(ref_count=referenced))
+    db.commit()
+
+    removed = 0
+    try:
+        candidates = [
+            digest for (digest,) in db.query(ChapterBlob.hash)
+            .filter(
+                ChapterBlob.ref_count <= 0,
+                ChapterBlob.created_at < datetime.fromtimestamp(cutoff, tz=timezone.utc),
+            )
+            .with_for_update(skip_locked=True)
+        ]
+        if candidates:
+            still_unreferenced = ~select(ChapterVersion.id).where(ChapterVersion.content_hash == ChapterBlob.hash).exists()
+            removed = (
+                db.query(ChapterBlob)
+                .filter(ChapterBlob.hash.in_(candidates), still_unreferenced)
+                .delete(synchronize_session=False)
+            )
+        db.commit()
+    except IntegrityError as exc:
+        # 复用该 blob 的新版本抢先提交；留待下次回收
+        logger.warning(f"Chapter blob GC skipped rows that gained a reference: {exc}")
+        db.rollback()
+        removed = 0
+
+    store = store or get_blob_store()
+    if store is not None:
+        known = {h for (h,) in db.query(ChapterBlob.hash).filter(ChapterBlob.storage == store.name)}
+        for key in store.keys():
+            if key in known:
+                continue
+            modified = store.modified(key)
+            if modified is None or modified >= cutoff:
+                continue
+            store.delete(key)
+            removed += 1
+    if removed:
+        logger.info(f"Garbage-collected {removed} unreferenced chapter blobs")
+    return removed
@@ -0,0 +1,312 @@
+"""
+Write-behind aggregation of usage counters.
+
+UsageMetric 是按请求递增的计数器（api_requests、ai_requests 等）；每次请求直接写库
+会让少数热点行成为锁争用点。这里先在内存（或 Redis INCRBY/HINCRBY）中累加增量，
+每 COUNTER_FLUSH_SECONDS 秒及进程退出时用一条批量
+INSERT ... ON CONFLICT DO UPDATE SET value = value + excluded.value 写回。
+实时读数 = 已落库值 + 尚未刷新的增量。
+
+COUNTER_BACKEND:
+- database: 不做聚合，每次递增立即写库
+- memory:   进程内聚合；各进程只看得到自己的增量，实时读数在多进程下偏低
+- redis:    多进程共享的 Redis 哈希，任一进程的刷新任务都会写回全部增量
+
+每日配额（user_daily_requests）不在这里：它由 services/quota.consume_daily_request
+直接以原子 upsert 计数，多进程各自的缓冲会让总放行数成倍超过上限。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.logger import logger
+from ..models.usage_metric import UsageMetric
+from .quota import _UPSERT_DIALECTS
+
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+METRICS_BUCKET = "metrics"
+
+# bucket -> field -> pending delta
+Pending = Dict[str, Dict[str, int]]
+
+
+class _MemoryBackend:
+    """Process-local deltas; entries being flushed stay visible until committed.
+
+    ``_lock`` guards the pending deltas and is all :meth:`incr` (called on
+    every request) takes. ``_inflight_lock`` guards the batch being flushed
+    and is held across the database commit, so only live reads wait on a
+    slow commit and they never see a delta both committed and in flight.
+    """
+
+    def __init__(self):
+        self._pending: Pending = defaultdict(dict)
+        self._inflight: Pending = {}
+        self._lock = threading.Lock()
+        self._inflight_lock = threading.Lock()
+
+    def incr(self, bucket: str, field: str, amount: int) -> None:
+        with self._lock:
+            fields = self._pending[bucket]
+            fields[field] = fields.get(field, 0) + amount
+
+    def read(self, bucket: str) -> Dict[str, int]:
+        with self._inflight_lock, self._lock:
+            merged = dict(self._inflight.get(bucket, {}))
+            for field, amount in self._pending.get(bucket, {}).items():
+                merged[field] = merged.get(field, 0) + amount
+            return merged
+
+    def pop_all(self) -> Pending:
+        with self._inflight_lock, self._lock:
+            pending = {bucket: fields for bucket, fields in self._pending.items() if fields}
+            self._pending = defaultdict(dict)
+            self._inflight = pending
+        return pending
+
+    def done(self, pending: Pending) -> None:
+        with self._inflight_lock:
+            self._inflight = {}
+
+    def settle(self, pending: Pending, commit: Callable[[], None]) -> None:
+        """Commit and drop the in-flight deltas without blocking :meth:`incr`."""
+        with self._inflight_lock:
+            commit()
+            self._inflight = {}
+
+    def restore(self, pending: Pending) -> None:
+        with self._inflight_lock, self._lock:
+            for bucket, fields in pending.items():
+                target = self._pending[bucket]
+                for field, amount in fields.items():
+                    target[field] = target.get(field, 0) + amount
+            self._inflight = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(fields) for fields in self._pending.values())
+
+
+class _RedisBackend:
+    """Deltas in Redis hashes (HINCRBY), shared by every worker.
+
+    A flush atomically RENAMEs each pending hash to a per-worker ``flushing``
+    key, so increments that arrive meanwhile start a fresh hash; the flushing
+    keys are still counted by :meth:`read` until the database commit.
+    """
+
+    buckets_key = "counters:buckets"
+
+    def __init__(self, client):
+        self._client = client
+        self._worker = uuid.uuid4().hex[:8]
+
+    @staticmethod
+    def _pending_key(bucket: str) -> str:
+        return f"counters:pending:{bucket}"
+
+    def _flushing_key(self, bucket: str) -> str:
+        return f"counters:flushing:{self._worker}:{bucket}"
+
+    def incr(self, bucket: str, field: str, amount: int) -> None:
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hincrby(self._pending_key(bucket), field, amount)
+        pipe.sadd(self.buckets_key, bucket)
+        pipe.execute()
+
+    def read(self, bucket: str) -> Dict[str, int]:
+        merged: Dict[str, int] = {}
+        keys = [self._pending_key(bucket)] + list(self._client.scan_iter(f"counters:flushing:*:{bucket}"))
+        for key in keys:
+            for field, amount in self._client.hgetall(key).items():
+                merged[field] = merged.get(field, 0) + int(amount)
+        return merged
+
+    def pop_all(self) -> Pending:
+        pending: Pending = {}
+        for bucket in self._client.smembers(self.buckets_key):
+            flushing = self._flushing_key(bucket)
+            try:
+                self._client.rename(self._pending_key(bucket), flushing)
+            except redis.ResponseError:  # 无待刷新增量
+                self._client.srem(self.buckets_key, bucket)
+                if self._client.exists(self._pending_key(bucket)):  # 期间又有新增量
+                    self._client.sadd(self.buckets_key, bucket)
+                continue
+            fields = {field: int(amount) for field, amount in self._client.hgetall(flushing).items()}
+            if fields:
+                pending[bucket] = fields
+        return pending
+
+    def done(self, pending: Pending) -> None:
+        if pending:
+            self._client.delete(*(self._flushing_key(bucket) for bucket in pending))
+
+    def settle(self, pending: Pending, commit: Callable[[], None]) -> None:
+        # Redis 与数据库无法在同一事务中提交；提交到删除之间的短暂重复只影响实时读数
+        commit()
+        self.done(pending)
+
+    def restore(self, pending: Pending) -> None:
+        for bucket, fields in pending.items():
+            pipe = self._client.pipeline(transaction=True)
+            for field, amount in fields.items():
+                pipe.hincrby(self._pending_key(bucket), field, amount)
+            pipe.sadd(self.buckets_key, bucket)
+            pipe.delete(self._flushing_key(bucket))
+            pipe.execute()
+
+    def __len__(self) -> int:
+        return sum(int(self._client.hlen(self._pending_key(b))) for b in self._client.smembers(self.buckets_key))
+
+
+def _create_backend():
+    if settings.COUNTER_BACKEND == "redis" and redis is not None:
+        try:
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True)
+            client.ping()
+            return _RedisBackend(client)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"Redis counters unavailable, falling back to memory: {exc}")
+    return _MemoryBackend()
+
+
+def _upsert_metrics(db: Session, deltas: Dict[str, int]) -> None:
+    table = UsageMetric.__table__
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(table).values([{"key": key, "value": amount} for key, amount in deltas.items()])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={"value": table.c.value + stmt.excluded.value},
+        ))
+        return
+    for key, amount in deltas.items():
+        if not db.execute(update(table).where(table.c.key == key).values(value=table.c.value + amount)).rowcount:
+            db.execute(table.insert().values(key=key, value=amount))
+
+
+class CounterAggregator:
+    """Batches counter increments and writes them back periodically."""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, backend=None):
+        self._session_factory = session_factory
+        self._backend = backend
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def write_behind(self) -> bool:
+        return self._backend is not None or settings.COUNTER_BACKEND != "database"
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = _create_backend()
+        return self._backend
+
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            from ..core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    # ---- increments ----
+
+    def incr_metric(self, key: str, amount: int = 1) -> None:
+        if self.write_behind:
+            self.backend.incr(METRICS_BUCKET, key, amount)
+            return
+        with self._session() as db:
+            _upsert_metrics(db, {key: amount})
+            db.commit()
+
+    # ---- live values ----
+
+    def live_metrics(self, db: Session) -> Dict[str, int]:
+        values = {row.key: row.value for row in db.query(UsageMetric).all()}
+        if self.write_behind:
+            for key, amount in self.backend.read(METRICS_BUCKET).items():
+                values[key] = values.get(key, 0) + amount
+        return values
+
+    def pending_count(self) -> int:
+        return len(self.backend) if self._backend is not None else 0
+
+    def clear(self) -> None:
+        """Drop buffered deltas without writing them (tests and resets)."""
+        if self._backend is not None:
+            self.backend.done(self.backend.pop_all())
+
+    # ---- flushing ----
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Upsert all buffered deltas in one transaction; returns counters written."""
+        if self._backend is None:
+            return 0
+        pending = self.backend.pop_all()
+        if not pending:
+            return 0
+
+        own_session = db is None
+        if own_session:
+            db = self._session()
+        written = 0
+        try:
+            for bucket, deltas in pending.items():
+                deltas = {field: amount for field, amount in deltas.items() if amount}
+                if not deltas:
+                    continue
+                _upsert_metrics(db, deltas)
+                written += len(deltas)
+            self.backend.settle(pending, db.commit)
+            logger.debug("Counter aggregator flushed %d counters", written)
+        except SQLAlchemyError as exc:
+            logger.error(f"Counter flush failed: {exc}")
+            db.rollback()
+            self.backend.restore(pending)
+            written = 0
+        finally:
+            if own_session:
+                db.close()
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.COUNTER_FLUSH_SECONDS)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"Counter aggregator loop error: {exc}")
+
+    def start(self) -> None:
+        if self.write_behind and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the periodic flush and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+
+# Global aggregator instance
+counter_aggregator = CounterAggregator()
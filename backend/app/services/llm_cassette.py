@@ -0,0 +1,231 @@
+"""
+LLM record/replay cassettes.
+
+AIService 发往提供商的 HTTP 请求都经过 llm_http_client()。AI_CASSETTE_MODE 控制行为：
+- off：直连提供商（默认）；
+- record：照常请求，同时把请求/响应对写入 AI_CASSETTE_PATH，包括响应头到达时间
+  与每个响应体分块（流式 SSE 亦然）相对请求开始的时间偏移；
+- replay：不访问网络，按请求匹配录制的响应，并按原始时间轴（乘以
+  AI_CASSETTE_LATENCY_SCALE，0 为立即返回）逐块回放。未录制的请求直接报错。
+
+匹配键为方法、URL 路径与规范化后的请求体（不含主机、端口与鉴权头），因此同一份
+cassette 可以在不同的 mock/真实地址与密钥之间复用；同一请求录制多次时按顺序回放，
+用尽后重复最后一次。文件为 JSON Lines，一行一次交互，以 .gz 结尾时自动压缩。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from ..core.config import settings
+from ..core.logger import logger
+from ..core.tracing import traced_async_client
+
+CASSETTE_MODES = ("off", "record", "replay")
+# Response headers worth keeping; everything else is connection noise
+_KEPT_HEADERS = ("content-type", "content-encoding", "retry-after", "request-id", "x-request-id")
+
+
+class CassetteMiss(httpx.TransportError):
+    """Replay mode received a request that was never recorded."""
+
+
+def request_key(request: httpx.Request) -> str:
+    body = request.content or b""
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    except ValueError:
+        pass
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return f"{request.method} {request.url.path} {digest}"
+
+
+def _encode_chunk(chunk: bytes) -> Any:
+    try:
+        return chunk.decode("utf-8")
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(chunk).decode("ascii")}
+
+
+def _decode_chunk(chunk: Any) -> bytes:
+    return base64.b64decode(chunk["b64"]) if isinstance(chunk, dict) else chunk.encode("utf-8")
+
+
+class Cassette:
+    """Interactions of one cassette file, keyed by :func:`request_key`."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._interactions: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with self._open("rt") as handle:
+                for line in handle:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self._interactions[interaction["key"]].append(interaction)
+
+    def _open(self, mode: str):
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode, encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._interactions.values())
+
+    def next_for(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                return None
+            index = min(self._cursor[key], len(recorded) - 1)
+            self._cursor[key] += 1
+            return recorded[index]
+
+    def append(self, interaction: Dict[str, Any]) -> None:
+        with self._lock:
+            self._interactions[interaction["key"]].append(interaction)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._open("at") as handle:
+                handle.write(json.dumps(interaction, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+async def _single(content: bytes) -> AsyncIterator[bytes]:
+    yield content
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    def __init__(self, response: httpx.Response, started: float, on_close):
+        self._response = response
+        self._started = started
+        self._on_close = on_close
+        self.chunks: List[Tuple[float, Any]] = []
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        # Transports that return an already-read body (mocks, ASGI) yield it as one chunk
+        source = self._response.aiter_raw() if not self._response.is_stream_consumed else _single(self._response.content)
+        async for chunk in source:
+            self.chunks.append([round((time.perf_counter() - self._started) * 1000, 2), _encode_chunk(chunk)])
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._response.aclose()
+        self._on_close(self.chunks)
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: List[Tuple[float, Any]], start_offset_ms: float, scale: float):
+        self._chunks = chunks
+        self._offset = start_offset_ms
+        self._scale = scale
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        previous = self._offset
+        for offset, chunk in self._chunks:
+            if self._scale > 0 and offset > previous:
+                await asyncio.sleep((offset - previous) / 1000 * self._scale)
+            previous = offset
+            yield _decode_chunk(chunk)
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records to or replays from a :class:`Cassette`."""
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        mode: str,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        latency_scale: float = 1.0,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        self.cassette = cassette
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._transport = transport if transport is not None or mode == "replay" else httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        if self.mode == "replay":
+            return await self._replay(request, key)
+
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        headers_ms = round((time.perf_counter() - started) * 1000, 2)
+        headers = {name: value for name, value in response.headers.items() if name.lower() in _KEPT_HEADERS}
+
+        def save(chunks):
+            self.cassette.append({
+                "key": key,
+                "request": {"method": request.method, "url": str(request.url.copy_with(query=None))},
+                "response": {"status": response.status_code, "headers": headers, "headers_ms": headers_ms, "chunks": chunks},
+                "recorded_at": time.time(),
+            })
+
+        recording = _RecordingStream(response, started, save)
+        return httpx.Response(status_code=response.status_code, headers=response.headers, stream=recording,
+                              extensions=response.extensions)
+
+    async def _replay(self, request: httpx.Request, key: str) -> httpx.Response:
+        interaction = self.cassette.next_for(key)
+        if interaction is None:
+            raise CassetteMiss(f"No recorded interaction for {key} in {self.cassette.path}", request=request)
+        recorded = interaction["response"]
+        if self.latency_scale > 0:
+            await asyncio.sleep(recorded["headers_ms"] / 1000 * self.latency_scale)
+        return httpx.Response(
+            status_code=recorded["status"],
+            headers=recorded["headers"],
+            stream=_ReplayStream(recorded["chunks"], recorded["headers_ms"], self.latency_scale),
+        )
+
+    async def aclose(self) -> None:
+        if self._transport is not None:
+            await self._transport.aclose()
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str) -> Cassette:
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = _cassettes[path] = Cassette(path)
+            logger.info("LLM cassette %s loaded (%d interactions)", path, len(cassette))
+        return cassette
+
+
+def reset_cassettes() -> None:
+    with _cassettes_lock:
+        _cassettes.clear()
+
+
+def cassette_enabled() -> bool:
+    return settings.AI_CASSETTE_MODE in ("record", "replay")
+
+
+def llm_http_client(**kwargs: Any) -> httpx.AsyncClient:
+    """Traced httpx client for provider calls, recording/replaying per AI_CASSETTE_MODE."""
+    if cassette_enabled():
+        kwargs["transport"] = CassetteTransport(
+            get_cassette(settings.AI_CASSETTE_PATH),
+            settings.AI_CASSETTE_MODE,
+            transport=kwargs.pop("transport", None),
+            latency_scale=settings.AI_CASSETTE_LATENCY_SCALE,
+        )
+    return traced_async_client(**kwargs)
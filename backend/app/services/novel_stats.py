@@ -0,0 +1,150 @@
+"""
+Per-novel aggregates for the admin novel listing.
+
+一次查询返回一页小说及其章节数、字数、版本数与最近活动时间：
+- 按小说自身字段排序时，先用键集分页选出当页小说 id（派生表），
+  章节/版本聚合只在当页小说上 GROUP BY；
+- 按聚合值排序时，聚合须覆盖全部小说，再在其上做键集分页。
+
+游标为 base64 编码的 [排序值, id]，排序值按数据库原样回传比较，
+因此时间戳在 SQLite（文本）与 PostgreSQL（timestamp）上都能精确续页。
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, and_, case, func, literal, or_, select, type_coerce
+from sqlalchemy.orm import Session
+
+from ..models.chapter import Chapter, ChapterVersion
+from ..models.novel import Novel
+
+NOVEL_SORTS = ("created_at", "updated_at", "title")
+AGGREGATE_SORTS = ("chapter_count", "word_count", "version_count", "last_activity")
+SORT_FIELDS = NOVEL_SORTS + AGGREGATE_SORTS
+
+
+def encode_cursor(sort_value: Any, novel_id: str) -> str:
+    raw = json.dumps([sort_value if isinstance(sort_value, (int, float, str)) else str(sort_value), novel_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        sort_value, novel_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return sort_value, str(novel_id)
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+def _greatest(*exprs):
+    """Portable GREATEST() for non-null expressions."""
+    result = exprs[0]
+    for expr in exprs[1:]:
+        result = case((result >= expr, result), else_=expr)
+    return result
+
+
+def _keyset(sort_expr, id_expr, cursor: Optional[str], descending: bool):
+    if not cursor:
+        return None
+    sort_value, last_id = decode_cursor(cursor)
+    # 文本按原样绑定（不经 DateTime 类型处理），与库中存储的时间戳逐字比较
+    value = literal(sort_value, type_=String()) if isinstance(sort_value, str) else literal(sort_value)
+    after = (sort_expr < value) if descending else (sort_expr > value)
+    next_id = (id_expr < last_id) if descending else (id_expr > last_id)
+    return or_(after, and_(sort_expr == value, next_id))
+
+
+def _ordering(sort_expr, id_expr, descending: bool):
+    return (sort_expr.desc(), id_expr.desc()) if descending else (sort_expr.asc(), id_expr.asc())
+
+
+def list_novel_stats(
+    db: Session,
+    sort_by: str = "created_at",
+    descending: bool = True,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return ``(items, next_cursor)`` for one page of novels with aggregates."""
+    page = None
+    if sort_by in NOVEL_SORTS:
+        column = getattr(Novel, sort_by)
+        page_query = select(Novel.id).order_by(*_ordering(column, Novel.id, descending)).limit(limit + 1)
+        condition = _keyset(column, Novel.id, cursor, descending)
+        if condition is not None:
+            page_query = page_query.where(condition)
+        page = page_query.subquery("page")
+
+    chapters = select(
+        Chapter.novel_id.label("novel_id"),
+        func.count(Chapter.id).label("chapter_count"),
+        func.coalesce(func.sum(Chapter.word_count), 0).label("word_count"),
+        func.max(Chapter.updated_at).label("last_chapter_at"),
+    )
+    versions = select(
+        Chapter.novel_id.label("novel_id"),
+        func.count(ChapterVersion.id).label("version_count"),
+        func.max(ChapterVersion.created_at).label("last_version_at"),
+    ).join(ChapterVersion, ChapterVersion.chapter_id == Chapter.id)
+    if page is not None:
+        chapters = chapters.join(page, page.c.id == Chapter.novel_id)
+        versions = versions.join(page, page.c.id == Chapter.novel_id)
+    chapters = chapters.group_by(Chapter.novel_id).subquery("chapter_stats")
+    versions = versions.group_by(Chapter.novel_id).subquery("version_stats")
+
+    chapter_count = func.coalesce(chapters.c.chapter_count, 0)
+    word_count = func.coalesce(chapters.c.word_count, 0)
+    version_count = func.coalesce(versions.c.version_count, 0)
+    last_activity = _greatest(
+        Novel.updated_at,
+        func.coalesce(chapters.c.last_chapter_at, Novel.updated_at),
+        func.coalesce(versions.c.last_version_at, Novel.updated_at),
+    )
+    sort_exprs = {
+        "chapter_count": chapter_count,
+        "word_count": word_count,
+        "version_count": version_count,
+        "last_activity": last_activity,
+    }
+    sort_expr = sort_exprs.get(sort_by) if sort_by in AGGREGATE_SORTS else getattr(Novel, sort_by)
+
+    query = (
+        select(
+            Novel.id,
+            Novel.title,
+            Novel.status,
+            Novel.user_id,
+            Novel.created_at,
+            Novel.updated_at,
+            chapter_count.label("chapter_count"),
+            word_count.label("word_count"),
+            version_count.label("version_count"),
+            last_activity.label("last_activity"),
+            # 原样取回排序值用于游标
+            type_coerce(sort_expr, String).label("sort_key"),
+        )
+        .outerjoin(chapters, chapters.c.novel_id == Novel.id)
+        .outerjoin(versions, versions.c.novel_id == Novel.id)
+        .order_by(*_ordering(sort_expr, Novel.id, descending))
+        .limit(limit + 1)
+    )
+    if page is not None:
+        query = query.join(page, page.c.id == Novel.id)
+    else:
+        condition = _keyset(sort_expr, Novel.id, cursor, descending)
+        if condition is not None:
+            query = query.where(condition)
+
+    rows = db.execute(query).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["sort_key"], rows[-1]["id"])
+    items = [{key: value for key, value in row.items() if key != "sort_key"} for row in rows]
+    return items, next_cursor
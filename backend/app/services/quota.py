@@ -0,0 +1,77 @@
+"""
+Per-user daily AI request quota.
+
+每次 AI 调用以一条原子语句为 user_daily_requests 计数加一：
+INSERT ... ON CONFLICT DO UPDATE ... WHERE request_count < limit RETURNING，
+并发请求不会出现“先读后写”导致的超额；未返回行即表示当日额度已用尽。
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.user_daily_request import UserDailyRequest
+
+_UPSERT_DIALECTS = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+
+
+def _increment_with_upsert(db: Session, insert, user_id: int, day: date, limit: int) -> Optional[int]:
+    table = UserDailyRequest.__table__
+    stmt = insert(table).values(user_id=user_id, request_date=day, request_count=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.request_date],
+        set_={"request_count": table.c.request_count + 1},
+        where=table.c.request_count < limit,
+    ).returning(table.c.request_count)
+    return db.execute(stmt).scalar()
+
+
+def _increment_portable(db: Session, user_id: int, day: date, limit: int) -> Optional[int]:
+    """Fallback for dialects without ON CONFLICT: conditional UPDATE, then INSERT."""
+    table = UserDailyRequest.__table__
+    condition = (table.c.user_id == user_id) & (table.c.request_date == day)
+    for _ in range(2):
+        result = db.execute(
+            update(table)
+            .where(condition & (table.c.request_count < limit))
+            .values(request_count=table.c.request_count + 1)
+        )
+        if result.rowcount:
+            return db.query(UserDailyRequest.request_count).filter(
+                UserDailyRequest.user_id == user_id, UserDailyRequest.request_date == day
+            ).scalar()
+        if db.query(UserDailyRequest.id).filter(
+            UserDailyRequest.user_id == user_id, UserDailyRequest.request_date == day
+        ).first():
+            return None
+        try:
+            with db.begin_nested():
+                db.execute(table.insert().values(user_id=user_id, request_date=day, request_count=1))
+            return 1
+        except IntegrityError:
+            continue  # 并发插入，重试条件更新
+    return None
+
+
+def consume_daily_request(db: Session, user_id: int, limit: int, day: Optional[date] = None) -> Optional[int]:
+    """Atomically count one request for today.
+
+    Returns the new count, or None when the user already reached ``limit``.
+    The caller's transaction is committed so the increment is visible to
+    other workers immediately.
+    """
+    day = day or date.today()
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        count = _increment_with_upsert(db, insert, user_id, day, limit)
+    else:
+        count = _increment_portable(db, user_id, day, limit)
+    db.commit()
+    return count
@@ -0,0 +1,281 @@
+"""
+Fractional-rank ordering for characters, plots and chapters.
+
+每个条目保存一个分数索引键 rank，拖拽移动只改写被移动的那一行；
+原有的整数字段（Character.position / Plot.order / Chapter.chapter_number）
+作为展示值，读取时按 rank 顺序推导，并由后台重排任务周期性回写。重排只改写
+展示值变化的条目，以及键过长（拥挤）条目附近的一小段 rank。
+
+移动、按编号插入与重排都会先锁住所属小说行（SELECT ... FOR UPDATE），
+同一小说下的 rank 改写因此按事务串行，不同 worker 之间不会互相覆盖。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.fractional_index import key_between, keys_between
+from ..core.logger import logger
+from ..models.chapter import Chapter
+from ..models.character import Character
+from ..models.novel import Novel
+from ..models.plot import Plot
+
+# model -> (display integer attribute, first display value)
+ORDERED_MODELS: Dict[Type, Tuple[str, int]] = {
+    Character: ("position", 0),
+    Plot: ("order", 0),
+    Chapter: ("chapter_number", 1),
+}
+
+# 键长超过该值时立即安排重排，避免反复在同一位置插入导致键无限增长
+MAX_RANK_LENGTH = 24
+# 重排时键长超过该值（或尚无 rank、顺序冲突）的条目视为拥挤，
+# 连同前后 REBALANCE_RADIUS 个条目在两侧邻居之间重新均匀分配 rank
+CROWDED_RANK_LENGTH = 8
+REBALANCE_RADIUS = 4
+
+
+def _display_attr(model: Type) -> str:
+    return ORDERED_MODELS[model][0]
+
+
+def _siblings(db: Session, model: Type, novel_id: str):
+    return db.query(model).filter(model.novel_id == novel_id)
+
+
+def lock_order(db: Session, novel_id: str) -> None:
+    """锁住小说行直到事务结束，串行化该小说下的排序改写（SQLite 忽略 FOR UPDATE）。"""
+    db.query(Novel.id).filter(Novel.id == novel_id).with_for_update().first()
+
+
+def order_by_rank(query, model: Type):
+    """按 rank 排序；尚未分配 rank 的旧数据排在最后并按原整数字段排序。"""
+    attr = getattr(model, _display_attr(model))
+    return query.order_by(model.rank.is_(None), model.rank, attr, model.id)
+
+
+def ensure_ranks(db: Session, model: Type, novel_id: str) -> None:
+    """为尚无 rank 的旧数据按原整数顺序一次性分配 rank（不提交）。"""
+    if _siblings(db, model, novel_id).filter(model.rank.is_(None)).first() is None:
+        return
+    rows = order_by_rank(_siblings(db, model, novel_id), model).all()
+    for row, rank in zip(rows, keys_between(None, None, len(rows))):
+        row.rank = rank
+    db.flush()
+
+
+def place_by_display(db: Session, item, display_value: Optional[int]) -> None:
+    """按整数展示值为新建/修改的条目确定 rank，兼容旧的按编号排序写法。"""
+    model = type(item)
+    lock_order(db, item.novel_id)
+    ensure_ranks(db, model, item.novel_id)
+    attr = getattr(model, _display_attr(model))
+    siblings = _siblings(db, model, item.novel_id).filter(model.rank.isnot(None))
+    if item.id is not None:
+        siblings = siblings.filter(model.id != item.id)
+
+    previous = None
+    if display_value is not None:
+        previous = siblings.filter(attr <= display_value).order_by(model.rank.desc()).first()
+    else:
+        previous = siblings.order_by(model.rank.desc()).first()
+    following_query = siblings.order_by(model.rank)
+    if previous is not None:
+        following_query = following_query.filter(model.rank > previous.rank)
+    following = following_query.first()
+    item.rank = key_between(previous.rank if previous else None, following.rank if following else None)
+    # 其余条目的展示值随之变化，由重排回写
+    rank_rebalancer.mark(model, item.novel_id)
+    _check_length(model, item)
+
+
+def move_item(db: Session, item, after_id: Optional[int] = None, before_id: Optional[int] = None) -> None:
+    """把条目移动到 after_id 之后或 before_id 之前，只改写该条目一行（不提交）。"""
+    model = type(item)
+    lock_order(db, item.novel_id)
+    ensure_ranks(db, model, item.novel_id)
+    siblings = _siblings(db, model, item.novel_id).filter(model.id != item.id)
+
+    if after_id is not None:
+        anchor = siblings.filter(model.id == after_id).first()
+        if anchor is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anchor item not found")
+        following = siblings.filter(model.rank > anchor.rank).order_by(model.rank).first()
+        lower, upper = anchor.rank, following.rank if following else None
+    elif before_id is not None:
+        anchor = siblings.filter(model.id == before_id).first()
+        if anchor is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anchor item not found")
+        preceding = siblings.filter(model.rank < anchor.rank).order_by(model.rank.desc()).first()
+        lower, upper = preceding.rank if preceding else None, anchor.rank
+    else:
+        # 未指定锚点：移动到最前
+        first = siblings.order_by(model.rank).first()
+        lower, upper = None, first.rank if first else None
+
+    item.rank = key_between(lower, upper)
+    rank_rebalancer.mark(model, item.novel_id)
+    _check_length(model, item)
+
+
+def _check_length(model: Type, item) -> None:
+    if item.rank and len(item.rank) > MAX_RANK_LENGTH:
+        rank_rebalancer.mark(model, item.novel_id, urgent=True)
+
+
+def display_values(model: Type, items, skip: int = 0) -> Dict[int, int]:
+    """按 rank 顺序推导展示用整数（列表已按 rank 排序时使用）。"""
+    start = ORDERED_MODELS[model][1] + skip
+    return {item.id: start + index for index, item in enumerate(items)}
+
+
+def display_value(db: Session, item) -> int:
+    """单个条目的当前展示值：同一小说中排在它之前的条目数。"""
+    model = type(item)
+    before = _siblings(db, model, item.novel_id).filter(model.rank < item.rank).count()
+    return ORDERED_MODELS[model][1] + before
+
+
+def _crowded(ranks: List[Optional[str]]) -> List[int]:
+    return [
+        index for index, rank in enumerate(ranks)
+        if rank is None or len(rank) > CROWDED_RANK_LENGTH or (index and ranks[index - 1] is not None and rank <= ranks[index - 1])
+    ]
+
+
+def respace_ranks(ranks: List[Optional[str]]) -> List[Optional[str]]:
+    """只为拥挤条目所在的局部区间重新分配 rank，其余键保持不变。
+
+    区间以拥挤条目为中心向两侧扩展 REBALANCE_RADIUS 个条目，在区间外的两个邻居之间生成新键；
+    邻居过近导致新键仍然过长时，区间成倍扩大，最坏情况下覆盖全部条目。
+    """
+    result = list(ranks)
+    crowded = _crowded(ranks)
+    last = len(ranks) - 1
+    position = 0
+    while position < len(crowded):
+        low = max(crowded[position] - REBALANCE_RADIUS, 0)
+        high = min(crowded[position] + REBALANCE_RADIUS, last)
+        while True:
+            # 并入落在区间内或紧邻区间上界的拥挤条目，上界邻居因此总是有效的键
+            while position < len(crowded) and crowded[position] <= high + 1:
+                high = min(max(high, crowded[position] + REBALANCE_RADIUS), last)
+                position += 1
+            lower = result[low - 1] if low > 0 else None
+            upper = result[high + 1] if high < last else None
+            keys = keys_between(lower, upper, high - low + 1)
+            if all(len(key) <= CROWDED_RANK_LENGTH for key in keys) or (low == 0 and high == last):
+                break
+            grow = max(high - low + 1, REBALANCE_RADIUS)
+            low, high = max(low - grow, 0), min(high + grow, last)
+        result[low:high + 1] = keys
+    return result
+
+
+def rebalance(db: Session, model: Type, novel_id: str) -> int:
+    """回写变化的整数展示值并疏散拥挤的 rank；返回改写行数。"""
+    attr_name, first_value = ORDERED_MODELS[model]
+    attr = getattr(model, attr_name)
+    lock_order(db, novel_id)
+    rows = (
+        db.query(model.id, model.rank, attr)
+        .filter(model.novel_id == novel_id)
+        .order_by(model.rank.is_(None), model.rank, attr, model.id)
+        .all()
+    )
+    new_ranks = respace_ranks([rank for _, rank, _ in rows])
+    updates = []
+    for index, ((row_id, rank, display), new_rank) in enumerate(zip(rows, new_ranks)):
+        if rank != new_rank or display != first_value + index:
+            updates.append({"id": row_id, "rank": new_rank, attr_name: first_value + index})
+    if updates:
+        db.bulk_update_mappings(model, updates)
+    db.commit()
+    return len(updates)
+
+
+class RankRebalancer:
+    """后台任务：周期性重排被移动过的小说下的条目；停止时把未处理的小说重排完。"""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        self._session_factory = session_factory
+        self._dirty: Set[Tuple[Type, str]] = set()
+        self._lock = threading.Lock()
+        self._urgent = False
+        self._task: Optional[asyncio.Task] = None
+
+    def mark(self, model: Type, novel_id: str, urgent: bool = False) -> None:
+        with self._lock:
+            self._dirty.add((model, novel_id))
+            self._urgent = self._urgent or urgent
+
+    def run_once(self, db: Optional[Session] = None) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._urgent = False
+        if not dirty:
+            return 0
+
+        own_session = db is None
+        if own_session:
+            if self._session_factory is None:
+                from ..core.database import SessionLocal
+                self._session_factory = SessionLocal
+            db = self._session_factory()
+        written = 0
+        try:
+            for model, novel_id in dirty:
+                written += rebalance(db, model, novel_id)
+        except Exception as exc:  # noqa: BLE001
+            logger.error(f"Rank rebalance failed: {exc}")
+            db.rollback()
+            with self._lock:
+                self._dirty |= dirty
+        finally:
+            if own_session:
+                db.close()
+        if written:
+            logger.info(f"Rebalanced {written} ordered rows across {len(dirty)} novels")
+        return written
+
+    async def _run(self) -> None:
+        elapsed = 0.0
+        while True:
+            await asyncio.sleep(1.0)
+            elapsed += 1.0
+            if not self._urgent and elapsed < settings.RANK_REBALANCE_INTERVAL_SECONDS:
+                continue
+            elapsed = 0.0
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"Rank rebalancer loop error: {exc}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # 待重排集合只在本进程内存中，退出前处理完，避免展示值停留在旧编号
+        try:
+            await asyncio.to_thread(self.run_once)
+        except Exception as exc:  # noqa: BLE001
+            logger.error(f"Final rank rebalance failed: {exc}")
+
+
+# Global rebalancer instance
+rank_rebalancer = RankRebalancer()
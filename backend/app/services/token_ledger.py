@@ -0,0 +1,249 @@
+"""
+Token usage ledger.
+
+AIService.generate 每次调用都会 record() 一条用量记录（用户、小说、提供商、模型、
+prompt/completion tokens、耗时、是否命中缓存）。记录先进入内存队列，由后台任务每
+TOKEN_LEDGER_FLUSH_SECONDS 秒（或积累到 TOKEN_LEDGER_BATCH_SIZE 条时）批量写入：
+一次 executemany 插入流水表，同时把同批记录在内存中聚合后 upsert 到小时/天汇总表，
+管理端看板只查询汇总表，无需扫描流水。
+
+整批写入因约束错误（IntegrityError，例如用户已被删除导致外键失败）被拒时，逐条重写
+该批记录，仍被拒的记录计入 rejected 并丢弃，不会阻塞后续批次；其他数据库错误视为
+暂时性故障，整批放回队列等待下次刷新。
+
+用户与小说归属通过 contextvar 传递：配额依赖绑定当前用户，生成接口由上下文中的
+novel.id 推断小说，因此 AIService 本身无需感知请求。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.logger import logger
+from ..models.token_usage import TokenUsage, TokenUsageDaily, TokenUsageHourly
+from .quota import _UPSERT_DIALECTS
+
+_usage_user: ContextVar[Optional[int]] = ContextVar("usage_user", default=None)
+
+ROLLUP_COUNTERS = ("requests", "cache_hits", "prompt_tokens", "completion_tokens", "latency_ms_total")
+
+
+def bind_usage_user(user_id: Optional[int]) -> None:
+    """Attribute AI generations made by the current request to ``user_id``."""
+    _usage_user.set(user_id)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class UsageRecord:
+    provider: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: int = 0
+    cache_hit: bool = False
+    user_id: Optional[int] = field(default_factory=_usage_user.get)
+    novel_id: Optional[str] = None
+    created_at: datetime = field(default_factory=_utcnow)
+
+
+def _rollup(records: List[UsageRecord]) -> Tuple[Dict[tuple, Dict[str, int]], Dict[tuple, Dict[str, int]]]:
+    hourly: Dict[tuple, Dict[str, int]] = {}
+    daily: Dict[tuple, Dict[str, int]] = {}
+    for record in records:
+        dims = (record.user_id or 0, record.provider, record.model)
+        hour = record.created_at.replace(minute=0, second=0, microsecond=0)
+        for target, bucket in ((hourly, hour), (daily, record.created_at.date())):
+            totals = target.setdefault((bucket,) + dims, dict.fromkeys(ROLLUP_COUNTERS, 0))
+            totals["requests"] += 1
+            totals["cache_hits"] += int(record.cache_hit)
+            totals["prompt_tokens"] += record.prompt_tokens
+            totals["completion_tokens"] += record.completion_tokens
+            totals["latency_ms_total"] += record.latency_ms
+    return hourly, daily
+
+
+def _upsert_rollup(db: Session, model, deltas: Dict[tuple, Dict[str, int]]) -> None:
+    if not deltas:
+        return
+    table = model.__table__
+    rows = [
+        dict(bucket=bucket, user_id=user_id, provider=provider, model=model_name, **totals)
+        for (bucket, user_id, provider, model_name), totals in deltas.items()
+    ]
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(table).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.bucket, table.c.user_id, table.c.provider, table.c.model],
+            set_={name: table.c[name] + stmt.excluded[name] for name in ROLLUP_COUNTERS},
+        ))
+        return
+    for row in rows:
+        condition = (
+            (table.c.bucket == row["bucket"]) & (table.c.user_id == row["user_id"])
+            & (table.c.provider == row["provider"]) & (table.c.model == row["model"])
+        )
+        values = {name: table.c[name] + row[name] for name in ROLLUP_COUNTERS}
+        if not db.execute(update(table).where(condition).values(**values)).rowcount:
+            db.execute(table.insert().values(**row))
+
+
+class TokenLedgerWriter:
+    """Batched async writer for the token usage ledger and its rollups."""
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, max_pending: int = 10000):
+        self._session_factory = session_factory
+        self.max_pending = max_pending
+        self._pending: Deque[UsageRecord] = deque()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.dropped = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.TOKEN_LEDGER_ENABLED
+
+    def record(self, record: UsageRecord) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(record)
+            full = len(self._pending) >= settings.TOKEN_LEDGER_BATCH_SIZE
+        if full and self._wakeup is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+    def _take_batch(self) -> List[UsageRecord]:
+        with self._lock:
+            count = min(len(self._pending), settings.TOKEN_LEDGER_BATCH_SIZE)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _restore(self, batch: List[UsageRecord]) -> None:
+        with self._lock:
+            self._pending.extendleft(reversed(batch))
+
+    @staticmethod
+    def _write(session: Session, records: List[UsageRecord]) -> None:
+        try:
+            session.execute(TokenUsage.__table__.insert(), [asdict(record) for record in records])
+            hourly, daily = _rollup(records)
+            _upsert_rollup(session, TokenUsageHourly, hourly)
+            _upsert_rollup(session, TokenUsageDaily, daily)
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            raise
+
+    def _write_each(self, session: Session, batch: List[UsageRecord]) -> Tuple[int, bool]:
+        """Write a rejected batch row by row, dropping the rows that violate constraints.
+
+        Returns the rows written and whether the whole batch was handled; on a
+        transient error the unwritten rest goes back to the queue.
+        """
+        written = 0
+        for index, record in enumerate(batch):
+            try:
+                self._write(session, [record])
+                written += 1
+            except IntegrityError as exc:
+                self.rejected += 1
+                logger.error(f"Token ledger record rejected and dropped: {record!r}: {exc}")
+            except SQLAlchemyError as exc:
+                logger.error(f"Token ledger flush failed: {exc}")
+                self._restore(batch[index:])
+                return written, False
+        return written, True
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write pending records in batches; returns ledger rows written."""
+        written = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return written
+            own_session = db is None
+            session = db
+            if own_session:
+                if self._session_factory is None:
+                    from ..core.database import SessionLocal
+                    self._session_factory = SessionLocal
+                session = self._session_factory()
+            try:
+                self._write(session, batch)
+                written += len(batch)
+            except IntegrityError as exc:
+                logger.warning(f"Token ledger batch rejected, writing rows one by one: {exc}")
+                count, complete = self._write_each(session, batch)
+                written += count
+                if not complete:
+                    return written
+            except SQLAlchemyError as exc:
+                logger.error(f"Token ledger flush failed: {exc}")
+                self._restore(batch)
+                return written
+            finally:
+                if own_session:
+                    session.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.TOKEN_LEDGER_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"Token ledger loop error: {exc}")
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the periodic flush and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+            self._loop = None
+        await asyncio.to_thread(self.flush)
+
+
+# Global ledger writer
+token_ledger = TokenLedgerWriter(max_pending=settings.TOKEN_LEDGER_MAX_PENDING)
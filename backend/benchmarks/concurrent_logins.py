@@ -0,0 +1,111 @@
+"""Concurrent admin-login benchmark.
+
+Fires N concurrent POST /api/admin/login requests against an in-process
+app while a probe task hits /health every few milliseconds. The probe
+latency shows how much bcrypt stalls the event loop: with ``--inline``
+hashing runs on the loop (the old behaviour), otherwise on the pool.
+
+    cd backend
+    python -m benchmarks.concurrent_logins --logins 32 --rounds 12
+    python -m benchmarks.concurrent_logins --logins 32 --rounds 12 --inline
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _run(args) -> None:
+    import httpx
+
+    from app.core import security
+    from app.core.database import SessionLocal
+    from app.core.password_hasher import password_hasher
+    from app.main import app
+    from app.models.admin import Admin
+
+    security.pwd_context = security.build_pwd_context(args.rounds)
+    password_hasher.max_queue = max(password_hasher.max_queue, args.logins)
+    password_hasher.max_per_account = args.logins
+    if args.inline:
+        async def _inline(func, *func_args, account=None):
+            return func(*func_args)
+
+        password_hasher._run = _inline
+
+    with SessionLocal() as db:
+        db.add(Admin(username="bench", email="bench@example.com", hashed_password=security.hash_password("secret")))
+        db.commit()
+
+    probe_latencies = []
+    probe_starts = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                probe_starts.append(started)
+                await client.get("/health")
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.005)
+
+        async def login():
+            started = time.perf_counter()
+            response = await client.post("/api/admin/login", json={"username": "bench", "password": "secret"})
+            return response.status_code, (time.perf_counter() - started) * 1000
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        results = await asyncio.gather(*(login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    latencies = [ms for _, ms in results]
+    statuses = {code: sum(1 for c, _ in results if c == code) for code, _ in results}
+    mode = "inline" if args.inline else f"pool({password_hasher.max_workers})"
+    print(f"mode={mode} rounds={args.rounds} logins={args.logins} wall={elapsed:.2f}s statuses={statuses}")
+    print(
+        f"login ms  p50={statistics.median(latencies):.1f} p95={_percentile(latencies, 95):.1f} "
+        f"max={max(latencies):.1f}"
+    )
+    if probe_latencies:
+        print(
+            f"/health ms p50={statistics.median(probe_latencies):.1f} p95={_percentile(probe_latencies, 95):.1f} "
+            f"max={max(probe_latencies):.1f} samples={len(probe_latencies)}"
+        )
+        gaps = [(b - a) * 1000 for a, b in zip(probe_starts, probe_starts[1:])]
+        if gaps:
+            # 探针两次发起之间的最大间隔 ≈ 事件循环被阻塞的最长时间
+            print(f"/health max gap between probes: {max(gaps):.1f} ms")
+    password_hasher.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent admin logins")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop (pre-pool behaviour)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""Synthetic dataset generator for scaling tests.
+
+Creates users and novels with chapters (up to 10k per novel), chapter
+versions stored as content-addressed blobs, evaluations, characters,
+plots, world settings and concept-stage conversations. Text mixes Chinese
+prose with Latin sentences, and every row is written with bulk
+``insert()`` batches, so a 10k-chapter novel takes seconds rather than
+the minutes the API would need.
+
+    cd backend
+    python -m benchmarks.datagen --database-url sqlite:///bench.db --shape medium
+    python -m benchmarks.datagen --database-url sqlite:///bench.db --shape large --chapters 10000 --versions 3
+    python -m benchmarks.datagen --database-url postgresql://... --shape small --latin-ratio 0.5 --seed 7
+
+Output is deterministic for a given shape and seed. Re-running with the same
+seed against the same database collides on primary keys, so use a fresh
+database or a different ``--seed``. Every generated user shares
+``--password``.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import random
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, fields, replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+MAX_CHAPTERS = 10_000
+
+
+@dataclass(frozen=True)
+class DatasetShape:
+    users: int = 2
+    novels_per_user: int = 2
+    # Chapters of each user's first novel; novel i gets chapters / (i + 1) ** chapter_skew
+    chapters: int = 50
+    chapter_skew: float = 0.0
+    versions: int = 2
+    evaluations: int = 1
+    characters: int = 12
+    plots: int = 8
+    worlds: int = 1
+    conversations: int = 20
+    chapter_chars: int = 3000
+    latin_ratio: float = 0.2
+    paragraphs: bool = False
+    seed: int = 0
+
+    def __post_init__(self):
+        if not 1 <= self.chapters <= MAX_CHAPTERS:
+            raise ValueError(f"chapters must be between 1 and {MAX_CHAPTERS}")
+        if not 0.0 <= self.latin_ratio <= 1.0:
+            raise ValueError("latin_ratio must be between 0 and 1")
+        if min(self.users, self.novels_per_user, self.versions) < 1:
+            raise ValueError("users, novels_per_user and versions must be at least 1")
+
+    def chapters_for(self, novel_index: int) -> int:
+        return max(1, int(self.chapters / (novel_index + 1) ** self.chapter_skew))
+
+
+SHAPES: Dict[str, DatasetShape] = {
+    "tiny": DatasetShape(users=1, novels_per_user=1, chapters=10, versions=1, characters=4, plots=3,
+                         conversations=6, chapter_chars=800, paragraphs=True),
+    "small": DatasetShape(users=2, novels_per_user=2, chapters=100, paragraphs=True),
+    "medium": DatasetShape(users=5, novels_per_user=3, chapters=1000, chapter_skew=1.0, characters=40, plots=30,
+                           conversations=60),
+    "large": DatasetShape(users=2, novels_per_user=3, chapters=MAX_CHAPTERS, chapter_skew=1.0, characters=120,
+                          plots=80, conversations=200, chapter_chars=2000),
+}
+
+_SURNAMES = "林陈李王张刘赵周吴沈顾苏叶萧白温"
+_GIVEN = ["清风", "若雪", "长歌", "明月", "子墨", "星河", "云舒", "无忌", "听澜", "寒衣", "念安", "青竹"]
+_PLACES = ["山门外", "长安城的雨巷里", "北境的雪原上", "古寺钟楼下", "江南的渡口边", "废弃的驿站中", "宫墙深处", "竹林尽头"]
+_TIMES = ["夜色沉沉时", "黎明将至", "暴雨初歇", "三更过后", "秋风乍起的午后", "灯火渐熄之际"]
+_ACTIONS = [
+    "握紧了手中的剑", "缓缓推开木门", "望着远处的灯火出神", "低声念出那句誓言", "将信笺投入火中",
+    "拂去石碑上的尘土", "在棋盘上落下一子", "听见了熟悉的脚步声", "翻开那本泛黄的手札", "转身走进风雪",
+]
+_FEELINGS = ["心中一片澄明", "却怎么也想不起那个名字", "仿佛一切早已注定", "眼底闪过一丝犹豫", "嘴角浮起淡淡的笑意", "胸口隐隐作痛"]
+_LATIN_SUBJECTS = ["The old courier", "A lantern", "The captain", "Her brother", "The stranger", "A single crow", "The archivist"]
+_LATIN_VERBS = ["waited by", "walked past", "remembered", "burned near", "circled above", "guarded", "abandoned"]
+_LATIN_OBJECTS = ["the silent harbor", "the northern gate", "a sealed letter", "the ruined observatory", "the last ferry",
+                  "an unfinished map", "the frozen river"]
+_LATIN_TAILS = ["before dawn.", "without a word.", "as the bells rang.", "while the city slept.", "for the third time."]
+_ROLES = ["主角", "宿敌", "导师", "同伴", "情报商人", "皇族继承人"]
+_ACTS = ["第一幕", "第二幕", "第三幕"]
+_DECISIONS = ["accept", "revise", "reject"]
+
+
+class TextFactory:
+    """Seeded prose made of Chinese and Latin sentences drawn from a pre-built pool."""
+
+    def __init__(self, rng: random.Random, latin_ratio: float, pool_size: int = 4000):
+        self.rng = rng
+        self.latin_ratio = latin_ratio
+        self._cjk = [self._cjk_sentence() for _ in range(pool_size)]
+        self._latin = [self._latin_sentence() for _ in range(max(1, pool_size // 4))]
+
+    def name(self) -> str:
+        return self.rng.choice(_SURNAMES) + self.rng.choice(_GIVEN)
+
+    def _cjk_sentence(self) -> str:
+        rng = self.rng
+        return f"{self.name()}{rng.choice(_TIMES)}，在{rng.choice(_PLACES)}{rng.choice(_ACTIONS)}，{rng.choice(_FEELINGS)}。"
+
+    def _latin_sentence(self) -> str:
+        rng = self.rng
+        return f"{rng.choice(_LATIN_SUBJECTS)} {rng.choice(_LATIN_VERBS)} {rng.choice(_LATIN_OBJECTS)} {rng.choice(_LATIN_TAILS)} "
+
+    def sentence(self) -> str:
+        pool = self._latin if self.rng.random() < self.latin_ratio else self._cjk
+        return pool[self.rng.randrange(len(pool))]
+
+    def paragraph(self, chars: int) -> str:
+        parts: List[str] = []
+        length = 0
+        while length < chars:
+            sentence = self.sentence()
+            parts.append(sentence)
+            length += len(sentence)
+        return "".join(parts)
+
+    def body(self, chars: int, per_paragraph: int = 300) -> str:
+        paragraphs = max(1, chars // per_paragraph)
+        return "\n\n".join(self.paragraph(chars // paragraphs) for _ in range(paragraphs))
+
+
+def _count_words(text: str) -> int:
+    return len("".join(text.split()))
+
+
+def _batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DatasetGenerator:
+    """Writes one :class:`DatasetShape` into the database behind ``session_factory``."""
+
+    def __init__(self, session_factory, shape: DatasetShape, password: str = "bench-password",
+                 batch_size: int = 2000, password_hash: Optional[str] = None):
+        self.session_factory = session_factory
+        self.shape = shape
+        self.password = password
+        self.batch_size = batch_size
+        self._password_hash = password_hash
+        self.rng = random.Random(shape.seed)
+        self.text = TextFactory(self.rng, shape.latin_ratio)
+        self.counts: Dict[str, int] = {}
+        self.novel_ids: List[str] = []
+        self.usernames: List[str] = []
+        self._now = datetime.now(timezone.utc)
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _ago(self, days: float) -> datetime:
+        return self._now - timedelta(days=days)
+
+    def _insert(self, db, model, rows: Iterable[Dict[str, Any]]) -> None:
+        from sqlalchemy import insert
+
+        for batch in _batched(rows, self.batch_size):
+            db.execute(insert(model), batch)
+            self.counts[model.__tablename__] = self.counts.get(model.__tablename__, 0) + len(batch)
+
+    @staticmethod
+    def _next_id(db, model) -> int:
+        from sqlalchemy import func, select
+
+        return (db.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+    def run(self) -> Dict[str, int]:
+        from app.core import security
+        from app.models.user import User
+
+        password_hash = self._password_hash or security.hash_password(self.password)
+        with self.session_factory() as db:
+            user_id = self._next_id(db, User)
+            users = []
+            for index in range(self.shape.users):
+                username = f"gen{self.shape.seed}_user{index:04d}"
+                self.usernames.append(username)
+                users.append({"id": user_id + index, "username": username, "hashed_password": password_hash,
+                              "is_active": True, "is_admin": False})
+            self._insert(db, User, users)
+            db.commit()
+
+            for index, user in enumerate(users):
+                for novel_index in range(self.shape.novels_per_user):
+                    self._novel(db, user["id"], index, novel_index)
+                    db.commit()
+            self._sync_sequences(db)
+        return dict(self.counts)
+
+    @staticmethod
+    def _sync_sequences(db) -> None:
+        """Explicit ids do not advance PostgreSQL sequences; move them past the generated rows."""
+        from sqlalchemy import text
+
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        for table in ("users", "chapters", "chapter_versions"):
+            db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+        db.commit()
+
+    def _novel(self, db, user_id: int, user_index: int, novel_index: int) -> None:
+        from app.core.fractional_index import keys_between
+        from app.models.character import Character
+        from app.models.novel import Novel, NovelBlueprint, NovelConversation
+        from app.models.plot import Plot
+        from app.models.world import WorldSetting
+
+        shape, rng, text = self.shape, self.rng, self.text
+        novel_id = self._uuid()
+        self.novel_ids.append(novel_id)
+        title = f"{text.name()}传 · 卷{user_index + 1}-{novel_index + 1}"
+        created = self._ago(rng.uniform(30, 720))
+        self._insert(db, Novel, [{
+            "id": novel_id, "user_id": user_id, "title": title, "initial_prompt": text.paragraph(120),
+            "status": rng.choice(["draft", "in_progress", "published"]), "created_at": created, "updated_at": created,
+        }])
+        self._insert(db, NovelBlueprint, [{
+            "novel_id": novel_id, "title": title, "target_audience": "成年读者", "genre": "武侠",
+            "style": "古典", "tone": "沉郁", "one_sentence_summary": text.sentence(),
+            "full_synopsis": text.body(1200), "world_setting": {"era": "架空王朝", "factions": [text.name() for _ in range(3)]},
+        }])
+
+        character_keys = keys_between(None, None, shape.characters)
+        self._insert(db, Character, ({
+            "novel_id": novel_id, "name": text.name(), "identity": rng.choice(_ROLES),
+            "personality": text.paragraph(80), "goals": text.paragraph(60), "abilities": text.paragraph(60),
+            "relationship_to_protagonist": text.sentence(), "appearance": text.paragraph(60),
+            "background": text.paragraph(200), "extra": {"tags": rng.sample(_ROLES, 2)},
+            "position": position, "rank": key,
+        } for position, key in enumerate(character_keys)))
+
+        plot_keys = keys_between(None, None, shape.plots)
+        self._insert(db, Plot, ({
+            "novel_id": novel_id, "title": f"{text.name()}的抉择", "description": text.paragraph(200),
+            "act": _ACTS[order * len(_ACTS) // max(1, shape.plots)], "key_events": text.paragraph(120),
+            "characters": "、".join(text.name() for _ in range(3)), "conflicts": text.paragraph(80),
+            "order": order, "rank": key,
+        } for order, key in enumerate(plot_keys)))
+
+        self._insert(db, WorldSetting, ({
+            "novel_id": novel_id, "era": rng.choice(["架空王朝", "近未来", "蒸汽时代"]),
+            "locations": {place: text.sentence() for place in rng.sample(_PLACES, 4)},
+            "rules": {"magic": text.paragraph(100), "politics": text.paragraph(100)},
+            "culture": {"customs": text.paragraph(100)},
+        } for _ in range(shape.worlds)))
+
+        self._insert(db, NovelConversation, ({
+            "novel_id": novel_id, "seq": seq, "role": "user" if seq % 2 == 0 else "assistant",
+            "content": text.paragraph(80 if seq % 2 == 0 else 600), "metadata_": {"stage": "concept"},
+            "created_at": created + timedelta(minutes=seq),
+        } for seq in range(shape.conversations)))
+
+        self._chapters(db, novel_id, shape.chapters_for(novel_index), created)
+
+    def _chapters(self, db, novel_id: str, count: int, created: datetime) -> None:
+        from sqlalchemy import bindparam, update
+
+        from app.core.fractional_index import keys_between
+        from app.models.chapter import Chapter, ChapterBlob, ChapterEvaluation, ChapterParagraph, ChapterVersion
+
+        shape, rng, text = self.shape, self.rng, self.text
+        chapter_id = self._next_id(db, Chapter)
+        version_id = self._next_id(db, ChapterVersion)
+        chapters, versions, evaluations, paragraphs = [], [], [], []
+        blobs: Dict[str, Dict[str, Any]] = {}
+
+        for number, rank in enumerate(keys_between(None, None, count), start=1):
+            at = created + timedelta(hours=number)
+            selected = None
+            for label in range(shape.versions):
+                # 章节号与版本号写进正文，保证内容寻址后每个版本各占一个 blob
+                content = f"第{number}章（版本{label + 1}）\n\n" + text.body(shape.chapter_chars)
+                digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                blob = blobs.get(digest)
+                if blob is None:
+                    blob = blobs[digest] = {"hash": digest, "content": content, "storage": "database",
+                                            "size": len(content.encode("utf-8")), "ref_count": 0}
+                blob["ref_count"] += 1
+                versions.append({"id": version_id, "chapter_id": chapter_id, "version_label": f"v{label + 1}",
+                                 "provider": rng.choice(["openai", "anthropic", "custom"]), "legacy_content": "",
+                                 "content_hash": digest, "created_at": at + timedelta(minutes=label)})
+                selected = version_id, content
+                version_id += 1
+            for _ in range(shape.evaluations):
+                evaluations.append({"chapter_id": chapter_id, "version_id": selected[0],
+                                    "decision": rng.choice(_DECISIONS), "feedback": text.paragraph(150),
+                                    "score": round(rng.uniform(3, 10), 1), "created_at": at + timedelta(hours=1)})
+            if shape.paragraphs:
+                lines = [line for line in selected[1].split("\n") if line.strip()]
+                for position, line in zip(keys_between(None, None, len(lines)), lines):
+                    paragraphs.append({"chapter_id": chapter_id, "position": position, "content": line,
+                                       "word_count": _count_words(line)})
+            chapters.append({"id": chapter_id, "novel_id": novel_id, "chapter_number": number, "rank": rank,
+                             "title": f"第{number}章 {text.name()}", "outline": text.paragraph(200),
+                             "real_summary": text.paragraph(120), "status": rng.choice(["draft", "generated", "final"]),
+                             "word_count": _count_words(selected[1]), "created_at": at, "updated_at": at})
+            chapter_id += 1
+
+        # Versions point at chapters and blobs, chapters point back at their selected version
+        self._insert(db, Chapter, chapters)
+        self._insert(db, ChapterBlob, blobs.values())
+        self._insert(db, ChapterVersion, versions)
+        selected_ids = {row["chapter_id"]: row["id"] for row in versions}
+        for batch in _batched(({"cid": cid, "vid": vid} for cid, vid in selected_ids.items()), self.batch_size):
+            db.connection().execute(
+                update(Chapter.__table__).where(Chapter.__table__.c.id == bindparam("cid"))
+                .values(selected_version_id=bindparam("vid")),
+                batch,
+            )
+        self._insert(db, ChapterEvaluation, evaluations)
+        self._insert(db, ChapterParagraph, paragraphs)
+
+
+def generate(session_factory, shape: DatasetShape, **kwargs) -> DatasetGenerator:
+    """Generate ``shape`` and return the generator (row counts, novel ids, usernames)."""
+    generator = DatasetGenerator(session_factory, shape, **kwargs)
+    generator.run()
+    return generator
+
+
+def add_shape_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="small", help="preset to start from")
+    for field in fields(DatasetShape):
+        flag = "--" + field.name.replace("_", "-")
+        if field.type == "bool":
+            parser.add_argument(flag, type=lambda s: s.lower() in ("1", "true", "yes"), default=None)
+        else:
+            parser.add_argument(flag, type=float if field.type == "float" else int, default=None)
+
+
+def shape_from_args(args) -> DatasetShape:
+    overrides = {f.name: getattr(args, f.name) for f in fields(DatasetShape) if getattr(args, f.name) is not None}
+    return replace(SHAPES[args.shape], **overrides)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic novel dataset with bulk inserts")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--password", default="bench-password", help="password shared by every generated user")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    add_shape_arguments(parser)
+    args = parser.parse_args()
+    shape = shape_from_args(args)
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.database import Base
+    import app.models  # noqa: F401  (registers every table on Base.metadata)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    generator = generate(sessionmaker(bind=engine), shape, password=args.password, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+    total = sum(generator.counts.values())
+    print(f"shape={asdict(shape)}")
+    for table, count in sorted(generator.counts.items()):
+        print(f"{table:<24}{count:>10}")
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s); users: {generator.usernames[0]}...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Mixed-workload load test against the app and the mock LLM server.
+
+Workers pick scenarios by weight (chapter edits, listings, single
+generations, multi-version generations) for ``--duration`` seconds or
+``--requests`` requests. Generation goes over real HTTP to the bundled mock
+server (started in-process unless ``--mock-url`` is given), rotating
+through the custom/openai/anthropic providers. p50/p95/p99 and throughput
+per scenario are written to a baseline JSON file.
+
+    cd backend
+    python -m benchmarks.load_test --duration 30 --concurrency 16
+    python -m benchmarks.load_test --mix edit=1,list=4 --base-url http://localhost:8000
+    python -m benchmarks.load_test --error-rate 0.02 --rate-limit-rate 0.05 --output /tmp/faults.json
+    python -m benchmarks.load_test --requests 200 --cassette-mode record --cassette /tmp/llm.jsonl.gz
+    python -m benchmarks.load_test --requests 200 --cassette-mode replay --cassette /tmp/llm.jsonl.gz
+
+With ``--cassette-mode replay`` the in-process app answers generations from
+a recorded cassette (see ``app.services.llm_cassette``) and no mock server is
+started; replay a cassette with the same ``--seed``, ``--requests`` and
+``--concurrency 1`` it was recorded with so every prompt has a recording.
+
+By default the app runs in-process on a temporary SQLite database with
+rate limits and daily quotas lifted, so the numbers measure the code path
+rather than the limiter.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import BASELINE_DIR, summarize_ms, write_json  # noqa: E402
+from benchmarks.mock_llm import MockLLMServer, add_config_arguments, config_from_args  # noqa: E402
+
+PROVIDERS = ("custom", "openai", "anthropic")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("edit", "list", "generate", "multi"):
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    def __init__(self, client, mock_url: str, providers: List[str], rng: random.Random):
+        self.client = client
+        self.mock_url = mock_url
+        self.providers = providers
+        self.rng = rng
+        self.novels: List[str] = []
+        self.chapters: Dict[str, List[int]] = {}
+
+    async def login(self, username: str, password: str) -> None:
+        # 已存在时注册返回 400（远程目标也可能关闭了注册），直接登录即可
+        await self.client.post("/auth/register", json={"username": username, "password": password})
+        response = await self.client.post("/auth/login", json={"username": username, "password": password})
+        response.raise_for_status()
+        self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    async def seed(self, novels: int, chapters: int) -> None:
+        for n in range(novels):
+            response = await self.client.post("/api/novels/", json={"title": f"压测小说 {n}", "author": "bench", "genre": "fantasy"})
+            response.raise_for_status()
+            novel_id = response.json()["id"]
+            self.novels.append(novel_id)
+            self.chapters[novel_id] = []
+            for number in range(1, chapters + 1):
+                response = await self.client.post("/api/chapters/", json={
+                    "novel_id": novel_id, "chapter_number": number, "title": f"第{number}章",
+                    "content": "夜色沉沉，风从山谷里吹来。The lanterns flickered. " * 40,
+                })
+                response.raise_for_status()
+                self.chapters[novel_id].append(response.json()["id"])
+
+    def _provider_fields(self) -> Dict[str, Any]:
+        provider = self.rng.choice(self.providers)
+        base_url = f"{self.mock_url}/v1" if provider == "openai" else self.mock_url
+        return {"provider": provider, "model_name": f"mock-{provider}", "base_url": base_url, "api_key": "mock-key"}
+
+    async def edit(self):
+        novel_id = self.rng.choice(self.novels)
+        chapter_id = self.rng.choice(self.chapters[novel_id])
+        content = "她握紧了手中的剑。" * self.rng.randint(20, 200)
+        return await self.client.put(f"/api/chapters/{chapter_id}", json={"content": content})
+
+    async def list(self):
+        if self.rng.random() < 0.3:
+            return await self.client.get("/api/novels/")
+        return await self.client.get("/api/chapters/", params={"novel_id": self.rng.choice(self.novels)})
+
+    async def generate(self):
+        return await self.client.post("/api/ai-assistants/generate", json={
+            "role": self.rng.choice(("novelist", "outliner", "conceptualizer")),
+            "novel_id": self.rng.choice(self.novels),
+            "user_input": f"继续写下一段，场景 {self.rng.randint(1, 50)}",
+            "max_tokens": 400,
+            **self._provider_fields(),
+        }, timeout=120)
+
+    async def multi(self):
+        return await self.client.post("/api/ai-assistants/generate-multiple", params={"num_versions": 2}, json={
+            "role": "novelist",
+            "novel_id": self.rng.choice(self.novels),
+            "user_input": "给出两个不同风格的版本",
+            "max_tokens": 400,
+            **self._provider_fields(),
+        }, timeout=120)
+
+
+async def _drive(args, client, mock_url: str) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    workload = Workload(client, mock_url, args.providers, rng)
+    await workload.login(args.username, args.password)
+    await workload.seed(args.novels, args.chapters)
+
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    samples: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+    issued = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def worker():
+        nonlocal issued
+        while time.perf_counter() < deadline and (not args.requests or issued < args.requests):
+            issued += 1
+            scenario = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = (await getattr(workload, scenario)()).status_code
+            except Exception:  # noqa: BLE001
+                status = 0
+            samples[scenario].append((status, (time.perf_counter() - started) * 1000))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - started
+
+    def report(entries: List[Tuple[int, float]]) -> Dict[str, Any]:
+        statuses: Dict[str, int] = defaultdict(int)
+        for status, _ in entries:
+            statuses[str(status)] += 1
+        return {
+            **summarize_ms(ms for _, ms in entries),
+            "errors": sum(1 for status, _ in entries if not 200 <= status < 400),
+            "statuses": dict(statuses),
+            "throughput_rps": round(len(entries) / wall, 3) if wall else 0.0,
+        }
+
+    return {
+        "wall_seconds": round(wall, 3),
+        "overall": report([entry for entries in samples.values() for entry in entries]),
+        "scenarios": {name: report(entries) for name, entries in sorted(samples.items())},
+    }
+
+
+async def _run(args) -> Dict[str, Any]:
+    import httpx
+
+    mock_config = config_from_args(args)
+    replaying = args.cassette_mode == "replay" and not args.base_url
+    mock_url = args.mock_url or ("http://mock-llm.invalid" if replaying else None)
+    with (nullcontext(mock_url) if mock_url else MockLLMServer(mock_config)) as mock_url:
+        async with AsyncExitStack() as stack:
+            if args.base_url:
+                client = await stack.enter_async_context(httpx.AsyncClient(base_url=args.base_url, timeout=120))
+            else:
+                from app.main import app
+
+                await stack.enter_async_context(app.router.lifespan_context(app))
+                client = await stack.enter_async_context(httpx.AsyncClient(app=app, base_url="http://bench", timeout=120))
+            results = await _drive(args, client, mock_url)
+
+    return {
+        "benchmark": "load_test",
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.base_url or "in-process",
+        "config": {
+            "duration": args.duration, "requests": args.requests, "concurrency": args.concurrency,
+            "mix": args.mix, "providers": args.providers, "novels": args.novels, "chapters": args.chapters,
+            "seed": args.seed, "mock": None if args.mock_url else vars(mock_config),
+            "cassette": {"mode": args.cassette_mode, "path": str(args.cassette), "latency_scale": args.cassette_latency_scale}
+            if args.cassette_mode != "off" else None,
+        },
+        **results,
+    }
+
+
+def _print(result: Dict[str, Any]) -> None:
+    print(f"target={result['target']} wall={result['wall_seconds']}s")
+    print(f"{'scenario':<10}{'count':>7}{'errors':>8}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+    rows = list(result["scenarios"].items()) + [("overall", result["overall"])]
+    for name, stats in rows:
+        if not stats.get("count"):
+            continue
+        print(
+            f"{name:<10}{stats['count']:>7}{stats['errors']:>8}{stats['throughput_rps']:>9.2f}"
+            f"{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mixed-workload load test with the mock LLM server")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = unlimited)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("edit=3,list=5,generate=2,multi=1"))
+    parser.add_argument("--providers", type=lambda s: s.split(","), default=list(PROVIDERS))
+    parser.add_argument("--novels", type=int, default=5)
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--base-url", help="drive a running app instead of an in-process one")
+    parser.add_argument("--mock-url", help="use an already running mock server")
+    parser.add_argument("--username", default="loadtest")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--output", type=Path, default=BASELINE_DIR / "load_test.json")
+    parser.add_argument("--cassette-mode", choices=("off", "record", "replay"), default="off",
+                        help="record LLM calls to, or replay them from, --cassette (in-process app only)")
+    parser.add_argument("--cassette", type=Path, default=BASELINE_DIR / "load_test_llm.jsonl.gz")
+    parser.add_argument("--cassette-latency-scale", type=float, default=1.0,
+                        help="multiply recorded LLM latency on replay (0 = instant)")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.base_url:
+            os.environ.update({
+                "DATABASE_URL": f"sqlite:///{Path(tmp) / 'load.db'}",
+                "DEBUG": "false",
+                "LOG_FILE_ENABLED": "false",
+                "RATE_LIMIT_ENABLED": "false",
+                "ALLOW_USER_REGISTRATION": "true",
+                "DAILY_REQUEST_LIMIT": str(10**9),
+                "AI_CASSETTE_MODE": args.cassette_mode,
+                "AI_CASSETTE_PATH": str(args.cassette),
+                "AI_CASSETTE_LATENCY_SCALE": str(args.cassette_latency_scale),
+            })
+        result = asyncio.run(_run(args))
+    _print(result)
+    print(f"wrote {write_json(args.output, result)}")
+
+
+if __name__ == "__main__":
+    main()
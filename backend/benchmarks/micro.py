@@ -0,0 +1,528 @@
+"""Micro-benchmarks for every router and the core service functions.
+
+Each benchmark is timed for a number of rounds (calibrated by ``--min-time``
+and ``--min-rounds``) against every requested dataset size from
+``benchmarks.datagen``, in the spirit of pytest-benchmark. Object and
+response caches are cleared before every round (outside the timed region),
+so repeated reads measure the query path. LLM calls go to the bundled mock
+server over an in-process transport with zero simulated latency, so the AI
+benchmarks measure context building, prompt assembly and serialization.
+
+    cd backend
+    python -m benchmarks.micro run                                    # writes baselines/micro.json
+    python -m benchmarks.micro run --sizes small --filter chapters --output /tmp/micro.json
+    python -m benchmarks.micro compare benchmarks/baselines/micro.json /tmp/micro.json --threshold 0.2
+    python -m benchmarks.micro run --output /tmp/micro.json --compare-to benchmarks/baselines/micro.json
+
+``compare`` (and ``run --compare-to``) exits with status 1 when any
+benchmark's ``--stat`` (default ``min``, the least noisy) regressed by more
+than ``--threshold`` relative to the baseline and by at least
+``--min-delta-ms`` (default 0.5 ms, so microsecond-scale benchmarks cannot
+fail on jitter). Timings only compare on the same machine: when the
+baseline's ``machine_info`` differs, the comparison is printed but does not
+gate unless ``--ignore-machine`` is given. ``make bench-baseline`` records a
+local, untracked baseline for ``make bench`` to gate against. Even on one
+machine, shared or throttled CPUs slow whole stretches of a run, so
+``run --compare-to`` re-times apparent regressions up to ``--confirm`` times
+and keeps each benchmark's best run; only regressions that persist fail.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import BASELINE_DIR, percentile, write_json  # noqa: E402
+from benchmarks.datagen import SHAPES  # noqa: E402
+
+DEFAULT_SIZES = ("tiny", "small")
+MOCK_LLM_URL = "http://mock-llm.invalid"
+
+Timed = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    group: str
+    setup: Callable[["BenchContext"], Timed]
+    cold: bool = True
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, group: str, cold: bool = True):
+    """Register ``setup(ctx)``; it returns the (sync or async) callable to time."""
+    def decorator(setup: Callable[["BenchContext"], Timed]):
+        BENCHMARKS[name] = Benchmark(name, group, setup, cold)
+        return setup
+    return decorator
+
+
+class BenchContext:
+    """Client, dataset and credentials shared by the benchmarks of one size."""
+
+    def __init__(self, dataset, client):
+        from sqlalchemy import select
+
+        from app.core.security import create_access_token
+        from app.models import User
+
+        self.dataset = dataset
+        self.client = client
+        self.targets = dataset.targets
+        with dataset.session_factory() as db:
+            user_id = db.execute(select(User.id).where(User.username == dataset.generator.usernames[0])).scalar_one()
+        self.username = dataset.generator.usernames[0]
+        self.user_headers = {"Authorization": f"Bearer {create_access_token(str(user_id))}"}
+        self.admin_headers: Dict[str, str] = {}
+
+    async def login_admin(self) -> None:
+        from benchmarks.scaling import ADMIN_PASSWORD, ADMIN_USERNAME
+
+        response = await self.client.post("/api/admin/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+        response.raise_for_status()
+        self.admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def get(self, path: str, headers: Optional[Dict[str, str]] = None) -> Timed:
+        url = path.format(**self.targets)
+
+        async def call():
+            response = await self.client.get(url, headers=headers)
+            response.raise_for_status()
+            return response
+        return call
+
+    def send(self, method: str, path: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> Timed:
+        url = path.format(**self.targets)
+
+        async def call():
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            response.raise_for_status()
+            return response
+        return call
+
+    def ai_fields(self) -> Dict[str, Any]:
+        return {"provider": "custom", "base_url": MOCK_LLM_URL, "api_key": "mock-key", "model_name": "mock-custom"}
+
+    def context(self) -> Dict[str, Any]:
+        from app.api.ai import _build_context
+
+        with self.dataset.session_factory() as db:
+            return _build_context(db, self.targets["novel_id"], include_characters=True, include_plots=True,
+                                  include_world=True)
+
+
+# ============= Routers =============
+
+def _register_get(name: str, group: str, path: str, auth: Optional[str] = None) -> None:
+    def setup(ctx: BenchContext) -> Timed:
+        headers = {"user": ctx.user_headers, "admin": ctx.admin_headers}.get(auth or "")
+        return ctx.get(path, headers)
+    benchmark(name, group)(setup)
+
+
+for _name, _group, _path, _auth in (
+    ("users.me", "users", "/users/me", "user"),
+    ("prompts.list", "prompts", "/prompts/", "user"),
+    ("novels.list", "novels", "/api/novels/?limit=100", None),
+    ("novels.get", "novels", "/api/novels/{novel_id}", None),
+    ("characters.list", "characters", "/api/characters/?novel_id={novel_id}", None),
+    ("plots.list", "plots", "/api/plots/?novel_id={novel_id}", None),
+    ("worlds.by_novel", "worlds", "/api/worlds/novel/{novel_id}", None),
+    ("chapters.list_first_page", "chapters", "/api/chapters/?novel_id={novel_id}&limit=100", None),
+    ("chapters.list_last_page", "chapters", "/api/chapters/?novel_id={novel_id}&skip={last_page_skip}&limit=100", None),
+    ("chapters.get", "chapters", "/api/chapters/{chapter_id}", None),
+    ("chapter_versions.by_chapter", "chapter_versions", "/api/chapter-versions/chapter/{chapter_id}", None),
+    ("chapter_versions.with_versions", "chapter_versions", "/api/chapter-versions/chapter/{chapter_id}/with-versions", None),
+    ("chapter_versions.content", "chapter_versions", "/api/chapter-versions/{version_id}/content", None),
+    ("chapter_versions.evaluations", "chapter_versions", "/api/chapter-versions/evaluations/chapter/{chapter_id}", None),
+    ("chapter_paragraphs.page", "chapter_paragraphs", "/api/chapter-paragraphs/chapter/{chapter_id}?limit=50", None),
+    ("chapter_paragraphs.text", "chapter_paragraphs", "/api/chapter-paragraphs/chapter/{chapter_id}/text", None),
+    ("ai_assistants.list", "ai_assistants", "/api/ai-assistants/", None),
+    ("admin.stats", "admin", "/api/admin/stats", "admin"),
+    ("admin.novels_stats", "admin", "/api/admin/novels/stats?sort_by=chapter_count&limit=50", "admin"),
+    ("metrics.render", "metrics", "/metrics", None),
+):
+    _register_get(_name, _group, _path, _auth)
+
+
+@benchmark("auth.login", "auth")
+def _auth_login(ctx: BenchContext) -> Timed:
+    return ctx.send("POST", "/auth/login", json={"username": ctx.username, "password": ctx.dataset.generator.password})
+
+
+@benchmark("chapters.update", "chapters")
+def _chapters_update(ctx: BenchContext) -> Timed:
+    return ctx.send("PUT", "/api/chapters/{chapter_id}", json={"content": "她握紧了手中的剑。" * 200, "word_count": 1800})
+
+
+@benchmark("ai.generate", "ai")
+def _ai_generate(ctx: BenchContext) -> Timed:
+    return ctx.send("POST", "/api/ai/generate", ctx.user_headers, json={
+        "novel_id": ctx.targets["novel_id"], "prompt": "继续写下一段", "context_type": "content",
+        "max_tokens": 400, **ctx.ai_fields(),
+    })
+
+
+@benchmark("ai_assistants.generate", "ai_assistants")
+def _assistant_generate(ctx: BenchContext) -> Timed:
+    return ctx.send("POST", "/api/ai-assistants/generate", ctx.user_headers, json={
+        "role": "novelist", "novel_id": ctx.targets["novel_id"], "user_input": "继续写下一段", "max_tokens": 400,
+        **ctx.ai_fields(),
+    })
+
+
+# ============= Services =============
+
+@benchmark("service.build_context", "services")
+def _build_context(ctx: BenchContext) -> Timed:
+    from app.api.ai import _build_context as build
+
+    def call():
+        with ctx.dataset.session_factory() as db:
+            return build(db, ctx.targets["novel_id"], include_characters=True, include_plots=True, include_world=True)
+    return call
+
+
+@benchmark("service.build_context_prompt", "services", cold=False)
+def _build_context_prompt(ctx: BenchContext) -> Timed:
+    from app.services.ai_service import AIService
+
+    service = AIService(provider="custom", base_url=MOCK_LLM_URL)
+    context = ctx.context()
+    return lambda: service.build_context_prompt(context, "继续写下一段，保持人物语气一致。")
+
+
+def _register_assistant(role: str) -> None:
+    def setup(ctx: BenchContext) -> Timed:
+        from app.services.ai_assistants import AssistantFactory
+
+        assistant = AssistantFactory.create(role, provider="custom", base_url=MOCK_LLM_URL)
+        context = ctx.context()
+        user_input = "夜色沉沉，风从山谷里吹来。" * 40
+        return lambda: assistant.build_prompt(context, user_input)
+    benchmark(f"service.assistant_build_prompt.{role}", "services", cold=False)(setup)
+
+
+for _role in ("conceptualizer", "blueplanner", "outliner", "novelist", "extractor", "evaluator"):
+    _register_assistant(_role)
+
+
+@benchmark("serialize.chapter_list", "serialization", cold=False)
+def _serialize_chapter_list(ctx: BenchContext) -> Timed:
+    from fastapi.encoders import jsonable_encoder
+
+    from app.api.chapters import _build_response
+    from app.core.timing import TimedJSONResponse
+    from app.models import Chapter
+
+    with ctx.dataset.session_factory() as db:
+        chapters = db.query(Chapter).filter(Chapter.novel_id == ctx.targets["novel_id"]).limit(100).all()
+        responses = [_build_response(chapter) for chapter in chapters]
+    return lambda: TimedJSONResponse(content=jsonable_encoder(responses)).body
+
+
+@benchmark("serialize.chapter_with_versions", "serialization", cold=False)
+def _serialize_with_versions(ctx: BenchContext) -> Timed:
+    from sqlalchemy.orm import selectinload
+
+    from app.models import Chapter
+    from app.schemas.chapter_version import ChapterEvaluationResponse, ChapterVersionResponse
+
+    with ctx.dataset.session_factory() as db:
+        chapter = (
+            db.query(Chapter)
+            .options(selectinload(Chapter.versions), selectinload(Chapter.evaluations))
+            .filter(Chapter.id == ctx.targets["chapter_id"])
+            .one()
+        )
+
+    def call():
+        versions = [ChapterVersionResponse.model_validate(v).model_dump_json() for v in chapter.versions]
+        evaluations = [ChapterEvaluationResponse.model_validate(e).model_dump_json() for e in chapter.evaluations]
+        return versions, evaluations
+    return call
+
+
+# ============= Runner =============
+
+def compute_stats(samples: List[float]) -> Dict[str, float]:
+    """pytest-benchmark style statistics, in seconds."""
+    ordered = sorted(samples)
+    q1, q3 = percentile(ordered, 25), percentile(ordered, 75)
+    mean = statistics.fmean(ordered)
+    return {
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": mean,
+        "stddev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "median": statistics.median(ordered),
+        "q1": q1,
+        "q3": q3,
+        "iqr": q3 - q1,
+        "rounds": len(ordered),
+        "total": sum(ordered),
+        "ops": 1 / mean if mean else 0.0,
+    }
+
+
+async def time_callable(fn: Timed, before: Optional[Callable[[], None]] = None, min_rounds: int = 5,
+                        min_time: float = 0.2, max_time: float = 2.0, warmup: int = 1) -> List[float]:
+    """Time ``fn`` until both ``min_rounds`` and ``min_time`` are reached (bounded by ``max_time``)."""
+    samples: List[float] = []
+    spent = 0.0
+    round_index = 0
+    while True:
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        result = fn()
+        if inspect.isawaitable(result):
+            await result
+        elapsed = time.perf_counter() - started
+        round_index += 1
+        if round_index <= warmup:
+            continue
+        samples.append(elapsed)
+        spent += elapsed
+        if (len(samples) >= min_rounds and spent >= min_time) or (spent >= max_time and samples):
+            return samples
+
+
+def select(names: Optional[List[str]]) -> List[Benchmark]:
+    if not names:
+        return list(BENCHMARKS.values())
+    return [bench for bench in BENCHMARKS.values() if any(part in bench.name for part in names)]
+
+
+async def run_size(size: str, benchmarks: List[Benchmark], args, tmp: Path) -> List[Dict[str, Any]]:
+    import httpx
+
+    from app.main import app
+    from app.services import ai_service, llm_cassette
+    from benchmarks.mock_llm import MockLLMConfig, create_app
+    from benchmarks.scaling import Dataset, clear_caches
+
+    shape = replace(SHAPES[size], seed=args.seed)
+    dataset = Dataset(size, shape, tmp / f"micro-{size}.db")
+    dataset.override_db(app)
+    mock_transport = httpx.ASGITransport(app=create_app(MockLLMConfig(seed=args.seed, time_scale=0)))
+    original_client = ai_service.llm_http_client
+    ai_service.llm_http_client = lambda **kw: llm_cassette.llm_http_client(transport=mock_transport, **kw)
+    results = []
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=120) as client:
+            ctx = BenchContext(dataset, client)
+            await ctx.login_admin()
+            for bench in benchmarks:
+                if bench.group == "chapter_paragraphs" and not shape.paragraphs:
+                    continue
+                clear_caches()
+                fn = bench.setup(ctx)
+                samples = await time_callable(
+                    fn, clear_caches if bench.cold else None, args.min_rounds, args.min_time, args.max_time, args.warmup
+                )
+                stats = compute_stats(samples)
+                results.append({
+                    "name": f"{bench.name}[{size}]",
+                    "fullname": f"{bench.group}::{bench.name}[{size}]",
+                    "group": bench.group,
+                    "params": {"size": size},
+                    "stats": stats,
+                })
+                print(f"{bench.name + '[' + size + ']':<52}{stats['median'] * 1000:>10.3f} ms  ({stats['rounds']} rounds)")
+    finally:
+        ai_service.llm_http_client = original_client
+        app.dependency_overrides.clear()
+        dataset.dispose()
+    return results
+
+
+def run(args) -> Dict[str, Any]:
+    from app.core import security
+    from app.core.logger import logger
+
+    # Cheap bcrypt keeps auth.login about the request path, not the hash cost
+    security.pwd_context = security.build_pwd_context(4)
+    logger.setLevel(logging.WARNING)
+    benchmarks = select(args.filter)
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results.extend(asyncio.run(run_size(size, benchmarks, args, Path(tmp))))
+    return {
+        "benchmark": "micro",
+        "datetime": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine_info": machine_info(),
+        "config": {"sizes": args.sizes, "seed": args.seed, "min_rounds": args.min_rounds,
+                   "min_time": args.min_time, "max_time": args.max_time, "warmup": args.warmup},
+        "benchmarks": results,
+    }
+
+
+def machine_info() -> Dict[str, str]:
+    return {"node": platform.node(), "python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine()}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, stat: str = "median",
+            min_delta_ms: float = 0.0, allow_missing: bool = False) -> Tuple[List[Dict[str, Any]], bool]:
+    """Compare ``stat`` per benchmark; returns rows and whether the gate fails.
+
+    A baseline benchmark absent from ``current`` fails the gate (it may have
+    been renamed or stopped running) unless ``allow_missing`` is set, e.g. for
+    a run restricted with ``--filter`` or ``--sizes``.
+    """
+    old = {entry["fullname"]: entry["stats"][stat] for entry in baseline.get("benchmarks", [])}
+    new = {entry["fullname"]: entry["stats"][stat] for entry in current.get("benchmarks", [])}
+    rows = []
+    failed = False
+    for name in sorted(old.keys() | new.keys()):
+        before, after = old.get(name), new.get(name)
+        row: Dict[str, Any] = {"name": name, "baseline": before, "current": after, "change": None}
+        if before is None:
+            row["status"] = "new"
+        elif after is None:
+            row["status"] = "missing" if allow_missing else "MISSING"
+            failed = failed or not allow_missing
+        else:
+            change = (after - before) / before if before else 0.0
+            row["change"] = change
+            if change > threshold and (after - before) * 1000 >= min_delta_ms:
+                row["status"] = "REGRESSED"
+                failed = True
+            elif change < -threshold:
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows, failed
+
+
+def confirm_regressions(args, baseline: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Re-run benchmarks that look regressed and keep the faster run of each."""
+    for _ in range(args.confirm):
+        rows, _ = compare(baseline, result, args.threshold, args.stat, args.min_delta_ms)
+        suspects = [row["name"] for row in rows if row["status"] == "REGRESSED"]
+        if not suspects:
+            break
+        print(f"re-running {len(suspects)} apparently regressed benchmark(s)")
+        names = sorted({name.split("::", 1)[1].rsplit("[", 1)[0] for name in suspects})
+        sizes = [size for size in args.sizes if any(name.endswith(f"[{size}]") for name in suspects)]
+        rerun = run(argparse.Namespace(**{**vars(args), "filter": names, "sizes": sizes}))
+        faster = {
+            entry["fullname"]: entry for entry in rerun["benchmarks"] if entry["fullname"] in suspects
+        }
+        result["benchmarks"] = [
+            faster[entry["fullname"]]
+            if entry["fullname"] in faster and faster[entry["fullname"]]["stats"][args.stat] < entry["stats"][args.stat]
+            else entry
+            for entry in result["benchmarks"]
+        ]
+    return result
+
+
+def _print_comparison(rows: List[Dict[str, Any]], stat: str, threshold: float) -> None:
+    print(f"{'benchmark':<64}{'base ' + stat:>14}{'new ' + stat:>14}{'change':>10}  status (threshold {threshold:.0%})")
+    for row in rows:
+        before = f"{row['baseline'] * 1000:.3f}ms" if row["baseline"] is not None else "-"
+        after = f"{row['current'] * 1000:.3f}ms" if row["current"] is not None else "-"
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        print(f"{row['name']:<64}{before:>14}{after:>14}{change:>10}  {row['status']}")
+
+
+def _add_compare_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--stat", choices=("min", "median", "mean", "max"), default="min")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="ignore regressions smaller than this many milliseconds")
+    parser.add_argument("--ignore-machine", action="store_true",
+                        help="gate even if the baseline was recorded on a different machine")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="do not fail on baseline benchmarks absent from the current run (partial runs)")
+
+
+def _load(path: Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _gate(baseline: Dict[str, Any], current: Dict[str, Any], args) -> int:
+    rows, failed = compare(baseline, current, args.threshold, args.stat, args.min_delta_ms, args.allow_missing)
+    _print_comparison(rows, args.stat, args.threshold)
+    if baseline.get("machine_info") != current.get("machine_info") and not args.ignore_machine:
+        print(f"NOT GATED: baseline was recorded on a different machine ({baseline.get('machine_info')}); "
+              "record a local baseline with 'make bench-baseline' or pass --ignore-machine")
+        return 0
+    if failed:
+        regressed = sum(row["status"] == "REGRESSED" for row in rows)
+        missing = sum(row["status"] == "MISSING" for row in rows)
+        print(f"FAILED: {regressed} benchmark(s) regressed, {missing} missing from this run"
+              + (" (pass --allow-missing for partial runs)" if missing else ""))
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Router and service micro-benchmarks with regression gating")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write a JSON result")
+    run_parser.add_argument("--sizes", type=lambda s: s.split(","), default=list(DEFAULT_SIZES),
+                            help=f"comma-separated dataset presets from: {', '.join(SHAPES)}")
+    run_parser.add_argument("--filter", type=lambda s: s.split(","), help="only benchmarks whose name contains one of these")
+    run_parser.add_argument("--min-rounds", type=int, default=5)
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="seconds of timed rounds per benchmark")
+    run_parser.add_argument("--max-time", type=float, default=2.0)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", type=Path, default=BASELINE_DIR / "micro.json")
+    run_parser.add_argument("--compare-to", type=Path, help="baseline to gate the fresh results against")
+    run_parser.add_argument("--confirm", type=int, default=2,
+                            help="re-run apparent regressions this many times before gating")
+    _add_compare_arguments(run_parser)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files; exit 1 on regression")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    _add_compare_arguments(compare_parser)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return _gate(_load(args.baseline), _load(args.current), args)
+
+    unknown = [size for size in args.sizes if size not in SHAPES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'app.db'}",
+            "DEBUG": "false",
+            "LOG_FILE_ENABLED": "false",
+            "RATE_LIMIT_ENABLED": "false",
+            "DAILY_REQUEST_LIMIT": "0",
+        })
+        result = run(args)
+        baseline = _load(args.compare_to) if args.compare_to else None
+        if baseline is not None and (baseline.get("machine_info") == result["machine_info"] or args.ignore_machine):
+            result = confirm_regressions(args, baseline, result)
+    print(f"wrote {write_json(args.output, result)}")
+    return _gate(baseline, result, args) if baseline is not None else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""Deterministic OpenAI/Anthropic-compatible mock LLM server.
+
+Serves ``/v1/chat/completions``, ``/v1/completions``, ``/v1/messages`` and
+``/v1/models`` (streamed or not) so load tests exercise the real HTTP path
+of AIService without provider credits:
+
+- time to first token follows a configurable distribution, then tokens are
+  produced at ``--tokens-per-second`` (non-streamed responses wait for the
+  whole completion);
+- ``--error-rate`` answers 500 and ``--rate-limit-rate`` answers 429 with
+  ``Retry-After``;
+- content, latency and injected faults derive from ``--seed`` and the
+  request body, so the same request sequence always gets the same answers.
+
+    cd backend
+    python -m benchmarks.mock_llm --port 9100 --latency lognormal:0.4,0.5 \\
+        --tokens-per-second 60 --error-rate 0.01 --rate-limit-rate 0.02
+
+Point the app at it with provider ``custom`` and base_url
+``http://127.0.0.1:9100``, ``openai`` and ``http://127.0.0.1:9100/v1``, or
+``anthropic`` and ``http://127.0.0.1:9100`` (any api key).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_CJK_PHRASES = (
+    "夜色沉沉", "风从山谷里吹来", "她握紧了手中的剑", "城门缓缓打开", "远处传来钟声",
+    "他沉默了很久", "灯火映在湖面上", "命运的齿轮开始转动", "雨落在青石板上", "旧信纸已经泛黄",
+)
+_LATIN_WORDS = (
+    "the", "ancient", "river", "whispered", "across", "silver", "valley", "while", "lanterns",
+    "flickered", "beneath", "a", "restless", "sky", "and", "memory", "drifted", "toward", "dawn",
+)
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """``fixed:S``, ``uniform:LO,HI``, ``normal:MU,SIGMA`` or ``lognormal:MEDIAN,SIGMA`` (seconds)."""
+    kind, _, raw = spec.partition(":")
+    params = [float(value) for value in raw.split(",")] if raw else []
+    if kind == "fixed" and len(params) == 1:
+        return lambda _rng: params[0]
+    if kind == "uniform" and len(params) == 2:
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal" and len(params) == 2:
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal" and len(params) == 2:
+        return lambda rng: rng.lognormvariate(math.log(params[0]), params[1])
+    raise ValueError(f"Invalid latency distribution: {spec!r}")
+
+
+@dataclass
+class MockLLMConfig:
+    seed: int = 0
+    latency: str = "lognormal:0.3,0.5"  # time to first token
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 120
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    # Multiplies every delay; 0 answers immediately (unit tests)
+    time_scale: float = 1.0
+
+
+@dataclass
+class _Plan:
+    status: int
+    ttft: float
+    tokens: List[str]
+    prompt_tokens: int
+
+
+def _tokens(rng: random.Random, count: int) -> List[str]:
+    tokens: List[str] = []
+    while len(tokens) < count:
+        if rng.random() < 0.5:
+            phrase = rng.choice(_CJK_PHRASES)
+            tokens.extend(phrase[i:i + 2] for i in range(0, len(phrase), 2))
+            tokens.append("，" if rng.random() < 0.7 else "。")
+        else:
+            tokens.extend(" " + rng.choice(_LATIN_WORDS) for _ in range(rng.randint(3, 8)))
+            tokens.append(".")
+    tokens = tokens[:count]
+    tokens[0] = tokens[0].lstrip()
+    return tokens
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    if "messages" in body:
+        parts = []
+        for message in body["messages"]:
+            content = message.get("content")
+            if isinstance(content, list):
+                content = "".join(block.get("text", "") for block in content if isinstance(block, dict))
+            parts.append(str(content or ""))
+        return "\n".join(parts)
+    return str(body.get("prompt") or "")
+
+
+class MockLLM:
+    """Request planning and bookkeeping shared by every endpoint."""
+
+    def __init__(self, config: Optional[MockLLMConfig] = None):
+        self.config = config or MockLLMConfig()
+        self._ttft = parse_distribution(self.config.latency)
+        self._seen: Counter = Counter()
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    def plan(self, body: Dict[str, Any]) -> _Plan:
+        prompt = _prompt_text(body)
+        digest = hashlib.sha256(json.dumps(body, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        with self._lock:
+            occurrence = self._seen[digest]
+            self._seen[digest] += 1
+        # 内容只取决于种子与提示词；延迟与故障还取决于同一请求的第几次出现
+        content_rng = random.Random(f"{self.config.seed}:{body.get('model')}:{prompt}")
+        fault_rng = random.Random(f"{self.config.seed}:{digest}:{occurrence}")
+        roll = fault_rng.random()
+        if roll < self.config.rate_limit_rate:
+            status = 429
+        elif roll < self.config.rate_limit_rate + self.config.error_rate:
+            status = 500
+        else:
+            status = 200
+        count = min(int(body.get("max_tokens") or self.config.completion_tokens), self.config.completion_tokens)
+        with self._lock:
+            self.stats[str(status)] += 1
+        return _Plan(
+            status=status,
+            ttft=self._ttft(fault_rng) * self.config.time_scale,
+            tokens=_tokens(content_rng, max(1, count)),
+            prompt_tokens=max(1, len(prompt) // 2),
+        )
+
+    @property
+    def token_interval(self) -> float:
+        return self.config.time_scale / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+
+    async def wait_full(self, plan: _Plan) -> None:
+        await asyncio.sleep(plan.ttft + self.token_interval * (len(plan.tokens) - 1))
+
+    async def stream(self, plan: _Plan) -> AsyncIterator[str]:
+        await asyncio.sleep(plan.ttft)
+        for index, token in enumerate(plan.tokens):
+            if index:
+                await asyncio.sleep(self.token_interval)
+            yield token
+
+
+def _error(provider: str, plan: _Plan, retry_after: float) -> JSONResponse:
+    if plan.status == 429:
+        message, kind = "Rate limit reached (mock)", "rate_limit_error"
+        headers = {"Retry-After": f"{retry_after:g}"}
+    else:
+        message, kind = "Internal server error (mock)", "api_error"
+        headers = {}
+    if provider == "anthropic":
+        body = {"type": "error", "error": {"type": kind, "message": message}}
+    else:
+        body = {"error": {"message": message, "type": kind, "code": plan.status}}
+    return JSONResponse(body, status_code=plan.status, headers=headers)
+
+
+def _sse(data: Any, event: Optional[str] = None) -> str:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+
+
+def create_app(config: Optional[MockLLMConfig] = None) -> FastAPI:
+    mock = MockLLM(config)
+    app = FastAPI(title="Mock LLM")
+    app.state.mock = mock
+
+    @app.get("/v1/models")
+    async def models():
+        created = 1700000000
+        names = ("mock-gpt", "mock-claude")
+        return {
+            "object": "list",
+            "data": [
+                {"id": name, "object": "model", "type": "model", "created": created,
+                 "created_at": "2023-11-14T00:00:00Z", "display_name": name, "owned_by": "mock"}
+                for name in names
+            ],
+            "has_more": False,
+        }
+
+    async def _openai(request: Request, chat: bool):
+        body = await request.json()
+        plan = mock.plan(body)
+        if plan.status != 200:
+            await asyncio.sleep(plan.ttft)
+            return _error("openai", plan, mock.config.retry_after)
+        model = body.get("model", "mock-gpt")
+        completion_id = f"chatcmpl-mock-{hashlib.md5(''.join(plan.tokens).encode('utf-8')).hexdigest()[:12]}"
+        usage = {
+            "prompt_tokens": plan.prompt_tokens,
+            "completion_tokens": len(plan.tokens),
+            "total_tokens": plan.prompt_tokens + len(plan.tokens),
+        }
+        created = int(time.time())
+        if not body.get("stream"):
+            await mock.wait_full(plan)
+            content = "".join(plan.tokens)
+            choice = {"index": 0, "finish_reason": "stop", "logprobs": None}
+            choice.update({"message": {"role": "assistant", "content": content}} if chat else {"text": content})
+            return {
+                "id": completion_id, "object": "chat.completion" if chat else "text_completion",
+                "created": created, "model": model, "choices": [choice], "usage": usage,
+            }
+
+        async def events():
+            obj = "chat.completion.chunk" if chat else "text_completion"
+            async for token in mock.stream(plan):
+                choice = {"index": 0, "finish_reason": None}
+                choice.update({"delta": {"content": token}} if chat else {"text": token})
+                yield _sse({"id": completion_id, "object": obj, "created": created, "model": model, "choices": [choice]})
+            final = {"index": 0, "finish_reason": "stop"}
+            final.update({"delta": {}} if chat else {"text": ""})
+            yield _sse({"id": completion_id, "object": obj, "created": created, "model": model,
+                        "choices": [final], "usage": usage})
+            yield _sse("[DONE]")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await _openai(request, chat=True)
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        return await _openai(request, chat=False)
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        plan = mock.plan(body)
+        if plan.status != 200:
+            await asyncio.sleep(plan.ttft)
+            return _error("anthropic", plan, mock.config.retry_after)
+        model = body.get("model", "mock-claude")
+        message_id = f"msg_mock_{hashlib.md5(''.join(plan.tokens).encode('utf-8')).hexdigest()[:12]}"
+        if not body.get("stream"):
+            await mock.wait_full(plan)
+            return {
+                "id": message_id, "type": "message", "role": "assistant", "model": model,
+                "content": [{"type": "text", "text": "".join(plan.tokens)}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": plan.prompt_tokens, "output_tokens": len(plan.tokens)},
+            }
+
+        async def events():
+            yield _sse({"type": "message_start", "message": {
+                "id": message_id, "type": "message", "role": "assistant", "model": model, "content": [],
+                "stop_reason": None, "stop_sequence": None,
+                "usage": {"input_tokens": plan.prompt_tokens, "output_tokens": 0},
+            }}, "message_start")
+            yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+                       "content_block_start")
+            async for token in mock.stream(plan):
+                yield _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}},
+                           "content_block_delta")
+            yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            yield _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                        "usage": {"output_tokens": len(plan.tokens)}}, "message_delta")
+            yield _sse({"type": "message_stop"}, "message_stop")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/mock/stats")
+    async def stats():
+        return {"config": asdict(mock.config), "responses": dict(mock.stats)}
+
+    return app
+
+
+class MockLLMServer:
+    """Run the mock on a free local port in a background thread.
+
+        with MockLLMServer(MockLLMConfig(seed=1)) as base_url:
+            ...
+    """
+
+    def __init__(self, config: Optional[MockLLMConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+
+        self.app = create_app(config)
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.servers[0].sockets[0].getsockname()[:2]
+
+    def __enter__(self) -> str:
+        self._thread = threading.Thread(target=self._server.run, name="mock-llm", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Mock LLM server failed to start")
+            time.sleep(0.01)
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockLLMConfig()
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--latency", default=defaults.latency, help="time-to-first-token distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--time-scale", type=float, default=defaults.time_scale)
+
+
+def config_from_args(args: argparse.Namespace) -> MockLLMConfig:
+    parse_distribution(args.latency)
+    return MockLLMConfig(
+        seed=args.seed,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        time_scale=args.time_scale,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI/Anthropic-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
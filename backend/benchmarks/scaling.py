@@ -0,0 +1,224 @@
+"""Endpoint latency as the dataset grows.
+
+For each dataset shape (see ``benchmarks.datagen``) a fresh SQLite database
+is generated, the in-process app is pointed at it and every read endpoint
+below is timed against the largest novel. Response and object caches are
+cleared before each request unless ``--warm`` is given, so the numbers show
+how query cost scales with the data rather than cache hit rates. Results
+per shape and endpoint are written to a baseline JSON file.
+
+    cd backend
+    python -m benchmarks.scaling
+    python -m benchmarks.scaling --shapes tiny,small,medium,large --iterations 50
+    python -m benchmarks.scaling --shapes small --chapters 5000 --warm --output /tmp/warm.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.common import BASELINE_DIR, summarize_ms, write_json  # noqa: E402
+from benchmarks.datagen import SHAPES, DatasetShape, generate  # noqa: E402
+
+ADMIN_USERNAME = "bench-admin"
+ADMIN_PASSWORD = "bench-admin-password"
+
+# name -> (path template, needs admin token); placeholders are filled from Dataset.targets
+ENDPOINTS: Dict[str, Tuple[str, bool]] = {
+    "novels.list": ("/api/novels/?limit=100", False),
+    "novels.get": ("/api/novels/{novel_id}", False),
+    "chapters.list_first_page": ("/api/chapters/?novel_id={novel_id}&limit=100", False),
+    "chapters.list_last_page": ("/api/chapters/?novel_id={novel_id}&skip={last_page_skip}&limit=100", False),
+    "chapters.get": ("/api/chapters/{chapter_id}", False),
+    "versions.by_chapter": ("/api/chapter-versions/chapter/{chapter_id}", False),
+    "versions.with_versions": ("/api/chapter-versions/chapter/{chapter_id}/with-versions", False),
+    "versions.content": ("/api/chapter-versions/{version_id}/content", False),
+    "evaluations.by_chapter": ("/api/chapter-versions/evaluations/chapter/{chapter_id}", False),
+    "paragraphs.page": ("/api/chapter-paragraphs/chapter/{chapter_id}?limit=50", False),
+    "characters.list": ("/api/characters/?novel_id={novel_id}", False),
+    "plots.list": ("/api/plots/?novel_id={novel_id}", False),
+    "worlds.by_novel": ("/api/worlds/novel/{novel_id}", False),
+    "admin.stats": ("/api/admin/stats", True),
+    "admin.novels_stats": ("/api/admin/novels/stats?sort_by=chapter_count&limit=50", True),
+}
+
+
+class Dataset:
+    """A generated database plus the ids the endpoints are exercised with."""
+
+    def __init__(self, name: str, shape: DatasetShape, path: Path):
+        from sqlalchemy import create_engine, func, select
+        from sqlalchemy.orm import sessionmaker
+
+        from app.core import security
+        from app.core.database import Base
+        from app.models import Admin, Chapter
+
+        self.name = name
+        self.shape = shape
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        Base.metadata.create_all(bind=self.engine)
+
+        started = time.perf_counter()
+        self.generator = generate(self.session_factory, shape)
+        self.generate_seconds = round(time.perf_counter() - started, 3)
+
+        novel_id = self.generator.novel_ids[0]
+        with self.session_factory() as db:
+            db.add(Admin(username=ADMIN_USERNAME, email="bench-admin@example.com",
+                         hashed_password=security.build_pwd_context(4).hash(ADMIN_PASSWORD)))
+            db.commit()
+            count = db.execute(select(func.count(Chapter.id)).where(Chapter.novel_id == novel_id)).scalar()
+            chapter_id, version_id = db.execute(
+                select(Chapter.id, Chapter.selected_version_id)
+                .where(Chapter.novel_id == novel_id, Chapter.chapter_number == max(1, count // 2))
+            ).one()
+        self.targets = {
+            "novel_id": novel_id,
+            "chapter_id": chapter_id,
+            "version_id": version_id,
+            "last_page_skip": max(0, count - 100),
+        }
+
+    def override_db(self, app) -> None:
+        from app.core.database import get_db
+
+        def _get_db():
+            db = self.session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = _get_db
+
+    def dispose(self) -> None:
+        self.engine.dispose()
+
+
+def clear_caches() -> None:
+    from app.core.cache import cache
+    from app.core.response_cache import response_cache
+
+    cache.clear()
+    response_cache.clear()
+
+
+async def _measure(client, dataset: Dataset, args) -> Dict[str, Any]:
+    response = await client.post("/api/admin/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+    response.raise_for_status()
+    admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    endpoints: Dict[str, Any] = {}
+    for name, (template, admin) in ENDPOINTS.items():
+        if name.startswith("paragraphs.") and not dataset.shape.paragraphs:
+            continue
+        path = template.format(**dataset.targets)
+        headers = admin_headers if admin else {}
+        samples: List[float] = []
+        statuses = set()
+        for iteration in range(args.warmup + args.iterations):
+            if not args.warm:
+                clear_caches()
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            elapsed = (time.perf_counter() - started) * 1000
+            statuses.add(response.status_code)
+            if iteration >= args.warmup:
+                samples.append(elapsed)
+        endpoints[name] = {**summarize_ms(samples), "statuses": sorted(statuses), "bytes": len(response.content)}
+    return endpoints
+
+
+async def _run_shape(name: str, shape: DatasetShape, args, tmp: Path) -> Dict[str, Any]:
+    import httpx
+
+    from app.main import app
+
+    dataset = Dataset(name, shape, tmp / f"{name}.db")
+    print(f"[{name}] generated {sum(dataset.generator.counts.values())} rows in {dataset.generate_seconds}s")
+    dataset.override_db(app)
+    clear_caches()
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=120) as client:
+            endpoints = await _measure(client, dataset, args)
+    finally:
+        app.dependency_overrides.clear()
+        dataset.dispose()
+    return {
+        "shape": asdict(shape),
+        "rows": dataset.generator.counts,
+        "largest_novel_chapters": shape.chapters_for(0),
+        "generate_seconds": dataset.generate_seconds,
+        "endpoints": endpoints,
+    }
+
+
+def _print(result: Dict[str, Any]) -> None:
+    names = list(result["shapes"])
+    print(f"p50 ms by shape ({'warm' if result['config']['warm'] else 'cold'} caches)")
+    print(f"{'endpoint':<28}" + "".join(f"{name:>12}" for name in names))
+    for endpoint in ENDPOINTS:
+        cells = [result["shapes"][name]["endpoints"].get(endpoint) for name in names]
+        if not any(cells):
+            continue
+        print(f"{endpoint:<28}" + "".join(f"{cell['p50']:>12.2f}" if cell else f"{'-':>12}" for cell in cells))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Endpoint latency across growing synthetic datasets")
+    parser.add_argument("--shapes", type=lambda s: s.split(","), default=["tiny", "small", "medium"],
+                        help=f"comma-separated presets from: {', '.join(SHAPES)}")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--warm", action="store_true", help="keep object/response caches between requests")
+    parser.add_argument("--chapters", type=int, help="override chapters of every shape")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=BASELINE_DIR / "scaling.json")
+    args = parser.parse_args()
+    unknown = [name for name in args.shapes if name not in SHAPES]
+    if unknown:
+        parser.error(f"unknown shapes: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'app.db'}",
+            "DEBUG": "false",
+            "LOG_FILE_ENABLED": "false",
+            "RATE_LIMIT_ENABLED": "false",
+        })
+        from app.core.logger import logger
+
+        # Request logging would dominate the console; its cost is measured by the load test
+        logger.setLevel(logging.WARNING)
+        shapes = {}
+        for name in args.shapes:
+            shape = replace(SHAPES[name], seed=args.seed)
+            if args.chapters:
+                shape = replace(shape, chapters=args.chapters)
+            shapes[name] = asyncio.run(_run_shape(name, shape, args, Path(tmp)))
+
+    result = {
+        "benchmark": "scaling",
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"iterations": args.iterations, "warmup": args.warmup, "warm": args.warm, "seed": args.seed},
+        "shapes": shapes,
+    }
+    _print(result)
+    print(f"wrote {write_json(args.output, result)}")
+
+
+if __name__ == "__main__":
+    main()
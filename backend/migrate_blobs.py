@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Move chapter version bodies between the database and the blob store.
+
+Examples:
+    python migrate_blobs.py --to local       # DB -> filesystem store
+    python migrate_blobs.py --to database    # external store -> DB
+    python migrate_blobs.py --gc             # sweep unreferenced blobs
+"""
+from __future__ import annotations
+
+import argparse
+
+from app.core.database import SessionLocal
+from app.services.chapter_blobs import backfill_legacy_versions, collect_garbage, migrate_blobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", choices=["database", "local", "s3"], help="target storage backend")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--gc", action="store_true", help="garbage-collect unreferenced blobs")
+    parser.add_argument("--gc-grace-seconds", type=float, default=None,
+                        help="skip blobs written more recently than this (default BLOB_GC_GRACE_SECONDS)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        backfilled = backfill_legacy_versions(db, batch_size=args.batch_size)
+        print(f"Backfilled {backfilled} legacy versions into chapter_blobs")
+        if args.to:
+            moved = migrate_blobs(db, args.to, batch_size=args.batch_size)
+            print(f"Moved {moved} blobs to {args.to}")
+        if args.gc:
+            removed = collect_garbage(db, grace_seconds=args.gc_grace_seconds)
+            print(f"Removed {removed} unreferenced blobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,83 @@
 from __future__ import annotations
 
+import inspect
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from app.core import security
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.profiling import profile_buffer, profile_tokens
 from app.core.database import Base, get_db
+from app.core.loop_watchdog import fail_on_slow_callbacks
+from app.core.rate_limit import sliding_limiter
+from app.core.response_cache import response_cache
+from app.core.tracing import trace_buffer
 from app.main import app
+from app.models.admin import Admin
+from app.services.counters import counter_aggregator
+from app.services.reordering import rank_rebalancer
+from app.services.token_ledger import token_ledger
 
 # Use in-memory SQLite for tests
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
+# StaticPool keeps a single connection so every session (including the ones
+# opened from the TestClient worker thread) sees the same in-memory database.
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Buffered counters, usage records and pending rank rebalances are only
+# flushed explicitly or at client shutdown, into the test database (never
+# from a background thread while a test is using the shared connection).
+counter_aggregator._session_factory = TestingSessionLocal
+token_ledger._session_factory = TestingSessionLocal
+rank_rebalancer._session_factory = TestingSessionLocal
+settings.COUNTER_FLUSH_SECONDS = 3600
+settings.TOKEN_LEDGER_FLUSH_SECONDS = 3600
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--asyncio-slow-callback-ms", type=float, default=float(os.environ.get("ASYNCIO_SLOW_CALLBACK_MS") or 0),
+        help="fail async tests in which an event loop callback blocks longer than this (0 disables)",
+    )
+
+
+@pytest.fixture(autouse=True)
+def _slow_callback_guard(request):
+    """Run async tests in asyncio debug mode when --asyncio-slow-callback-ms is set."""
+    threshold = request.config.getoption("--asyncio-slow-callback-ms")
+    if (
+        not threshold
+        or not inspect.iscoroutinefunction(getattr(request, "function", None))
+        or request.node.get_closest_marker("blocks_loop")
+    ):
+        yield
+        return
+    with fail_on_slow_callbacks(request.getfixturevalue("event_loop"), threshold):
+        yield
 
 
 @pytest.fixture
 def db():
     """Create a fresh database for each test."""
+    cache.clear()
+    response_cache.clear()
+    sliding_limiter.reset()
+    counter_aggregator.clear()
+    token_ledger.clear()
+    trace_buffer.clear()
+    profile_buffer.clear()
+    profile_tokens.clear()
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
     try:
@@ -42,3 +100,50 @@ def client(db):
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def admin(db, monkeypatch):
+    """A ``root`` / ``secret`` admin account, hashed at the cheapest bcrypt cost."""
+    monkeypatch.setattr(security, "pwd_context", security.build_pwd_context(4))
+    account = Admin(username="root", email="root@example.com", hashed_password=security.hash_password("secret"))
+    db.add(account)
+    db.commit()
+    return account
+
+
+@pytest.fixture
+def admin_headers(client, admin):
+    """Authorization headers of a logged-in admin."""
+    token = client.post("/api/admin/login", json={"username": "root", "password": "secret"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def novel(client):
+    """A novel created through the API, for tests that need chapters or other children."""
+    response = client.post("/api/novels/", json={"title": "Novel", "author": "Author"})
+    assert response.status_code == 201
+    return response.json()
+
+
+@pytest.fixture
+def make_chapter(client, novel):
+    """Create chapters of ``novel`` through the API; numbered (and titled) in creation order."""
+    created = []
+
+    def make(**fields):
+        number = len(created) + 1
+        payload = {"novel_id": novel["id"], "title": f"Chapter {number}", "chapter_number": number, **fields}
+        response = client.post("/api/chapters/", json=payload)
+        assert response.status_code == 201
+        created.append(response.json())
+        return created[-1]
+
+    return make
+
+
+@pytest.fixture
+def chapter(make_chapter):
+    """Chapter 1 of ``novel``, with the draft text ``v0``."""
+    return make_chapter(content="v0")
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from sqlalchemy import event
+
+from app.models.chapter import Chapter, ChapterVersion
+from app.models.novel import Novel
+from app.models.user import User
+
+
+def _seed(db) -> User:
+    user = User(username="writer", hashed_password="x", is_active=True)
+    db.add(user)
+    db.commit()
+    for index, novel_status in enumerate(["draft", "DRAFT", "in_progress", "Published", "archived"]):
+        novel = Novel(title=f"N{index}", user_id=user.id, status=novel_status)
+        db.add(novel)
+        db.flush()
+        db.add(Chapter(novel_id=novel.id, chapter_number=1, title="c", word_count=100 * (index + 1)))
+    db.commit()
+    return user
+
+
+def test_stats_use_grouped_queries_and_cache(client, db, admin_headers):
+    _seed(db)
+
+    statements = []
+    engine = db.get_bind()
+    record = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        stats = client.get("/api/admin/stats", headers=admin_headers).json()
+        novel_queries = [s for s in statements if "FROM novels" in s]
+        statements.clear()
+        assert client.get("/api/admin/stats", headers=admin_headers).json() == stats
+        assert not [s for s in statements if "FROM novels" in s or "FROM chapters" in s]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(novel_queries) == 1 and "GROUP BY lower(novels.status)" in novel_queries[0]
+    assert stats["novels"] == {
+        "total": 5, "draft": 2, "in_progress": 1, "completed": 0, "published": 1, "archived": 1,
+    }
+    assert stats["chapters"] == {"total": 5, "words": 1500}
+    assert stats["versions"] == 0 and stats["users"] == 1 and stats["admins"] == 1
+    assert stats["tokens"]["total"] == 0
+
+
+def test_novel_stats_keyset_pages(client, db, admin_headers):
+    _seed(db)
+    chapters = db.query(Chapter).order_by(Chapter.id).all()
+    for chapter in chapters[:2]:
+        db.add(ChapterVersion(chapter_id=chapter.id, legacy_content="v"))
+    db.add(ChapterVersion(chapter_id=chapters[0].id, legacy_content="v2"))
+    db.commit()
+
+    def collect(sort_by, order):
+        items, cursor = [], None
+        while True:
+            url = f"/api/admin/novels/stats?sort_by={sort_by}&order={order}&limit=2"
+            response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=admin_headers)
+            assert response.status_code == 200
+            body = response.json()
+            items += body["items"]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return items
+
+    by_words = collect("word_count", "desc")
+    assert [item["word_count"] for item in by_words] == [500, 400, 300, 200, 100]
+    assert [item["version_count"] for item in by_words][-2:] == [1, 2]
+    assert all(item["chapter_count"] == 1 and item["last_activity"] for item in by_words)
+
+    by_versions = collect("version_count", "asc")
+    assert [item["version_count"] for item in by_versions] == [0, 0, 0, 1, 2]
+    assert len({item["id"] for item in by_versions}) == 5
+
+    by_created = collect("created_at", "desc")
+    assert sorted(item["id"] for item in by_created) == sorted(item["id"] for item in by_words)
+    assert client.get("/api/admin/novels/stats?cursor=bogus", headers=admin_headers).status_code == 400
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+
+from app.core.cache import CacheManager, cache
+
+
+def test_lru_ttl_and_tags(monkeypatch):
+    """Entries are evicted by LRU order, expire by TTL and drop by tag."""
+    manager = CacheManager(max_entries=2, default_ttl=60)
+    manager.set("a", 1, tags=("novel:1",))
+    manager.set("b", 2)
+    assert manager.get("a") == 1  # touch a, making b the LRU entry
+    manager.set("c", 3, tags=("novel:1",))
+    assert manager.get("b") is None
+    assert manager.stats.evictions == 1
+
+    assert manager.invalidate_tags("novel:1") == 2
+    assert manager.get("a") is None and manager.get("c") is None
+
+    now = [1000.0]
+    cache_module = importlib.import_module("app.core.cache")
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    manager.set("short", "value", ttl=5)
+    now[0] += 6
+    assert manager.get("short") is None
+    assert manager.stats.expirations == 1
+
+
+class _FakeRedis:
+    """Just enough of redis-py for the L2 tier."""
+
+    def __init__(self):
+        self.values, self.sets = {}, {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def ttl(self, key):
+        return 60 if key in self.values else -2
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, ()))
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.sets.pop(key, None)
+
+
+def test_l1_warmed_from_l2_keeps_tags():
+    """A copy warmed from Redis on another worker is still evicted by tag."""
+    shared = _FakeRedis()
+    writer = CacheManager(redis_client=shared, namespace="t")
+    reader = CacheManager(redis_client=shared, namespace="t")
+    writer.set("novel:1:detail", {"title": "Old"}, tags=("novel:1",))
+
+    assert reader.get("novel:1:detail") == {"title": "Old"}
+    assert reader.stats.l2_hits == 1
+
+    # The writer drops Redis; the invalidation bus then runs the same tags on every worker
+    writer.invalidate_tags("novel:1")
+    assert reader.invalidate_tags("novel:1") == 1
+    assert reader.get("novel:1:detail") is None
+
+
+def test_memory_bound_evicts_oldest():
+    manager = CacheManager(max_entries=100, max_bytes=2000)
+    for index in range(5):
+        manager.set(f"k{index}", "x" * 600)
+    info = manager.info()
+    assert info["bytes"] <= 2000
+    assert manager.get("k0") is None and manager.get("k4") is not None
+
+
+def test_get_or_compute_runs_once_under_concurrency():
+    manager = CacheManager()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(manager.get_or_compute("key", compute) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["value"] * 10
+    assert len(calls) == 1
+
+
+def test_novel_lookup_is_cached_and_invalidated(client):
+    created = client.post("/api/novels/", json={"title": "Cached"}).json()
+    first = client.get(f"/api/novels/{created['id']}").json()
+    hits = cache.stats.hits
+    assert client.get(f"/api/novels/{created['id']}").json() == first
+    assert cache.stats.hits == hits + 1
+
+    client.put(f"/api/novels/{created['id']}", json={"title": "Renamed"})
+    assert client.get(f"/api/novels/{created['id']}").json()["title"] == "Renamed"
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+
+def _split_chapter(client, make_chapter, content: str) -> int:
+    chapter_id = make_chapter(content=content)["id"]
+    split = client.post(f"/api/chapter-paragraphs/chapter/{chapter_id}/split")
+    assert split.status_code == 200
+    return chapter_id
+
+
+def test_paragraph_range_and_reassembly(client, make_chapter):
+    """Paragraph ranges page by position and reassemble to the original text."""
+    text = "\n".join(f"第{i}段" for i in range(5))
+    chapter_id = _split_chapter(client, make_chapter, text)
+
+    first = client.get(f"/api/chapter-paragraphs/chapter/{chapter_id}", params={"limit": 2}).json()
+    assert [p["content"] for p in first["paragraphs"]] == ["第0段", "第1段"]
+    rest = client.get(
+        f"/api/chapter-paragraphs/chapter/{chapter_id}",
+        params={"after": first["next_after"], "limit": 10},
+    ).json()
+    assert [p["content"] for p in rest["paragraphs"]] == ["第2段", "第3段", "第4段"]
+    assert rest["next_after"] is None
+
+    full = client.get(f"/api/chapter-paragraphs/chapter/{chapter_id}/text").json()
+    assert full["content"] == text
+    assert full["paragraph_count"] == 5
+
+
+def test_insert_update_delete_keep_order_and_word_count(client, make_chapter):
+    """Single-paragraph edits keep ordering and the chapter word count in sync."""
+    chapter_id = _split_chapter(client, make_chapter, "甲\n丙")
+    paragraphs = client.get(f"/api/chapter-paragraphs/chapter/{chapter_id}").json()["paragraphs"]
+
+    inserted = client.post(
+        f"/api/chapter-paragraphs/chapter/{chapter_id}",
+        json={"content": "乙乙", "after_id": paragraphs[0]["id"]},
+    ).json()
+    assert paragraphs[0]["position"] < inserted["position"] < paragraphs[1]["position"]
+
+    client.put(f"/api/chapter-paragraphs/{paragraphs[1]['id']}", json={"content": "丙丙丙"})
+    client.delete(f"/api/chapter-paragraphs/{paragraphs[0]['id']}")
+
+    materialized = client.post(f"/api/chapter-paragraphs/chapter/{chapter_id}/materialize").json()
+    assert materialized["content"] == "乙乙\n丙丙丙"
+    chapter = client.get(f"/api/chapters/{chapter_id}").json()
+    assert chapter["content"] == "乙乙\n丙丙丙"
+    assert chapter["word_count"] == 5
+
+
+def test_insert_retries_when_a_concurrent_insert_took_the_position(client, make_chapter, monkeypatch):
+    """A position taken by a concurrent insert at the same anchor is recomputed, not a 500."""
+    from app.api import chapter_paragraphs
+
+    chapter_id = _split_chapter(client, make_chapter, "甲\n丙")
+    first, second = client.get(f"/api/chapter-paragraphs/chapter/{chapter_id}").json()["paragraphs"]
+    url = f"/api/chapter-paragraphs/chapter/{chapter_id}"
+    taken = client.post(url, json={"after_id": first["id"], "content": "乙"}).json()["position"]
+
+    real_key_between = chapter_paragraphs.key_between
+    calls = []
+
+    def racing_key_between(low, high):
+        calls.append((low, high))
+        # 第一次返回另一请求刚写入的键，模拟两个请求读到同样的相邻段落
+        return taken if len(calls) == 1 else real_key_between(low, high)
+
+    monkeypatch.setattr(chapter_paragraphs, "key_between", racing_key_between)
+    response = client.post(url, json={"after_id": first["id"], "content": "乙二"})
+    assert response.status_code == 201
+    assert len(calls) == 2
+    assert first["position"] < response.json()["position"] < taken
+
+    full = client.get(f"{url}/text").json()
+    assert full["content"] == "甲\n乙二\n乙\n丙"
+    assert full["word_count"] == 5
+
+    monkeypatch.setattr(chapter_paragraphs, "key_between", lambda low, high: second["position"])
+    conflict = client.post(url, json={"before_id": second["id"], "content": "丁"})
+    assert conflict.status_code == 409
+    assert client.get(f"{url}/text").json()["word_count"] == 5
+
+
+def test_paragraph_edits_keep_chapter_content_in_sync(client, make_chapter):
+    """Every paragraph write rewrites chapters.outline, so chapter reads never see a stale draft."""
+    chapter_id = _split_chapter(client, make_chapter, "甲\n丙")
+    first, second = client.get(f"/api/chapter-paragraphs/chapter/{chapter_id}").json()["paragraphs"]
+
+    client.post(f"/api/chapter-paragraphs/chapter/{chapter_id}", json={"content": "乙", "after_id": first["id"]})
+    assert client.get(f"/api/chapters/{chapter_id}").json()["content"] == "甲\n乙\n丙"
+
+    client.put(f"/api/chapter-paragraphs/{second['id']}", json={"content": "丙丙"})
+    client.delete(f"/api/chapter-paragraphs/{first['id']}")
+    chapter = client.get(f"/api/chapters/{chapter_id}").json()
+    assert chapter["content"] == "乙\n丙丙"
+    assert chapter["word_count"] == 3
+
+
+def test_word_count_is_incremented_in_the_database(client, make_chapter, db, monkeypatch):
+    """The delta is applied by SQL, so a concurrent writer's change is not overwritten."""
+    from sqlalchemy import update
+
+    from app.api import chapter_paragraphs
+    from app.models.chapter import Chapter
+
+    chapter_id = _split_chapter(client, make_chapter, "甲")
+    first = client.get(f"/api/chapter-paragraphs/chapter/{chapter_id}").json()["paragraphs"][0]
+    real_get_chapter = chapter_paragraphs._get_chapter
+
+    def racing_get_chapter(session, wanted_id):
+        chapter = real_get_chapter(session, wanted_id)
+        # 模拟另一请求在本请求读取章节之后写入的增量
+        session.execute(
+            update(Chapter).where(Chapter.id == wanted_id).values(word_count=Chapter.word_count + 10)
+            .execution_options(synchronize_session=False)
+        )
+        return chapter
+
+    monkeypatch.setattr(chapter_paragraphs, "_get_chapter", racing_get_chapter)
+    client.post(f"/api/chapter-paragraphs/chapter/{chapter_id}", json={"content": "乙乙", "after_id": first["id"]})
+    assert client.get(f"/api/chapter-paragraphs/chapter/{chapter_id}/text").json()["word_count"] == 13
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from app.models.chapter import ChapterBlob, ChapterVersion
+from app.services.chapter_blobs import backfill_legacy_versions, collect_garbage, content_hash
+
+def _create_version(client, chapter_id: int, content: str) -> dict:
+    response = client.post("/api/chapter-versions/", json={"chapter_id": chapter_id, "content": content})
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_identical_versions_share_one_blob(client, db, chapter):
+    """Re-saving the same text creates a new version but no new body."""
+    chapter_id = chapter["id"]
+    first = _create_version(client, chapter_id, "同样的正文")
+    second = _create_version(client, chapter_id, "同样的正文")
+
+    assert first["id"] != second["id"]
+    assert first["content_hash"] == second["content_hash"] == content_hash("同样的正文")
+    assert db.query(ChapterBlob).count() == 1
+    assert db.get(ChapterBlob, first["content_hash"]).ref_count == 2
+
+    listed = client.get(f"/api/chapter-versions/chapter/{chapter_id}").json()
+    assert [v["content"] for v in listed] == ["同样的正文", "同样的正文"]
+
+
+def test_blob_collected_when_last_version_deleted(client, db, chapter):
+    """Deleting versions releases references; GC frees the blob once none remain."""
+    chapter_id = chapter["id"]
+    first = _create_version(client, chapter_id, "text")
+    second = _create_version(client, chapter_id, "text")
+
+    client.delete(f"/api/chapter-versions/{first['id']}")
+    db.expire_all()
+    assert db.get(ChapterBlob, first["content_hash"]).ref_count == 1
+
+    client.delete(f"/api/chapter-versions/{second['id']}")
+    db.expire_all()
+    # A concurrent save may be about to reuse it, so only GC deletes the row
+    assert db.get(ChapterBlob, first["content_hash"]).ref_count == 0
+    assert collect_garbage(db, grace_seconds=0) == 1
+    assert db.get(ChapterBlob, first["content_hash"]) is None
+
+
+def test_backfill_and_garbage_collection(db):
+    """Legacy inline bodies move into blobs; orphaned blobs are swept."""
+    db.add(ChapterVersion(chapter_id=1, legacy_content="legacy"))
+    db.add(ChapterBlob(hash="0" * 64, content="orphan", size=6, ref_count=3))
+    db.commit()
+
+    assert backfill_legacy_versions(db) == 1
+    version = db.query(ChapterVersion).one()
+    assert version.legacy_content == ""
+    assert version.content == "legacy"
+
+    assert collect_garbage(db) == 0  # the orphan is younger than the grace period
+    assert collect_garbage(db, grace_seconds=0) == 1
+    assert db.get(ChapterBlob, version.content_hash).ref_count == 1
+
+
+def test_garbage_collection_spares_recent_rows_and_objects(db, tmp_path):
+    """Rows and stored objects written within the grace period survive a sweep."""
+    import os
+    import time
+    from datetime import datetime, timedelta, timezone
+
+    from app.core.blob_store import LocalBlobStore
+
+    store = LocalBlobStore(tmp_path)
+    two_hours_ago = datetime.now(timezone.utc) - timedelta(hours=2)
+    db.add(ChapterBlob(hash="a" * 64, content="old", size=3, ref_count=0, created_at=two_hours_ago))
+    db.add(ChapterBlob(hash="b" * 64, content="new", size=3, ref_count=0))
+    db.commit()
+    # "c": body written by a save whose blob row has not committed yet
+    store.put("c" * 64, b"pending")
+    store.put("d" * 64, b"abandoned")
+    stale = time.time() - 7200
+    os.utime(store._path("d" * 64), (stale, stale))
+
+    assert collect_garbage(db, store=store, grace_seconds=3600) == 2
+    assert db.get(ChapterBlob, "a" * 64) is None
+    assert db.get(ChapterBlob, "b" * 64) is not None
+    assert store.exists("c" * 64) and not store.exists("d" * 64)
+
+    # Re-putting an existing body (a new save reusing it) restarts its grace period
+    os.utime(store._path("c" * 64), (stale, stale))
+    store.put("c" * 64, b"pending")
+    assert collect_garbage(db, store=store, grace_seconds=3600) == 0
+    assert store.exists("c" * 64)
+
+
+def test_external_store_ranged_reads_and_migration(client, db, chapter, tmp_path, monkeypatch):
+    """Bodies written to the local store keep only metadata in the DB and move both ways."""
+    from app.core import blob_store
+    from app.core.config import settings
+    from app.services.chapter_blobs import migrate_blobs
+
+    store = blob_store.LocalBlobStore(tmp_path)
+    monkeypatch.setitem(blob_store._stores, "local", store)
+    monkeypatch.setattr(settings, "BLOB_STORE_BACKEND", "local")
+
+    chapter_id = chapter["id"]
+    version = _create_version(client, chapter_id, "第一章正文")
+    blob = db.get(ChapterBlob, version["content_hash"])
+    assert blob.content is None and blob.storage == "local"
+    assert blob.size == len("第一章正文".encode("utf-8"))
+    assert store.get(blob.hash, 3, 6).decode("utf-8") == "一章"
+
+    ranged = client.get(f"/api/chapter-versions/{version['id']}/content", params={"start": 3, "length": 6})
+    assert ranged.status_code == 206
+    assert ranged.text == "一章"
+    assert ranged.headers["content-range"] == "bytes 3-8/15"
+    assert client.get(f"/api/chapter-versions/{version['id']}").json()["content"] == "第一章正文"
+
+    assert migrate_blobs(db, "database") == 1
+    db.refresh(blob)
+    assert blob.content == "第一章正文" and not store.exists(blob.hash)
+
+    assert migrate_blobs(db, "local") == 1
+    db.refresh(blob)
+    assert blob.content is None and store.exists(blob.hash)
+
+
+def test_range_past_end_is_not_satisfiable(client, chapter):
+    chapter_id = chapter["id"]
+    version = _create_version(client, chapter_id, "正文")
+    url = f"/api/chapter-versions/{version['id']}/content"
+
+    for params in ({"start": 6}, {"start": 100, "length": 3}):
+        response = client.get(url, params=params)
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */6"
+
+    tail = client.get(url, params={"start": 3, "length": 100})
+    assert (tail.status_code, tail.text, tail.headers["content-range"]) == (206, "文", "bytes 3-5/6")
+    full = client.get(url)
+    assert (full.status_code, full.text) == (200, "正文") and "content-range" not in full.headers
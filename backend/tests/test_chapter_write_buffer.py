@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.write_buffer import ChapterWriteBuffer, _MemoryBackend, chapter_write_buffer
+from app.models.chapter import Chapter
+
+@pytest.fixture
+def buffered(monkeypatch):
+    """Enable the global chapter write buffer with an isolated backend."""
+    monkeypatch.setattr(settings, "CHAPTER_WRITE_BUFFER_ENABLED", True)
+    monkeypatch.setattr(settings, "CHAPTER_WRITE_BUFFER_FLUSH_SECONDS", 3600)
+    monkeypatch.setattr(chapter_write_buffer, "_backend", _MemoryBackend())
+    yield chapter_write_buffer
+    chapter_write_buffer._backend = None
+
+
+def test_flush_coalesces_pending_updates(db, novel):
+    """Several puts for one chapter become a single row update."""
+    chapter = Chapter(novel_id=novel["id"], chapter_number=1, title="t", outline="v0")
+    db.add(chapter)
+    db.commit()
+
+    buffer = ChapterWriteBuffer(backend=_MemoryBackend())
+    buffer.put(chapter.id, {"outline": "v1"})
+    buffer.put(chapter.id, {"outline": "v2", "word_count": 2})
+    assert buffer.snapshot(chapter)["outline"] == "v2"
+
+    assert buffer.flush(db) == 1
+    db.refresh(chapter)
+    assert chapter.outline == "v2"
+    assert chapter.word_count == 2
+    assert buffer.flush(db) == 0
+
+
+def test_flush_skips_chapters_written_directly_meanwhile(db, novel):
+    """A direct write that absorbs a chapter after the batch was taken is not reverted."""
+    chapter = Chapter(novel_id=novel["id"], chapter_number=1, title="t", outline="v0")
+    db.add(chapter)
+    db.commit()
+
+    backend = _MemoryBackend()
+    buffer = ChapterWriteBuffer(backend=backend)
+    buffer.put(chapter.id, {"outline": "buffered"})
+    take_batch = backend.pop_all
+
+    def pop_then_direct_write():
+        batch = take_batch()
+        assert buffer.pending(chapter.id)["outline"] == "buffered"  # still readable mid-flush
+        buffer.absorb(chapter)
+        chapter.outline = "direct"
+        db.commit()
+        return batch
+
+    backend.pop_all = pop_then_direct_write
+    assert buffer.flush(db) == 0
+    db.refresh(chapter)
+    assert chapter.outline == "direct"
+    assert buffer.pending(chapter.id) == {}
+
+
+def test_chapter_list_fetches_buffered_values_once(client, novel, make_chapter, buffered, monkeypatch):
+    """Listing a page overlays buffered writes with one backend lookup, not one per chapter."""
+    ids = [make_chapter(content="v0")["id"] for _ in range(3)]
+    client.put(f"/api/chapters/{ids[1]}", json={"content": "draft"})
+
+    calls = []
+    get_many = buffered.backend.get_many
+    monkeypatch.setattr(buffered.backend, "get", lambda chapter_id: calls.append(chapter_id))
+    monkeypatch.setattr(buffered.backend, "get_many", lambda chapter_ids: calls.append("many") or get_many(chapter_ids))
+
+    listed = client.get("/api/chapters/", params={"novel_id": novel["id"]}).json()
+    assert calls == ["many"]
+    assert [c["content"] for c in listed] == ["v0", "draft", "v0"]
+
+
+def test_reads_see_buffered_content(client, db, chapter, buffered):
+    """Updates are buffered and visible to reads before they are flushed."""
+    chapter_id = chapter["id"]
+
+    response = client.put(f"/api/chapters/{chapter_id}", json={"content": "draft"})
+    assert response.status_code == 200
+    assert response.json()["content"] == "draft"
+
+    assert db.get(Chapter, chapter_id).outline == "v0"
+    assert client.get(f"/api/chapters/{chapter_id}").json()["content"] == "draft"
+
+    buffered.flush(db)
+    db.expire_all()
+    assert db.get(Chapter, chapter_id).outline == "draft"
+
+
+def test_shutdown_flushes_pending_writes(client, db, chapter, buffered, monkeypatch):
+    """Pending saves are written when the buffer is stopped on shutdown."""
+    chapter_id = chapter["id"]
+    client.put(f"/api/chapters/{chapter_id}", json={"content": "unsaved"})
+
+    monkeypatch.setattr(buffered, "_session_factory", lambda: _NonClosingSession(db))
+    asyncio.run(buffered.stop())
+
+    db.expire_all()
+    assert db.get(Chapter, chapter_id).outline == "unsaved"
+
+
+class _NonClosingSession:
+    """Proxy that keeps the shared test session open after the flush."""
+
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def close(self):
+        pass
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+
+from sqlalchemy import event
+
+from app.core.security import create_access_token
+from app.models.usage_metric import UsageMetric
+from app.models.user import User
+from app.services.counters import METRICS_BUCKET, CounterAggregator, _MemoryBackend
+
+
+def test_increments_are_batched_into_one_flush(db):
+    db.add(UsageMetric(key="ai_requests", value=10))
+    db.commit()
+
+    aggregator = CounterAggregator(backend=_MemoryBackend())
+    for _ in range(5):
+        aggregator.incr_metric("ai_requests")
+        aggregator.incr_metric("api_requests")
+    assert db.query(UsageMetric).count() == 1
+    assert aggregator.live_metrics(db) == {"ai_requests": 15, "api_requests": 5}
+
+    assert aggregator.flush(db) == 2
+    assert aggregator.pending_count() == 0
+    assert db.get(UsageMetric, "ai_requests").value == 15
+
+    aggregator.incr_metric("api_requests", 2)
+    aggregator.flush(db)
+    db.expire_all()
+    assert db.get(UsageMetric, "api_requests").value == 7
+
+
+def test_flush_never_counts_a_delta_twice_nor_blocks_increments(db):
+    backend = _MemoryBackend()
+    aggregator = CounterAggregator(backend=backend)
+    aggregator.incr_metric("ai_requests", 5)
+    seen, readers = [], []
+
+    def read_while_committing(session):
+        # 提交期间的递增（每个请求都会调用）不能等待提交完成
+        writer = threading.Thread(target=lambda: aggregator.incr_metric("api_requests"))
+        writer.start()
+        writer.join(0.2)
+        assert not writer.is_alive()
+        # 另一个线程在提交刚完成时读取缓冲：必须等在途增量清空后才能读到
+        reader = threading.Thread(target=lambda: seen.append(backend.read(METRICS_BUCKET)))
+        reader.start()
+        reader.join(0.2)
+        readers.append(reader)
+
+    event.listen(db, "after_commit", read_while_committing)
+    try:
+        aggregator.flush(db)
+    finally:
+        event.remove(db, "after_commit", read_while_committing)
+    readers[0].join()
+    assert seen == [{"api_requests": 1}]
+    assert db.get(UsageMetric, "ai_requests").value == 5
+
+
+def test_admin_counters_endpoint(client, db, admin_headers):
+    user = User(username="writer", hashed_password="x", is_active=True)
+    db.add(user)
+    db.commit()
+    client.post("/api/ai/test-config", json={"provider": "openai", "api_key": ""},
+                headers={"Authorization": f"Bearer {create_access_token(str(user.id))}"})
+    body = client.get("/api/admin/counters", headers=admin_headers).json()
+    assert body["metrics"]["ai_requests"] == 1
+    assert body["metrics"]["api_requests"] >= 3
+    assert body["daily"]["total"] == 1
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import random
+import re
+from dataclasses import replace
+
+import pytest
+
+from app.models import Chapter, ChapterBlob, ChapterVersion, NovelConversation
+from benchmarks.datagen import SHAPES, DatasetShape, TextFactory, generate
+from tests.conftest import TestingSessionLocal
+
+
+def test_generated_dataset_is_consistent_and_served_in_order(client, db):
+    shape = replace(SHAPES["tiny"], novels_per_user=2, chapters=12, chapter_skew=1.0, versions=2, latin_ratio=0.3)
+    generator = generate(TestingSessionLocal, shape, password_hash="x")
+
+    assert generator.counts["novels"] == 2
+    assert generator.counts["chapters"] == 12 + 6
+    assert generator.counts["chapter_versions"] == generator.counts["chapter_blobs"] == 2 * 18
+    assert generator.counts["novel_conversations"] == 2 * shape.conversations
+
+    chapters = db.query(Chapter).all()
+    assert all(c.selected_version_id is not None and c.selected_version.chapter_id == c.id for c in chapters)
+    assert {b.ref_count for b in db.query(ChapterBlob)} == {1}
+    content = db.query(ChapterVersion).first().content
+    assert re.search(r"[一-鿿]", content) and re.search(r"[A-Za-z]{3,}", content)
+    assert db.query(NovelConversation).first().metadata == {"stage": "concept"}
+
+    novel_id = generator.novel_ids[0]
+    listed = client.get("/api/chapters/", params={"novel_id": novel_id, "limit": 100}).json()
+    assert [c["chapter_number"] for c in listed] == list(range(1, 13))
+    paragraphs = client.get(f"/api/chapter-paragraphs/chapter/{listed[0]['id']}").json()["paragraphs"]
+    assert paragraphs and paragraphs[0]["content"].startswith("第1章")
+
+
+def test_shape_validation_and_deterministic_text():
+    with pytest.raises(ValueError):
+        DatasetShape(chapters=10_001)
+    with pytest.raises(ValueError):
+        DatasetShape(latin_ratio=1.5)
+    assert [DatasetShape(chapters=1000, chapter_skew=1.0).chapters_for(i) for i in range(3)] == [1000, 500, 333]
+    assert TextFactory(random.Random(3), 0.5).body(900) == TextFactory(random.Random(3), 0.5).body(900)
+    assert TextFactory(random.Random(3), 0.5).body(900) != TextFactory(random.Random(4), 0.5).body(900)
@@ -18,3 +18,19 @@ def test_root_endpoint(client):
     assert "message" in data
     assert "version" in data
     assert data["status"] == "running"
+
+
+def test_cross_cutting_middleware_is_plain_asgi(client):
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from app.main import app
+
+    wrapped = [m.kwargs["dispatch"].__name__ for m in app.user_middleware if m.cls is BaseHTTPMiddleware]
+    assert wrapped == ["log_requests"]
+
+    response = client.get("/api/novels/", headers={"X-Request-ID": "req-42"})
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "req-42"
+    assert response.headers["X-Cache"] == "MISS"
+    assert "total;dur=" in response.headers["Server-Timing"]
+    assert client.get("/api/novels/").headers["X-Cache"] == "HIT"
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from app.core.cache import cache
+from app.core.invalidation import InvalidationBus, InvalidationEvent, InvalidationKind, invalidation_bus
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+def test_chapter_event_evicts_novel_scoped_entries():
+    cache.set("chapters:list", ["cached"], tags=("novel:n1",))
+    cache.set("other", "kept", tags=("novel:n2",))
+
+    invalidation_bus.publish(InvalidationKind.CHAPTER, 7, novel_id="n1")
+
+    assert cache.get("chapters:list") is None
+    assert cache.get("other") == "kept"
+
+
+def test_events_cross_workers_over_pubsub():
+    """A worker publishes to Redis; peers apply it, the sender ignores its own echo."""
+    redis_client = _FakeRedis()
+    sender = InvalidationBus(redis_client, "test-channel")
+    receiver = InvalidationBus(None, "test-channel")
+    seen = []
+    receiver.subscribe(seen.append, InvalidationKind.PROMPT)
+    sender.subscribe(seen.append, InvalidationKind.PROMPT)
+
+    sender.publish(InvalidationKind.PROMPT, 3)
+    assert len(seen) == 1  # local dispatch on the sender
+    channel, payload = redis_client.published[0]
+    assert channel == "test-channel"
+
+    receiver._on_message({"data": payload})
+    sender._on_message({"data": payload})
+    assert len(seen) == 2
+    assert seen[1] == InvalidationEvent.from_json(payload)
+    assert seen[1].kind is InvalidationKind.PROMPT and seen[1].key == "3"
+
+
+def test_chapter_write_invalidates_cached_novel_summary(client):
+    novel = client.post("/api/novels/", json={"title": "Bus"}).json()
+    cache.set(f"novel:summary:{novel['id']}", {"title": "stale"}, tags=(f"novel:{novel['id']}",))
+
+    client.post("/api/chapters/", json={"novel_id": novel["id"], "title": "One", "chapter_number": 1})
+    assert cache.get(f"novel:summary:{novel['id']}") is None
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import ai_service, llm_cassette
+from app.services.ai_service import AIService
+from app.services.llm_cassette import Cassette, CassetteMiss, CassetteTransport
+
+_SSE = 'data: {"delta": "夜色"}\n\ndata: [DONE]\n\n'.encode("utf-8")
+# 第一块在多字节字符中间截断，验证非 UTF-8 分块也能原样回放
+SSE_CHUNKS = [_SSE[:18], _SSE[18:30], _SSE[30:]]
+
+
+async def _slow_stream():
+    for chunk in SSE_CHUNKS:
+        await asyncio.sleep(0.02)
+        yield chunk
+
+
+def _upstream(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=_slow_stream())
+
+
+async def _stream(transport, body: dict):
+    async with httpx.AsyncClient(transport=transport, base_url="http://provider.invalid") as client:
+        async with client.stream("POST", "/v1/chat/completions", json=body) as response:
+            return response.status_code, [chunk async for chunk in response.aiter_raw()]
+
+
+async def test_streamed_chunks_replay_with_scaled_timing(tmp_path):
+    path = tmp_path / "llm.jsonl.gz"
+    recorder = CassetteTransport(Cassette(path), "record", transport=httpx.MockTransport(_upstream))
+    assert await _stream(recorder, {"model": "m", "stream": True}) == (200, SSE_CHUNKS)
+
+    recorded = Cassette(path)
+    interaction = recorded.next_for(next(iter(recorded._interactions)))
+    offsets = [offset for offset, _ in interaction["response"]["chunks"]]
+    assert len(offsets) == 3 and offsets == sorted(offsets) and offsets[-1] >= 50
+
+    started = time.perf_counter()
+    # 键与主机、字段顺序无关
+    replayer = CassetteTransport(Cassette(path), "replay", latency_scale=0.5)
+    assert await _stream(replayer, {"stream": True, "model": "m"}) == (200, SSE_CHUNKS)
+    assert time.perf_counter() - started >= offsets[-1] / 1000 * 0.5 * 0.8
+
+    with pytest.raises(CassetteMiss):
+        await _stream(CassetteTransport(Cassette(path), "replay", latency_scale=0), {"model": "other"})
+
+
+async def test_ai_service_records_then_replays_offline(tmp_path, monkeypatch):
+    calls = []
+
+    def upstream(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "录制的正文"}}],
+            "usage": {"prompt_tokens": 4, "completion_tokens": 3, "total_tokens": 7},
+        })
+
+    monkeypatch.setattr(settings, "AI_CASSETTE_PATH", str(tmp_path / "ai.jsonl"))
+    monkeypatch.setattr(settings, "AI_CASSETTE_LATENCY_SCALE", 0.0)
+    monkeypatch.setattr(
+        ai_service, "llm_http_client",
+        lambda **kwargs: llm_cassette.llm_http_client(transport=httpx.MockTransport(upstream), **kwargs),
+    )
+    llm_cassette.reset_cassettes()
+    service = AIService(provider="custom", base_url="http://llm.invalid", model_name="local")
+
+    monkeypatch.setattr(settings, "AI_CASSETTE_MODE", "record")
+    recorded = await service.generate("写一段", {})
+    assert len(calls) == 1
+
+    monkeypatch.setattr(settings, "AI_CASSETTE_MODE", "replay")
+    llm_cassette.reset_cassettes()
+    replayed = await AIService(provider="custom", base_url="http://elsewhere.invalid", model_name="local").generate("写一段", {})
+    assert replayed == recorded and replayed["content"] == "录制的正文"
+    assert len(calls) == 1
+
+    with pytest.raises(Exception, match="No recorded interaction"):
+        await service.generate("没有录过的提示词", {})
+    llm_cassette.reset_cassettes()
+
+
+async def test_sdk_providers_close_their_cassette_client(tmp_path, monkeypatch):
+    clients = []
+
+    def upstream(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "id": "c1", "object": "chat.completion", "created": 0, "model": "m",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "正文"}}],
+            "usage": {"prompt_tokens": 4, "completion_tokens": 3, "total_tokens": 7},
+        })
+
+    def tracked_client(**kwargs):
+        client = llm_cassette.llm_http_client(transport=httpx.MockTransport(upstream), **kwargs)
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(settings, "AI_CASSETTE_PATH", str(tmp_path / "ai.jsonl"))
+    monkeypatch.setattr(settings, "AI_CASSETTE_MODE", "record")
+    monkeypatch.setattr(ai_service, "llm_http_client", tracked_client)
+    llm_cassette.reset_cassettes()
+
+    service = AIService(provider="openai", api_key="sk-test", base_url="http://llm.invalid/v1", model_name="m")
+    for prompt in ("第一段", "第二段"):
+        assert (await service._generate_openai(prompt, 16, None))["content"] == "正文"
+    assert len(clients) == 2 and all(client.is_closed for client in clients)
+    llm_cassette.reset_cassettes()
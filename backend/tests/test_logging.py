@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+
+from app.core.logger import JsonFormatter, NonBlockingQueueHandler, RequestContextFilter, _request_id
+
+
+def _record(msg="hello %s", args=("world",), level=logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("ai_novel", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_request_id_header_is_generated_or_propagated(client):
+    generated = client.get("/health").headers["X-Request-ID"]
+    assert len(generated) == 32
+    assert client.get("/health", headers={"X-Request-ID": "abc-123"}).headers["X-Request-ID"] == "abc-123"
+    assert client.get("/health", headers={"X-Request-ID": "bad id\n"}).headers["X-Request-ID"] != "bad id\n"
+
+
+def test_json_records_carry_request_id_and_extra_fields():
+    token = _request_id.set("req-1")
+    try:
+        record = _record(user_id=7)
+        assert RequestContextFilter().filter(record)
+    finally:
+        _request_id.reset(token)
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["request_id"] == "req-1"
+    assert payload["message"] == "hello world" and payload["user_id"] == 7 and payload["level"] == "INFO"
+
+
+def test_sampling_is_per_request_and_spares_warnings():
+    dropping = RequestContextFilter(sample_rate=0.0)
+    assert not dropping.filter(_record(sampled=True))
+    assert dropping.filter(_record())
+    assert dropping.filter(_record(level=logging.WARNING, sampled=True))
+
+    half = RequestContextFilter(sample_rate=0.5)
+    for request_id in ("a", "b", "c", "d"):
+        token = _request_id.set(request_id)
+        try:
+            decisions = {half.filter(_record(sampled=True)) for _ in range(3)}
+        finally:
+            _request_id.reset(token)
+        assert len(decisions) == 1
+
+
+def test_queue_handler_defers_formatting_and_never_blocks():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    lazy = _record()
+    handler.handle(lazy)
+    assert (lazy.msg, lazy.args) == ("hello %s", ("world",))
+
+    payload = {"title": "T"}
+    eager = _record(args=(payload,))
+    handler.prepare(eager)
+    payload["title"] = "changed"
+    assert eager.getMessage() == "hello {'title': 'T'}"
+
+    handler.handle(_record())
+    assert handler.dropped == 1
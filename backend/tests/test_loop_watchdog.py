@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from app.core.loop_watchdog import LoopWatchdog, SlowCallbackError, fail_on_slow_callbacks
+from app.core.metrics import metrics_sampler
+
+
+def _blocking_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def block_unrouted(request, call_next):
+        if request.url.path.startswith("/unrouted/"):
+            time.sleep(0.3)  # blocks before any route matched
+        return await call_next(request)
+
+    @app.get("/items/{item_id}/slow")
+    async def slow_item(item_id: int):
+        time.sleep(0.3)  # a sync call inside an async handler
+        return {"id": item_id}
+
+    @app.get("/items/{item_id}")
+    async def fast_item(item_id: int):
+        await asyncio.sleep(0.05)
+        return {"id": item_id}
+
+    return app
+
+
+@pytest.mark.blocks_loop
+async def test_watchdog_reports_blocking_call_with_route():
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.1)
+    watchdog.start()
+    assert not metrics_sampler.measure_lag
+    try:
+        async with httpx.AsyncClient(app=_blocking_app(), base_url="http://test") as client:
+            assert (await client.get("/items/1")).status_code == 200
+            assert watchdog.stalls == 0
+
+            assert (await client.get("/items/7/slow")).status_code == 200
+            await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+
+    assert metrics_sampler.measure_lag
+    assert watchdog.stalls == 1
+    stall = watchdog.last_stall
+    assert (stall["method"], stall["path"], stall["route"]) == ("GET", "/items/7/slow", "/items/{item_id}/slow")
+    assert stall["blocked_ms"] >= 100
+    assert "in slow_item" in stall["stack"] and "time.sleep(0.3)" in stall["stack"]
+
+
+def _stalls(route: str) -> float:
+    return REGISTRY.get_sample_value("event_loop_stalls_total", {"route": route}) or 0.0
+
+
+@pytest.mark.blocks_loop
+async def test_stalls_outside_a_route_are_labelled_unmatched():
+    before = _stalls("unmatched")
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.1)
+    watchdog.start()
+    try:
+        async with httpx.AsyncClient(app=_blocking_app(), base_url="http://test") as client:
+            assert (await client.get("/unrouted/abc123")).status_code == 404
+            await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+
+    assert (watchdog.last_stall["path"], watchdog.last_stall["route"]) == ("/unrouted/abc123", None)
+    assert _stalls("unmatched") - before == 1
+    assert _stalls("/unrouted/abc123") == 0
+
+
+async def _step(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+@pytest.mark.blocks_loop
+async def test_slow_callback_detector(event_loop):
+    with fail_on_slow_callbacks(event_loop, 50) as records:
+        await event_loop.create_task(_step(0.001))
+    assert records == []
+    assert not event_loop.get_debug()
+
+    with pytest.raises(SlowCallbackError, match="_step"):
+        with fail_on_slow_callbacks(event_loop, 50):
+            await event_loop.create_task(_step(0.1))
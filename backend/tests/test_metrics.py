@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from app.core.cache import CacheManager
+from app.core.config import settings
+from app.services.ai_service import AIService
+
+
+def _sample(body: str, prefix: str) -> float:
+    return sum(float(line.rsplit(" ", 1)[1]) for line in body.splitlines() if line.startswith(prefix))
+
+
+def test_metrics_cover_http_db_llm_and_cache(client, monkeypatch):
+    async def fake_custom(self, prompt, max_tokens, temperature):
+        return {"content": "正文", "tokens_used": 7, "prompt_tokens": 5, "completion_tokens": 2, "model": self.model_name}
+
+    monkeypatch.setattr(AIService, "_generate_custom", fake_custom)
+    before = client.get("/metrics").text
+    novel_id = client.post("/api/novels/", json={"title": "T", "author": "A"}).json()["id"]
+    assert client.get(f"/api/novels/{novel_id}").status_code == 200
+    assert client.post("/api/ai-assistants/generate", json={
+        "role": "novelist", "novel_id": novel_id, "user_input": "写一段",
+        "provider": "custom", "model_name": "metrics-model", "base_url": "http://llm.invalid",
+    }).status_code == 200
+    cache = CacheManager(namespace="metrics-test")
+    cache.set("k", 1)
+    cache.get("k")
+    cache.get("missing")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+
+    # 路由模板而非具体路径
+    route = 'http_request_duration_seconds_count{method="GET",route="/api/novels/{novel_id}"}'
+    assert _sample(body, route) - _sample(before, route) == 1
+    assert f"/api/novels/{novel_id}" not in body
+    assert _sample(body, 'db_queries_total{operation="SELECT"}') > _sample(before, 'db_queries_total{operation="SELECT"}')
+    assert _sample(body, 'llm_tokens_total{kind="completion",model="metrics-model",provider="custom"}') == 2
+    # Non-streamed calls have no first-token time; total latency must not stand in for it
+    assert _sample(body, 'llm_time_to_first_token_seconds_count{model="metrics-model",provider="custom"}') == 0
+    assert _sample(body, 'llm_request_duration_seconds_count{model="metrics-model",provider="custom"}') == 1
+    assert _sample(body, 'cache_lookups_total{cache="metrics-test",result="hit",tier="memory"}') == 1
+    assert _sample(body, 'cache_lookups_total{cache="metrics-test",result="miss",tier="memory"}') == 1
+    assert "http_requests_in_flight" in body and 'queue_depth{queue="token_ledger"}' in body
+
+
+def test_metrics_token_guards_the_scrape_endpoint(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+
+from app.core import security
+from app.core.logger import logger
+from benchmarks import micro
+
+
+def _result(**medians) -> dict:
+    return {"benchmarks": [{"fullname": name, "stats": {"median": value}} for name, value in medians.items()]}
+
+
+def test_compare_flags_regressions_past_threshold():
+    baseline = _result(a=0.010, b=0.010, c=0.010, gone=0.01)
+    current = _result(a=0.0105, b=0.013, c=0.005, new=0.01)
+
+    rows, failed = micro.compare(baseline, current, threshold=0.2, allow_missing=True)
+    assert failed
+    assert {row["name"]: row["status"] for row in rows} == {
+        "a": "ok", "b": "REGRESSED", "c": "improved", "gone": "missing", "new": "new",
+    }
+    # 3 ms slower is below the absolute floor, so it is not a failure
+    assert not micro.compare(baseline, current, threshold=0.2, min_delta_ms=5, allow_missing=True)[1]
+
+
+def test_missing_benchmarks_fail_the_gate_unless_allowed(tmp_path):
+    baseline = {**_result(a=0.010, gone=0.010), "machine_info": micro.machine_info()}
+    current = {**_result(a=0.010), "machine_info": micro.machine_info()}
+
+    rows, failed = micro.compare(baseline, current, threshold=0.2)
+    assert failed and {row["name"]: row["status"] for row in rows}["gone"] == "MISSING"
+
+    args = ["compare", str(micro.write_json(tmp_path / "base.json", baseline)),
+            str(micro.write_json(tmp_path / "current.json", current)), "--stat", "median"]
+    assert micro.main(args) == 1
+    assert micro.main(args + ["--allow-missing"]) == 0
+
+
+def test_cli_gates_only_against_same_machine_baselines(tmp_path):
+    baseline = {**_result(a=0.010), "machine_info": micro.machine_info()}
+    slower = {**_result(a=0.020), "machine_info": micro.machine_info()}
+    base_path = micro.write_json(tmp_path / "base.json", baseline)
+    slow_path = micro.write_json(tmp_path / "slow.json", slower)
+    args = ["compare", str(base_path), str(slow_path), "--stat", "median"]
+
+    assert micro.main(args) == 1
+    assert micro.main(args + ["--min-delta-ms", "20"]) == 0
+    micro.write_json(base_path, {**baseline, "machine_info": {**baseline["machine_info"], "node": "ci-runner"}})
+    assert micro.main(args) == 0
+    assert micro.main(args + ["--ignore-machine"]) == 1
+
+
+def test_suite_runs_against_a_seeded_dataset(monkeypatch, tmp_path):
+    monkeypatch.setattr(security, "pwd_context", security.pwd_context)
+    monkeypatch.setattr(logger, "setLevel", lambda level: None)
+    args = argparse.Namespace(
+        sizes=["tiny"], filter=["chapters.get", "ai.generate", "service.build_context_prompt"], seed=0,
+        min_rounds=2, min_time=0.0, max_time=1.0, warmup=0,
+    )
+
+    result = micro.run(args)
+
+    names = [entry["fullname"] for entry in result["benchmarks"]]
+    assert names == [
+        "chapters::chapters.get[tiny]",
+        "ai::ai.generate[tiny]",
+        "services::service.build_context_prompt[tiny]",
+    ]
+    assert all(entry["stats"]["rounds"] >= 2 and entry["stats"]["min"] > 0 for entry in result["benchmarks"])
+    assert not micro.compare(result, result, threshold=0.0)[1]
+    assert micro.main(["compare", str(micro.write_json(tmp_path / "r.json", result)), str(tmp_path / "r.json")]) == 0
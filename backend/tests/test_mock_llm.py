@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from benchmarks.mock_llm import MockLLMConfig, create_app, parse_distribution
+
+
+def _client(**config) -> httpx.AsyncClient:
+    app = create_app(MockLLMConfig(time_scale=0, completion_tokens=12, **config))
+    return httpx.AsyncClient(app=app, base_url="http://mock")
+
+
+def _events(text: str) -> list:
+    return [json.loads(line[6:]) for line in text.splitlines() if line.startswith("data: {")]
+
+
+async def test_outputs_are_deterministic_and_streams_match():
+    body = {"model": "m", "messages": [{"role": "user", "content": "写一段"}], "max_tokens": 50}
+    async with _client(seed=7) as client:
+        first = (await client.post("/v1/chat/completions", json=body)).json()
+        again = (await client.post("/v1/chat/completions", json=body)).json()
+        streamed = await client.post("/v1/chat/completions", json={**body, "stream": True})
+        anthropic = await client.post("/v1/messages", json={**body, "stream": True})
+    async with _client(seed=8) as client:
+        other = (await client.post("/v1/chat/completions", json=body)).json()
+
+    content = first["choices"][0]["message"]["content"]
+    assert content == again["choices"][0]["message"]["content"] != other["choices"][0]["message"]["content"]
+    assert first["usage"]["completion_tokens"] == 12
+
+    chunks = _events(streamed.text)
+    assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks) == content
+    assert streamed.text.rstrip().endswith("data: [DONE]")
+    events = _events(anthropic.text)
+    assert [e["type"] for e in events][:2] == ["message_start", "content_block_start"]
+    assert "".join(e["delta"]["text"] for e in events if e["type"] == "content_block_delta") == content
+    assert events[-1]["type"] == "message_stop"
+
+
+async def test_fault_injection():
+    async with _client(rate_limit_rate=1.0, retry_after=2) as client:
+        limited = await client.post("/v1/messages", json={"model": "m", "messages": []})
+    assert limited.status_code == 429 and limited.headers["Retry-After"] == "2"
+    assert limited.json()["error"]["type"] == "rate_limit_error"
+
+    async with _client(error_rate=1.0) as client:
+        failed = await client.post("/v1/completions", json={"model": "m", "prompt": "x"})
+        stats = (await client.get("/mock/stats")).json()
+    assert failed.status_code == 500 and stats["responses"] == {"500": 1}
+
+    with pytest.raises(ValueError):
+        parse_distribution("pareto:1")
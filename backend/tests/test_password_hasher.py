@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.password_hasher import PasswordHasher
+from app.models.admin import Admin
+
+
+def test_login_rehashes_when_cost_changes(client, db, admin, monkeypatch):
+    monkeypatch.setattr(security, "pwd_context", security.build_pwd_context(5))
+    response = client.post("/api/admin/login", json={"username": "root", "password": "secret"})
+    assert response.status_code == 200
+
+    db.expire_all()
+    admin = db.query(Admin).filter(Admin.username == "root").one()
+    assert admin.hashed_password.startswith("$2b$05$")
+    assert client.post("/api/admin/login", json={"username": "root", "password": "wrong"}).status_code == 401
+    assert client.post("/api/admin/login", json={"username": "nobody", "password": "x"}).status_code == 401
+
+
+def test_queue_and_per_account_limits():
+    hasher = PasswordHasher(max_workers=2, max_queue=2, max_per_account=1)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.ensure_future(hasher._run(release.wait, account="alice"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as burst:
+            await hasher._run(release.wait, account="alice")
+        assert burst.value.status_code == 429
+
+        second = asyncio.ensure_future(hasher._run(release.wait, account="bob"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as full:
+            await hasher._run(release.wait)
+        assert full.value.status_code == 503
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert hasher.queue_depth == 0
+
+    asyncio.run(run())
+    hasher.shutdown()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from sqlalchemy import event
+
+from app.core.cache import cache
+from app.core.invalidation import InvalidationKind, publish_invalidation
+from app.core.security import create_access_token
+from app.models.user import User
+
+
+def _user_selects(db, action) -> int:
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        action()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    return len(statements)
+
+
+def test_authenticated_user_is_loaded_once(client, db):
+    user = User(username="alice", hashed_password="x", is_admin=False, is_active=True)
+    db.add(user)
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+
+    assert _user_selects(db, lambda: client.get("/users/me", headers=headers)) == 1
+    assert _user_selects(db, lambda: client.get("/users/me", headers=headers)) == 0
+    assert client.get("/users/me", headers=headers).json()["username"] == "alice"
+
+    # Deactivation publishes an invalidation and the next request sees it
+    user.is_active = False
+    db.commit()
+    publish_invalidation(InvalidationKind.USER, user.id)
+    assert client.get("/users/me", headers=headers).status_code == 403
+
+
+def test_demo_principal_is_cached(client, db):
+    client.post("/api/novels/", json={"title": "Demo 1"})
+    assert cache.get("principal:demo") is not None
+    assert _user_selects(db, lambda: client.post("/api/novels/", json={"title": "Demo 2"})) == 0
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from app.core.config import settings
+from app.core.profiling import StackSampler, fold, profile_buffer, profile_tokens
+from app.core.security import create_access_token
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_folds_busy_thread_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        sampler = StackSampler(0.001)
+        for _ in range(5):
+            sampler.sample(exclude=threading.get_ident())
+            time.sleep(0.001)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = fold(sampler.counts).splitlines()
+    busy = [line for line in lines if line.startswith("thread:busy-worker;")]
+    assert busy and "_spin (test_profiling.py:" in busy[0]
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in busy) == 5
+    # Idle threads (parked on locks/queues/selectors) are not sampled
+    leaves = [line.rsplit(" ", 1)[0].split(";")[-1] for line in lines]
+    assert not any(leaf.startswith(("wait (threading.py:", "select (selectors.py:")) for leaf in leaves)
+
+
+def test_flagged_request_is_profiled_and_listed(client, admin_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILE_EXPORT_DIR", str(tmp_path))
+    headers = admin_headers
+    token = client.post("/api/admin/profiles/token", headers=headers).json()["token"]
+
+    plain = client.get("/api/novels/")
+    assert plain.status_code == 200 and "x-profile-id" not in plain.headers
+    assert profile_buffer.summaries() == []
+
+    profiled = client.get("/api/novels/", headers={"X-Profile": token, "X-Request-ID": "req-profile-1"})
+    assert profiled.status_code == 200
+    profile_id = profiled.headers["x-profile-id"]
+    # Tokens are single-use
+    assert "x-profile-id" not in client.get("/api/chapters/", headers={"X-Profile": token}).headers
+    second = client.post("/api/admin/profiles/token", headers=headers).json()["token"]
+    assert "x-profile-id" in client.get("/api/chapters/", headers={"X-Profile": second}).headers
+
+    listed = client.get("/api/admin/profiles", headers=headers).json()["profiles"]
+    assert [p["path"] for p in listed] == ["/api/chapters/", "/api/novels/"]
+    assert listed[1]["id"] == profile_id and listed[1]["status"] == 200
+    assert listed[1]["request_id"] == "req-profile-1" and "folded" not in listed[1]
+
+    folded = client.get(f"/api/admin/profiles/{profile_id}", headers=headers)
+    assert folded.headers["content-type"].startswith("text/plain")
+    assert folded.text == (tmp_path / f"{profile_id}.folded").read_text(encoding="utf-8")
+    assert client.get("/api/admin/profiles/missing", headers=headers).status_code == 404
+
+
+def test_profiling_requires_an_admin_issued_token(client, db):
+    user_token = create_access_token("1")
+    response = client.get("/api/novels/", headers={"X-Profile": user_token})
+    assert response.status_code == 200 and "x-profile-id" not in response.headers
+    assert client.get("/api/novels/", headers={"X-Profile": "garbage"}).status_code == 200
+    assert "x-profile-id" not in client.get("/api/novels/", params={"__profile": user_token}).headers
+    assert profile_buffer.summaries() == []
+
+    assert client.post("/api/admin/profiles/token", headers={"Authorization": f"Bearer {user_token}"}).status_code == 401
+    assert profile_tokens.redeem(profile_tokens.issue("admin-1")) == "admin-1"
+
+
+def test_profile_token_is_not_a_bearer_credential(client, admin, admin_headers):
+    token = client.post("/api/admin/profiles/token", headers=admin_headers).json()["token"]
+    bearer = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/admin/stats", headers=bearer).status_code == 401
+    assert client.get("/api/admin/profiles", headers=bearer).status_code == 401
+    assert client.get("/users/me", headers=bearer).status_code == 401
+
+    # Scoped JWTs are rejected as credentials too
+    scoped = create_access_token(str(admin.id), extra_claims={"scope": "profile"})
+    assert client.get("/api/admin/stats", headers={"Authorization": f"Bearer {scoped}"}).status_code == 401
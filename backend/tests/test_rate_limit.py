@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.core.rate_limit import SlidingWindowLimiter, _MemoryWindowBackend, parse_rate
+from app.models.user import User
+from app.models.user_daily_request import UserDailyRequest
+from app.services.quota import consume_daily_request
+
+
+def test_parse_rate():
+    assert parse_rate("30/minute") == (30, 60)
+    assert parse_rate("5/10seconds") == (5, 10)
+    assert parse_rate("1000/day") == (1000, 86400)
+
+
+def test_sliding_window_and_overrides(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMITS", {"default": "100/minute", "ai": "2/minute"})
+    monkeypatch.setattr(settings, "RATE_LIMIT_OVERRIDES", {"user:7": {"ai": "3/minute"}})
+    limiter = SlidingWindowLimiter(_MemoryWindowBackend())
+
+    assert limiter.route_group("/api/ai-assistants/generate") == "ai"
+    assert limiter.route_group("/api/admin/login") == "auth"
+    assert limiter.route_group("/api/admin/stats") == "default"
+
+    assert [limiter.hit("ip:1", "ai")[0] for _ in range(3)] == [True, True, False]
+    allowed, limit, remaining, retry_after = limiter.hit("ip:1", "ai")
+    assert (allowed, limit, remaining) == (False, 2, 0) and 0 < retry_after <= 60
+    assert [limiter.hit("user:7", "ai")[0] for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit("ip:1", "default")[0] is True
+
+
+def test_middleware_returns_429(client, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMITS", {"default": "2/minute"})
+    assert client.get("/api/novels/").headers["X-RateLimit-Remaining"] == "1"
+    client.get("/api/novels/")
+    response = client.get("/api/novels/")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/health").status_code == 200
+
+
+def test_daily_quota_is_atomic_and_enforced(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "DAILY_REQUEST_LIMIT", 2)
+    user = User(username="writer", hashed_password="x", is_active=True)
+    db.add(user)
+    db.commit()
+
+    assert consume_daily_request(db, user.id, 2) == 1
+    assert consume_daily_request(db, user.id, 2) == 2
+    assert consume_daily_request(db, user.id, 2) is None
+    row = db.query(UserDailyRequest).filter(UserDailyRequest.user_id == user.id).one()
+    assert (row.request_date, row.request_count) == (date.today(), 2)
+
+    # 校验失败（422）不占用额度；匿名调用按客户端 IP 计数，与 DEBUG 无关
+    monkeypatch.setattr(settings, "DEBUG", False)
+    for _ in range(3):
+        assert client.post("/api/ai/test-config", json={}).status_code == 422
+        assert client.post("/api/ai-assistants/generate", json={}).status_code == 422
+    monkeypatch.setattr(settings, "DEBUG", True)  # test-config 在 DEBUG 下模拟连接成功
+    test_config = {"provider": "openai", "api_key": ""}
+    assert client.post("/api/ai/test-config", json=test_config).status_code == 200
+    assert client.post("/api/ai/test-config", json=test_config).status_code == 200
+    assert client.post("/api/ai/test-config", json=test_config).status_code == 429
+    assert client.get("/api/ai-assistants/").status_code == 200
+    assert db.query(User).filter(User.username == "demo").first() is None
+
+    # 登录用户使用自己的额度（已用满 2 次）
+    headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+    assert client.post("/api/ai/test-config", json=test_config, headers=headers).status_code == 429
+    assert client.post("/api/ai/test-config", json={}, headers={"Authorization": "Bearer bad"}).status_code == 401
+
+
+def test_memory_windows_drop_idle_keys(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    backend = _MemoryWindowBackend(sweep_interval=0)
+    for index in range(100):
+        backend.hit(f"ip:{index}", 5, 10)
+    assert len(backend) == 100
+    clock[0] += 11
+    backend.hit("ip:new", 5, 10)
+    assert len(backend) == 1
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from app.core.fractional_index import key_between, keys_between
+from app.models.chapter import Chapter
+from app.services.ai_service import AIService
+from app.services.reordering import CROWDED_RANK_LENGTH, REBALANCE_RADIUS, rank_rebalancer, respace_ranks
+
+def _listed(client, novel) -> list[tuple[int, int]]:
+    chapters = client.get("/api/chapters/", params={"novel_id": novel["id"]}).json()
+    return [(c["id"], c["chapter_number"]) for c in chapters]
+
+
+def test_move_rewrites_only_the_moved_row(client, db, novel, make_chapter):
+    """Moving a chapter changes its rank alone; numbering is derived on read."""
+    first, second, third = (make_chapter()["id"] for _ in range(3))
+    before = {c.id: c.rank for c in db.query(Chapter)}
+
+    response = client.post(f"/api/chapters/{third}/move", json={"after_id": first})
+    assert response.status_code == 200
+    assert response.json()["chapter_number"] == 2
+
+    db.expire_all()
+    after = {c.id: c.rank for c in db.query(Chapter)}
+    assert [cid for cid in before if before[cid] != after[cid]] == [third]
+    assert _listed(client, novel) == [(first, 1), (third, 2), (second, 3)]
+
+    client.post(f"/api/chapters/{first}/move", json={"before_id": None, "after_id": None})
+    assert [cid for cid, _ in _listed(client, novel)] == [first, third, second]
+
+
+def test_rebalancer_persists_display_numbers(client, db, make_chapter):
+    """The background pass rewrites stored numbers to match rank order."""
+    first, second, third = (make_chapter()["id"] for _ in range(3))
+    client.post(f"/api/chapters/{first}/move", json={"after_id": third})
+
+    assert rank_rebalancer.run_once(db) == 3
+    db.expire_all()
+    stored = [(c.id, c.chapter_number) for c in db.query(Chapter).order_by(Chapter.rank)]
+    assert stored == [(second, 1), (third, 2), (first, 3)]
+
+
+def test_create_with_explicit_number_inserts_in_place(client, novel, make_chapter):
+    """Creating chapter 2 after chapters 1 and 3 places it between them."""
+    make_chapter(title="One", chapter_number=1)
+    make_chapter(title="Three", chapter_number=3)
+    make_chapter(title="Two", chapter_number=2)
+
+    titles = [c["title"] for c in client.get("/api/chapters/", params={"novel_id": novel["id"]}).json()]
+    assert titles == ["One", "Two", "Three"]
+
+
+def test_explicit_number_update_is_rebalanced_at_shutdown(client, db, make_chapter):
+    """Renumbering marks the novel; stopping the app writes the pending numbers."""
+    first, second, third = (make_chapter()["id"] for _ in range(3))
+    client.put(f"/api/chapters/{third}", json={"chapter_number": 1})
+    client.__exit__(None, None, None)  # lifespan shutdown runs the final rebalance
+
+    db.expire_all()
+    stored = [(c.id, c.chapter_number) for c in db.query(Chapter).order_by(Chapter.rank)]
+    assert stored == [(first, 1), (third, 2), (second, 3)]
+
+
+def test_rebalance_respaces_only_the_crowded_neighbourhood():
+    """Only keys near an overlong rank are rewritten; the rest of the novel keeps its ranks."""
+    ranks = keys_between(None, None, 40)
+    crowded = ranks[20]
+    while len(crowded) <= CROWDED_RANK_LENGTH:
+        crowded = key_between(ranks[19], crowded)
+    ranks[20:20] = [crowded]
+
+    respaced = respace_ranks(ranks)
+    changed = [index for index, (old, new) in enumerate(zip(ranks, respaced)) if old != new]
+    assert 20 in changed and all(abs(index - 20) <= REBALANCE_RADIUS for index in changed)
+    assert respaced == sorted(respaced) and len(set(respaced)) == len(respaced)
+    assert max(len(rank) for rank in respaced) <= CROWDED_RANK_LENGTH
+    assert respace_ranks([None, None]) == keys_between(None, None, 2)
+
+
+def test_outline_prompt_numbers_chapters_by_rank(client, novel, make_chapter, monkeypatch):
+    """Before the rebalancer runs, AI prompts still label chapters by their current order."""
+    ids = [make_chapter(title=title)["id"] for title in ("First", "Second", "Third")]
+    client.post(f"/api/chapters/{ids[2]}/move", json={"before_id": ids[0]})
+
+    prompts = []
+
+    async def fake_generate(self, prompt, context, max_tokens=2000, temperature=None):
+        prompts.append(prompt)
+        return {"content": "大纲", "tokens_used": 1, "model": self.model_name}
+
+    monkeypatch.setattr(AIService, "generate", fake_generate)
+    response = client.post("/api/ai/generate-chapter-outline", json={"novel_id": novel["id"], "chapter_number": 3})
+    assert response.status_code == 200
+    assert "Chapter 1: Third - \nChapter 2: First - \n" in prompts[0]
+    assert "Second" not in prompts[0].split("Previous Chapters Summary:")[1].split("Characters Available")[0]
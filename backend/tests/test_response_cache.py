@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+
+def _novel(client) -> str:
+    return client.post("/api/novels/", json={"title": "Responses"}).json()["id"]
+
+
+def test_chapter_list_hits_until_novel_is_written(client):
+    novel_a, novel_b = _novel(client), _novel(client)
+    client.post("/api/chapters/", json={"novel_id": novel_a, "title": "A1", "chapter_number": 1})
+    client.post("/api/chapters/", json={"novel_id": novel_b, "title": "B1", "chapter_number": 1})
+
+    first = client.get("/api/chapters/", params={"novel_id": novel_a})
+    assert first.headers["X-Cache"] == "MISS"
+    client.get("/api/chapters/", params={"novel_id": novel_b})
+    second = client.get("/api/chapters/", params={"novel_id": novel_a})
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+
+    # A write to novel A evicts only A's cached responses
+    client.post("/api/chapters/", json={"novel_id": novel_a, "title": "A2", "chapter_number": 2})
+    refreshed = client.get("/api/chapters/", params={"novel_id": novel_a})
+    assert refreshed.headers["X-Cache"] == "MISS"
+    assert [c["title"] for c in refreshed.json()] == ["A1", "A2"]
+    assert client.get("/api/chapters/", params={"novel_id": novel_b}).headers["X-Cache"] == "HIT"
+
+
+def test_cache_is_keyed_by_caller_and_bypassable(client):
+    client.get("/api/novels/")
+    assert client.get("/api/novels/").headers["X-Cache"] == "HIT"
+    assert client.get("/api/novels/", headers={"Authorization": "Bearer other"}).headers["X-Cache"] == "MISS"
+    assert "X-Cache" not in client.get("/api/novels/", headers={"Cache-Control": "no-cache"}).headers
+    assert "X-Cache" not in client.get("/api/chapters/").headers
+
+
+def test_cross_origin_hit_keeps_cors_headers(client):
+    origin = {"Origin": "http://localhost:5173"}
+    miss = client.get("/api/novels/", headers=origin)
+    hit = client.get("/api/novels/", headers=origin)
+    assert (miss.headers["X-Cache"], hit.headers["X-Cache"]) == ("MISS", "HIT")
+    assert hit.headers["Access-Control-Allow-Origin"] == miss.headers["Access-Control-Allow-Origin"] == origin["Origin"]
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+import logging
+
+from app.core.config import settings
+from app.services.ai_service import AIService
+
+
+def _parts(header: str) -> dict:
+    parts = {}
+    for item in header.split(", "):
+        name, *params = item.split(";")
+        parts[name] = dict(param.split("=", 1) for param in params)
+    return parts
+
+
+def test_server_timing_breaks_down_ai_request(client, monkeypatch, caplog):
+    async def fake_custom(self, prompt, max_tokens, temperature):
+        return {"content": "正文", "tokens_used": 3, "model": self.model_name}
+
+    monkeypatch.setattr(AIService, "_generate_custom", fake_custom)
+    monkeypatch.setattr(settings, "SERVER_TIMING_LOG_MS", 0)
+    novel_id = client.post("/api/novels/", json={"title": "T", "author": "A"}).json()["id"]
+
+    with caplog.at_level(logging.INFO, logger="ai_novel"):
+        response = client.post("/api/ai-assistants/generate", json={
+            "role": "novelist", "novel_id": novel_id, "user_input": "写一段",
+            "provider": "custom", "model_name": "local", "base_url": "http://llm.invalid",
+        })
+    assert response.status_code == 200
+    parts = _parts(response.headers["Server-Timing"])
+    assert {"db", "llm", "serialize", "total"} <= set(parts)
+    assert parts["llm"]["desc"] == '"1x"'
+    assert float(parts["total"]["dur"]) >= float(parts["llm"]["dur"])
+
+    lines = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Request timing ")]
+    logged = json.loads(lines[-1].split(" ", 2)[2])
+    assert logged["route"] == "/api/ai-assistants/generate" and logged["status"] == 200
+    assert logged["timings"]["db"]["count"] >= 1
+
+
+def test_server_timing_reports_cache_and_can_be_disabled(client, monkeypatch):
+    client.get("/api/novels/")
+    assert "cache;" in client.get("/api/novels/").headers["Server-Timing"]
+
+    monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", False)
+    assert "Server-Timing" not in client.get("/health").headers
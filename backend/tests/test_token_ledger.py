@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from app.core.security import create_access_token
+from app.models.token_usage import TokenUsage, TokenUsageDaily, TokenUsageHourly
+from app.models.user import User
+from app.services.ai_service import AIService
+from app.services.token_ledger import TokenLedgerWriter, UsageRecord, token_ledger
+
+
+def test_flush_writes_ledger_and_rollups(db):
+    writer = TokenLedgerWriter()
+    at = datetime(2026, 10, 19, 8, 15)
+    for minute, cache_hit in ((15, False), (40, True)):
+        writer.record(UsageRecord(
+            provider="openai", model="gpt-4", prompt_tokens=100, completion_tokens=50,
+            latency_ms=200, cache_hit=cache_hit, user_id=3, created_at=at.replace(minute=minute),
+        ))
+    writer.record(UsageRecord(provider="openai", model="gpt-4", prompt_tokens=10, created_at=at.replace(hour=9)))
+
+    assert writer.flush(db) == 3
+    assert db.query(TokenUsage).count() == 3
+    hourly = {(row.bucket.hour, row.user_id): row for row in db.query(TokenUsageHourly).all()}
+    assert (hourly[(8, 3)].requests, hourly[(8, 3)].cache_hits, hourly[(8, 3)].prompt_tokens) == (2, 1, 200)
+    assert hourly[(9, 0)].prompt_tokens == 10
+
+    writer.record(UsageRecord(provider="openai", model="gpt-4", completion_tokens=5, user_id=3, created_at=at))
+    writer.flush(db)
+    daily = db.query(TokenUsageDaily).filter(TokenUsageDaily.user_id == 3).one()
+    assert (daily.requests, daily.completion_tokens, daily.latency_ms_total) == (3, 105, 400)
+
+
+def test_rejected_records_are_dropped_not_retried(db):
+    writer = TokenLedgerWriter()
+    at = datetime(2026, 10, 19, 8, 15)
+    writer.record(UsageRecord(provider="openai", model="gpt-4", prompt_tokens=10, created_at=at))
+    writer.record(UsageRecord(provider=None, model="gpt-4", prompt_tokens=20, created_at=at))
+    writer.record(UsageRecord(provider="openai", model="gpt-4", prompt_tokens=30, created_at=at))
+
+    assert writer.flush(db) == 2
+    assert (writer.rejected, writer.pending_count()) == (1, 0)
+    assert sorted(row.prompt_tokens for row in db.query(TokenUsage).all()) == [10, 30]
+    assert db.query(TokenUsageDaily).one().prompt_tokens == 40
+
+
+def test_assistant_reports_and_records_usage(client, db, admin_headers, monkeypatch):
+    async def fake_custom(self, prompt, max_tokens, temperature):
+        return {"content": "正文", "tokens_used": 42, "prompt_tokens": 30, "completion_tokens": 12, "model": self.model_name}
+
+    monkeypatch.setattr(AIService, "_generate_custom", fake_custom)
+    writer = User(username="writer", hashed_password="x", is_active=True)
+    db.add(writer)
+    db.commit()
+    novel_id = client.post("/api/novels/", json={"title": "T", "author": "A"}).json()["id"]
+    response = client.post("/api/ai-assistants/generate", json={
+        "role": "novelist", "novel_id": novel_id, "user_input": "写一段",
+        "provider": "custom", "model_name": "local", "base_url": "http://llm.invalid",
+    }, headers={"Authorization": f"Bearer {create_access_token(str(writer.id))}"})
+    assert response.status_code == 200
+    assert response.json()["tokens_used"] == 42
+
+    token_ledger.flush(db)
+    row = db.query(TokenUsage).one()
+    assert (row.user_id, row.novel_id, row.provider, row.model) == (writer.id, novel_id, "custom", "local")
+    assert (row.prompt_tokens, row.completion_tokens, row.cache_hit) == (30, 12, False)
+
+    headers = admin_headers
+
+    summary = client.get("/api/admin/usage/summary?group_by=user", headers=headers).json()
+    assert summary == [{
+        "key": str(writer.id), "requests": 1, "cache_hits": 0, "prompt_tokens": 30,
+        "completion_tokens": 12, "total_tokens": 42, "avg_latency_ms": summary[0]["avg_latency_ms"],
+    }]
+    hourly = client.get(f"/api/admin/usage/hourly?user_id={writer.id}", headers=headers).json()
+    assert [(r["model"], r["total_tokens"]) for r in hourly] == [("local", 42)]
+    assert client.get("/api/admin/usage/summary?group_by=bogus", headers=headers).status_code == 422
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import httpx
+
+from app.core.config import settings
+from app.core.tracing import trace_buffer
+from app.services import ai_service, llm_cassette
+
+GENERATE = {
+    "role": "novelist", "user_input": "写一段",
+    "provider": "custom", "model_name": "local", "base_url": "http://llm.invalid",
+}
+
+
+def _mock_llm(monkeypatch, seen: list) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("traceparent"))
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "正文"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+        })
+
+    monkeypatch.setattr(
+        ai_service, "llm_http_client",
+        lambda **kwargs: llm_cassette.llm_http_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+
+
+def test_generate_trace_covers_the_causal_chain(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 1.0)
+    headers = admin_headers
+    seen = []
+    _mock_llm(monkeypatch, seen)
+    novel_id = client.post("/api/novels/", json={"title": "T", "author": "A"}).json()["id"]
+
+    response = client.post("/api/ai-assistants/generate", json={**GENERATE, "novel_id": novel_id})
+    assert response.status_code == 200
+    trace_id = response.headers["traceparent"].split("-")[1]
+
+    listed = client.get("/api/admin/traces", headers=headers).json()["traces"]
+    assert any(t["trace_id"] == trace_id and t["name"] == "POST /api/ai-assistants/generate" for t in listed)
+    spans = client.get(f"/api/admin/traces/{trace_id}", headers=headers).json()["spans"]
+    by_name = {span["name"]: span for span in spans}
+    for name in ("ai.build_context", "assistant.run", "assistant.build_prompt", "ai.generate", "llm.custom"):
+        assert name in by_name
+    assert any(name.startswith("db SELECT") for name in by_name)
+
+    http_span = by_name["HTTP POST llm.invalid"]
+    assert http_span["parent_span_id"] == by_name["llm.custom"]["span_id"]
+    assert by_name["llm.custom"]["parent_span_id"] == by_name["ai.generate"]["span_id"]
+    assert by_name["ai.generate"]["parent_span_id"] == by_name["assistant.run"]["span_id"]
+    assert by_name["ai.generate"]["attributes"]["llm.completion_tokens"] == 2
+    assert seen == [f"00-{trace_id}-{http_span['span_id']}-01"]
+    assert client.get("/api/admin/traces/unknown", headers=headers).status_code == 404
+
+
+def test_head_and_tail_sampling(client, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "TRACE_TAIL_LATENCY_MS", 60_000)
+    client.get("/health")
+    assert trace_buffer.summaries() == []
+
+    # 尾部采样：慢请求即使未被头部采样也会保留
+    monkeypatch.setattr(settings, "TRACE_TAIL_LATENCY_MS", 0)
+    client.get("/health")
+    assert [t["name"] for t in trace_buffer.summaries()] == ["GET /health"]
+
+    # 调用方已采样的 traceparent 会被延续
+    monkeypatch.setattr(settings, "TRACE_TAIL_LATENCY_MS", 60_000)
+    parent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    client.get("/health", headers={"traceparent": parent})
+    assert trace_buffer.get("a" * 32)[0]["parent_span_id"] == "b" * 16
+
+    monkeypatch.setattr(settings, "TRACE_TAIL_SAMPLING", False)
+    assert "traceparent" not in client.get("/health").headers
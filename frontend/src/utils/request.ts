@@ -15,11 +15,15 @@ const request = axios.create({
 request.interceptors.request.use(
   (config) => {
     const adminToken = localStorage.getItem('admin_token')
+    const userToken = localStorage.getItem('user_token')
     const url = config.url || ''
     const isAdminAPI = url.includes('/admin')
     const isAuthEndpoint = url.endsWith('/admin/login') || url.endsWith('/admin/register')
     if (adminToken && isAdminAPI && !isAuthEndpoint) {
       config.headers.Authorization = `Bearer ${adminToken}`
+    } else if (userToken && !isAdminAPI) {
+      // Signed-in users get their own AI quota; anonymous calls are counted per client IP
+      config.headers.Authorization = `Bearer ${userToken}`
     }
     return config
   },